@@ -62,36 +62,33 @@
 # In[2]:
 
 
-import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.graph_objects as go
-import geopandas as gpd
 
+from methane_emissions import EmissionsCube, emission_statistics, figures, load_emissions, top_emitters
+from methane_emissions.countries import iso_codes
+from methane_emissions.geometry import load_geometry
+
+
+# ### <font color='green'>Data Cleaning</font>
+# Only the columns needed for the analysis are read. notes and source are skipped. Not all rows have notes and the source is IEA throughout the entire dataset.
+# The parsed data is cached in an Arrow file next to the CSV, so later runs memory-map the cache instead of parsing the CSV again.
 
 # In[3]:
 
 
 file = "IEA-MethaneEmissionsComparison-World.csv"
-df = pd.read_csv(file)
+df = load_emissions(file)
+print(df.attrs['load'])
+print(df.attrs['country_match'])
 df.head()
 
 
-# ### <font color='green'>Data Cleaning</font>
-# Drop notes and source from the DataFrame. These are not necessary for the analysis. Not all rows have notes and the source is IEA throughout the entire dataset.
+# Every analysis below is a query against an emissions cube. The cube sums the emissions once per (type, segment, reason, region, country, baseYear), so the queries do not rescan the full DataFrame.
 
 # In[4]:
 
 
-# drop columns
-df = df.drop(['notes', 'source'], axis=1)
-
-
-# In[5]:
-
-
-df.head()
+cube = EmissionsCube.from_frame(df)
 
 
 # ### <font color='green'>Data Analysis</font>
@@ -107,19 +104,17 @@ df.head()
 
 
 # get the world emissions data
-world_data = df.loc[(df['region'] == 'World')
-                    & (df['segment'] == 'Total')].sort_values(by=['emissions'],
-                                                             ascending=False)
+world_data = cube.select(region='World', segment='Total').sort_values(by=['emissions'],
+                                                                      ascending=False)
 world_data
 
 
 # In[7]:
 
 
-# create a pivot table of the world emissions data
-world_emissions_data = pd.pivot_table(world_data,
-                              values='emissions',
-                              index='type').sort_values(by=['emissions'], ascending=False)
+# sum the world emissions data by type
+world_emissions_data = cube.table('type', region='World',
+                                  segment='Total').sort_values(by=['emissions'], ascending=False)
 # rename the index
 world_emissions_data = world_emissions_data.rename_axis("World Emission Types", axis='index')
 world_emissions_data
@@ -129,13 +124,7 @@ world_emissions_data
 
 
 # plot the world emissions data
-data = world_data['emissions']
-labels = world_data['type']
-colors = ['#D7BDE2','#ABEBC6', '#F8C471','#AED6F1']
-explode = 0.1, 0, 0, 0
-plt.pie(data, labels=labels, colors=colors, explode=explode,
-        autopct='%1.1f%%', shadow=True)
-plt.title('World Methane Emissions per Type')
+figures.world_types_pie(world_data)
 plt.show()
 
 
@@ -172,84 +161,69 @@ plt.show()
 
 
 # choose all data with type agriculture, segment total and reason all
-agriculture_data = df.loc[(df['type'] == 'Agriculture')
-                     & (df['segment'] == 'Total')
-                     & (df['reason'] == 'All')]
+agriculture_data = cube.select(type='Agriculture', segment='Total', reason='All')
 
-# drop the World data
-agriculture_data_cleaned = agriculture_data.drop(agriculture_data[agriculture_data['region'] == 'World'].index, axis=0)
+# leave out the World data
+agriculture_data_cleaned = cube.select(type='Agriculture', segment='Total', reason='All',
+                                       include_world=False)
 
 # sum up the agriculture emissions by region
-agriculture_region_data = agriculture_data_cleaned.groupby('region', as_index=False)['emissions'].sum()
+agriculture_region_data = cube.rollup('region', type='Agriculture', segment='Total', reason='All',
+                                      include_world=False)
 agriculture_region_data
 
 
 # In[11]:
 
 
-# create pivot table of agriculture emissions by region
-agriculture_region_data1 = pd.pivot_table(agriculture_region_data,
-                                         index = 'region',
-                                         values = 'emissions').sort_values(by=['emissions'],
-                                                                          ascending=False)
+# table of agriculture emissions by region
+agriculture_region_data1 = cube.table('region', type='Agriculture', segment='Total', reason='All',
+                                      include_world=False).sort_values(by=['emissions'],
+                                                                       ascending=False)
 agriculture_region_data1
 
 
 # In[12]:
 
 
-# function to return the max agriculture methane producing region
-def max_agriculture_region():
-    max_agriculture_emission = agriculture_region_data['emissions'].max()
-    max_agriculture_region = agriculture_region_data.loc[agriculture_region_data['emissions'].idxmax(), 'region']
-    return max_agriculture_region, max_agriculture_emission
-# function to return the min agriculture methane producing region
-def min_agriculture_region():
-    min_agriculture_emission = agriculture_region_data['emissions'].min()
-    min_agriculture_region = agriculture_region_data.loc[agriculture_region_data['emissions'].idxmin(), 'region']
-    return min_agriculture_region, min_agriculture_emission
-# function to return the mean agriculture methane emissions based on the regions
-def mean_agriculture_emissions():
-    mean_agriculture_emission = agriculture_region_data['emissions'].mean()
-    return mean_agriculture_emission
-# function to return the median agriculture methane emissions based on the regions
-def median_agriculture_emissions():
-    median_agriculture_emissions = agriculture_region_data['emissions'].median()
-    return median_agriculture_emissions
+# summary statistics of the emissions per region for every emission type
+region_statistics = emission_statistics(cube, level='region')
+region_statistics
 
 
 # In[13]:
 
 
-max_agriculture_region()
+# the max agriculture methane producing region
+region_statistics.loc['Agriculture', ['argmax', 'max']]
 
 
 # In[14]:
 
 
-min_agriculture_region()
+# the min agriculture methane producing region
+region_statistics.loc['Agriculture', ['argmin', 'min']]
 
 
 # In[15]:
 
 
-mean_agriculture_emissions()
+# the mean agriculture methane emissions based on the regions
+region_statistics.loc['Agriculture', 'mean']
 
 
 # In[16]:
 
 
-median_agriculture_emissions()
+# the median agriculture methane emissions based on the regions
+region_statistics.loc['Agriculture', 'median']
 
 
 # In[18]:
 
 
 # plot the agriculture data per region in a bar chart
-agriculture_region_data1.plot(kind='barh', color = '#DC9C27')
-plt.title('Agriculture Methane Emissions Per Region 2019-2021')
-plt.xlabel('Emissions (kt)')
-plt.ylabel('')
+figures.agriculture_region_barh(agriculture_region_data1)
 plt.show()
 
 
@@ -289,72 +263,60 @@ plt.show()
 
 
 # choose all data with type energy, segment total and reason all
-energy_data = df.loc[(df['type'] == 'Energy')
-                     & (df['segment'] == 'Total')
-                     & (df['reason'] == 'All')]
+energy_data = cube.select(type='Energy', segment='Total', reason='All')
 # drop the World data
-energy_data_cleaned = energy_data.drop(energy_data[energy_data['region'] == 'World'].index, axis=0)
+energy_data_cleaned = cube.select(type='Energy', segment='Total', reason='All',
+                                  include_world=False)
 
 # sum up the energy emissions by region
-energy_region_data = energy_data_cleaned.groupby('region', as_index=False)['emissions'].sum()
+energy_region_data = cube.rollup('region', type='Energy', segment='Total', reason='All',
+                                 include_world=False)
 energy_region_data
 
 
 # In[20]:
 
 
-# create pivot table of energy emissions by region
-energy_region_data1 = pd.pivot_table(energy_region_data,
-                              values='emissions',
-                              index='region').sort_values(by=['emissions'],
-                                                         ascending=False)
+# table of energy emissions by region
+energy_region_data1 = cube.table('region', type='Energy', segment='Total', reason='All',
+                                 include_world=False).sort_values(by=['emissions'],
+                                                                  ascending=False)
 energy_region_data1
 
 
 # In[21]:
 
 
-# function to return the max energy methane producing region
-def max_energy_region():
-    max_energy_emission = energy_region_data['emissions'].max()
-    max_energy_region = energy_region_data.loc[energy_region_data['emissions'].idxmax(), 'region']
-    return max_energy_region, max_energy_emission
-# function to return the mean energy methane emissions based on the regions
-def mean_energy_emissions():
-    mean_energy_emission = energy_region_data['emissions'].mean()
-    return mean_energy_emission
-# function to return the median energy methane emissions based on the regions
-def median_energy_emissions():
-    median_energy_emissions = energy_region_data['emissions'].median()
-    return median_energy_emissions
+# the energy statistics are in region_statistics, computed above with the other types
+region_statistics.loc['Energy']
 
 
 # In[22]:
 
 
-max_energy_region()
+# the max energy methane producing region
+region_statistics.loc['Energy', ['argmax', 'max']]
 
 
 # In[23]:
 
 
-mean_energy_emissions()
+# the mean energy methane emissions based on the regions
+region_statistics.loc['Energy', 'mean']
 
 
 # In[24]:
 
 
-median_energy_emissions()
+# the median energy methane emissions based on the regions
+region_statistics.loc['Energy', 'median']
 
 
-# In[26]:
+# In[25]:
 
 
 # plot the energy emissions data per region in a bar chart
-energy_region_data1.plot(kind='barh', color = '#6FB646')
-plt.title('Energy Methane Emissions Per Region 2022')
-plt.xlabel('Emissions (kt)')
-plt.ylabel('')
+figures.energy_region_barh(energy_region_data1)
 plt.show()
 
 
@@ -398,23 +360,31 @@ plt.show()
 #     3. the least agriculture methane emissions?
 #     4. the least energy methane emissions?
 
+# In[26]:
+
+
+# rank the countries by their total methane emissions over all types
+# the ranking is computed once and shared by every top 5 view below
+top5 = top_emitters(cube, k=5)
+top5
+
+
 # In[27]:
 
 
 # total agriculture and energy data by top 5 country
-top5_country_data = df.loc[(df['country'].isin(['China', 'Russia', 'Brazil', 'India', 'United States']))
-                                & (df['segment'] == 'Total')
-                                & (df['type'].isin(['Agriculture', 'Energy']))].sort_values(by='country')
+top5_country_data = cube.select(country=top5,
+                                segment='Total',
+                                type=['Agriculture', 'Energy']).sort_values(by='country')
 top5_country_data
 
 
 # In[28]:
 
 
-# create pivot table of agriculture and energy data for top 5 countries
-top5_country_data1 = pd.pivot_table(top5_country_data,
-                              values=['emissions'],
-                              index=['country', 'type'])
+# table of agriculture and energy data for top 5 countries
+top5_country_data1 = cube.table(['country', 'type'], country=top5, segment='Total',
+                                type=['Agriculture', 'Energy'])
 top5_country_data1
 
 
@@ -452,12 +422,7 @@ top_energy_country()
 
 
 # plot the agriculture and energy data for top 5 countries in a stacked bar chart
-colors = ('#E7936B', '#5F93CB')
-ax = top5_country_data1.unstack().plot(kind='barh', stacked=True, color=colors)
-ax.set_xlabel('Emissions (kt)')
-ax.set_ylabel('')
-ax.set_title('Agriculture vs Energy Emissions of Top 5 Countries')
-ax.legend(title='Type', bbox_to_anchor=(1.0, 0.7), loc='upper left')
+figures.top_country_type_barh(top5_country_data1)
 plt.show()
 
 
@@ -523,18 +488,16 @@ plt.show()
 
 
 # Total emissions per emission type for top 5 countries
-top5_by_emission_type = df.loc[(df['country'].isin(['China', 'Russia', 'Brazil', 'India', 'United States']))
-                       & (df['segment'] == 'Total')].sort_values('country')
+top5_by_emission_type = cube.select(country=top5,
+                                    segment='Total').sort_values('country')
 top5_by_emission_type
 
 
 # In[37]:
 
 
-# create pivot table of emission type data for top 5 countries
-top5_by_emission_type1 = pd.pivot_table(top5_by_emission_type,
-                                     index='type', columns='country',
-                                     values='emissions')
+# table of emission type data for top 5 countries
+top5_by_emission_type1 = cube.table('type', columns='country', country=top5, segment='Total')
 top5_by_emission_type1
 
 
@@ -542,10 +505,7 @@ top5_by_emission_type1
 
 
 # create a heat map to convey emission types per top 5 countries
-sns.heatmap(top5_by_emission_type1, cmap='YlGnBu')
-plt.title('Methane Emissions by Top 5 Countries and Type')
-plt.xlabel('Country')
-plt.ylabel('Type')
+figures.top_country_type_heatmap(top5_by_emission_type1)
 plt.show()
 
 
@@ -587,8 +547,7 @@ plt.show()
 
 
 # energy types for segment Gas pipelines and LNG facilities
-energy_reasons = df.loc[(df['type'] =='Energy')
-                     & (df['segment'] == 'Gas pipelines and LNG facilities')]
+energy_reasons = cube.select(type='Energy', segment='Gas pipelines and LNG facilities')
 energy_reasons
 
 
@@ -596,20 +555,17 @@ energy_reasons
 
 
 # top 5 country energy type reasons for segment Gas pipelines and LNG facilities
-top5_by_energy_reasons = energy_reasons.loc[(energy_reasons['country'].isin(['China',
-                                                                             'Russia',
-                                                                             'Brazil',
-                                                                             'India',
-                                                                             'United States']))]
+top5_by_energy_reasons = cube.select(type='Energy', segment='Gas pipelines and LNG facilities',
+                                     country=top5)
 top5_by_energy_reasons
 
 
 # In[41]:
 
 
-# create pivot table of energy segment type data for top 5 countries by reason
-top5_by_energy_reasons1 = pd.pivot_table(top5_by_energy_reasons,
-                                         index='country', columns='reason')
+# table of energy segment type data for top 5 countries by reason
+top5_by_energy_reasons1 = cube.table('country', columns='reason', nest_values=True, type='Energy',
+                                     segment='Gas pipelines and LNG facilities', country=top5)
 top5_by_energy_reasons1
 
 
@@ -617,12 +573,7 @@ top5_by_energy_reasons1
 
 
 # plot the energy segment type data for top 5 countries in a stacked bar chart
-colors = ('#28920F', '#76D6F0')
-ax = top5_by_energy_reasons1.plot.bar(stacked=True, color=colors, figsize = (10,6))
-ax.set_xlabel('')
-ax.set_xticklabels(ax.get_xticklabels(), rotation=0)
-ax.set_ylabel('Emissions (kt)')
-ax.set_title('Fugitive vs Vented Energy Emissions for Top 5 Methane Emitter Countries')
+figures.top_country_reason_bar(top5_by_energy_reasons1)
 plt.show()
 
 
@@ -653,29 +604,20 @@ plt.show()
 # In[34]:
 
 
-# rename United States in dataframe to match the geopandas file
-renamed_df = df.replace('United States', 'United States of America')
-renamed_df
-
-
-# In[35]:
-
-
 # get the agriculture total data for each country
-countries_agriculture_emissions = renamed_df.loc[(renamed_df['type']=='Agriculture')
-                        & (renamed_df['segment'] == 'Total')]
-countries_agriculture_emissions = countries_agriculture_emissions.drop(
-    countries_agriculture_emissions[countries_agriculture_emissions['region'] == 'World'].index, axis=0)
+countries_agriculture_emissions = cube.select(type='Agriculture', segment='Total', include_world=False)
 countries_agriculture_emissions
 
 
 # In[36]:
 
 
-# create pivot table of agriculture total data for each country
-countries_agriculture_emissions1 = pd.pivot_table(countries_agriculture_emissions,
-                                                 index='country',
-                                                 values='emissions').sort_values(by='emissions')
+# table of agriculture total data for each country
+countries_agriculture_emissions1 = cube.table('country', type='Agriculture', segment='Total',
+                                              include_world=False).sort_values(by='emissions')
+
+# add the ISO 3166 code of each country to join on the geopandas file
+countries_agriculture_emissions1['iso_a3'] = iso_codes(countries_agriculture_emissions1.index)
 countries_agriculture_emissions1
 
 
@@ -683,15 +625,11 @@ countries_agriculture_emissions1
 
 
 # get the world map
-world = gpd.read_file(gpd.datasets.get_path('naturalearth_lowres'))
+world = load_geometry('medium')
 
 # merge the country shape file data with the agriculture emissions data for each country
-merged = world.merge(countries_agriculture_emissions1, left_on='name', right_on='country')
-
-# create a choropleth map
-fig, ax = plt.subplots(figsize=(10,8))
-merged.plot(column='emissions', cmap='Oranges', legend=True, ax=ax)
-ax.set_title('Agriculture Methane Emissions by Country')
+# and create a choropleth map
+figures.agriculture_choropleth(countries_agriculture_emissions1, world)
 plt.show()
 
 
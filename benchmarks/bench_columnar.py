@@ -0,0 +1,94 @@
+"""Compare the integer-coded columnar roll-ups with the pandas paths.
+
+The dataset is grown ``--scale`` times with ``synthetic.scale_frame``. Three
+paths compute the tables ``agriculture_region_data``,
+``energy_region_data`` and ``top5_country_data1``. The first filters the
+frame with masks and then runs a groupby, as the script first did. The second
+queries the ``EmissionsCube``. The third queries ``ColumnarEmissions``. The
+columnar results are first checked for equality with the cube's, exactly
+when coded from the cube and within float tolerance when coded from the
+rows, whose summation order differs.
+
+    python benchmarks/bench_columnar.py IEA-MethaneEmissionsComparison-World.csv --scale 100
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from pandas.testing import assert_frame_equal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from bench_cube import best_of  # noqa: E402
+from synthetic import scale_frame  # noqa: E402
+
+from methane_emissions.columnar import ColumnarEmissions  # noqa: E402
+from methane_emissions.cube import EmissionsCube  # noqa: E402
+from methane_emissions.loader import read_emissions_csv  # noqa: E402
+from methane_emissions.ranking import top_emitters  # noqa: E402
+
+TYPES = ('Agriculture', 'Energy')
+
+
+def frame_queries(df, top):
+    tables = []
+    for type in TYPES:
+        data = df.loc[(df['type'] == type) & (df['segment'] == 'Total') & (df['reason'] == 'All')]
+        data = data.drop(data[data['region'] == 'World'].index, axis=0)
+        tables.append(data.groupby('region', as_index=False, observed=True)['emissions'].sum())
+    top5 = df.loc[df['country'].isin(top) & (df['segment'] == 'Total')
+                  & df['type'].isin(list(TYPES))]
+    tables.append(top5.groupby(['country', 'type'], observed=True)[['emissions']].sum())
+    return tables
+
+
+def engine_queries(engine, top):
+    """The three tables from an ``EmissionsCube`` or a ``ColumnarEmissions``."""
+    tables = [engine.rollup('region', type=type, segment='Total', reason='All',
+                            include_world=False) for type in TYPES]
+    tables.append(engine.table(['country', 'type'], country=top, segment='Total',
+                               type=list(TYPES)))
+    return tables
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('csv')
+    parser.add_argument('--scale', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    df = scale_frame(read_emissions_csv(args.csv), args.scale)
+    cube = EmissionsCube.from_frame(df)
+    top = top_emitters(cube, k=5)
+
+    start = time.perf_counter()
+    cells = ColumnarEmissions.from_cube(cube)
+    coded_cube = time.perf_counter() - start
+    start = time.perf_counter()
+    rows = ColumnarEmissions.from_frame(df)
+    coded_rows = time.perf_counter() - start
+
+    expected = engine_queries(cube, top)
+    for table, cell_table, row_table in zip(expected, engine_queries(cells, top),
+                                            engine_queries(rows, top)):
+        assert_frame_equal(cell_table, table, check_exact=True)
+        assert_frame_equal(row_table, table, check_exact=False, rtol=1e-9)
+
+    frame = best_of(frame_queries, df, top, repeat=args.repeat)
+    cube_time = best_of(engine_queries, cube, top, repeat=args.repeat)
+    cell_time = best_of(engine_queries, cells, top, repeat=args.repeat)
+    row_time = best_of(engine_queries, rows, top, repeat=args.repeat)
+    print(f'rows: {len(df):,}  cube cells: {len(cube):,}  '
+          f'columnar bytes: {rows.nbytes / 2**20:.1f} MiB rows, {cells.nbytes / 2**20:.1f} MiB cells')
+    print(f'coding       : {coded_rows * 1000:8.2f} ms rows, {coded_cube * 1000:.2f} ms cells, once')
+    print(f'frame masks  : {frame * 1000:8.2f} ms per run')
+    print(f'cube groupby : {cube_time * 1000:8.2f} ms per run')
+    print(f'columnar rows: {row_time * 1000:8.2f} ms per run ({frame / row_time:.1f}x vs masks)')
+    print(f'columnar cube: {cell_time * 1000:8.2f} ms per run ({cube_time / cell_time:.1f}x vs cube)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Compare the mask-based analysis filters with EmissionsCube queries.
+
+The dataset is grown ``--scale`` times with ``synthetic.scale_frame``. Then
+both paths run the seven queries the script needs.
+
+    python benchmarks/bench_cube.py IEA-MethaneEmissionsComparison-World.csv --scale 100
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from methane_emissions.cube import EmissionsCube  # noqa: E402
+from methane_emissions.loader import read_emissions_csv  # noqa: E402
+from synthetic import scale_frame  # noqa: E402
+
+TOP5 = ['China', 'Russia', 'Brazil', 'India', 'United States']
+GAS = 'Gas pipelines and LNG facilities'
+
+
+def mask_queries(df):
+    world = df.loc[(df['region'] == 'World') & (df['segment'] == 'Total')]
+    agriculture = df.loc[(df['type'] == 'Agriculture') & (df['segment'] == 'Total')
+                         & (df['reason'] == 'All')]
+    agriculture = agriculture.drop(agriculture[agriculture['region'] == 'World'].index, axis=0)
+    agriculture = agriculture.groupby('region', as_index=False, observed=True)['emissions'].sum()
+    energy = df.loc[(df['type'] == 'Energy') & (df['segment'] == 'Total') & (df['reason'] == 'All')]
+    energy = energy.drop(energy[energy['region'] == 'World'].index, axis=0)
+    energy = energy.groupby('region', as_index=False, observed=True)['emissions'].sum()
+    top5 = df.loc[df['country'].isin(TOP5) & (df['segment'] == 'Total')
+                  & df['type'].isin(['Agriculture', 'Energy'])]
+    top5_types = df.loc[df['country'].isin(TOP5) & (df['segment'] == 'Total')]
+    reasons = df.loc[(df['type'] == 'Energy') & (df['segment'] == GAS)]
+    reasons = reasons.loc[reasons['country'].isin(TOP5)]
+    countries = df.loc[(df['type'] == 'Agriculture') & (df['segment'] == 'Total')]
+    countries = countries.drop(countries[countries['region'] == 'World'].index, axis=0)
+    return world, agriculture, energy, top5, top5_types, reasons, countries
+
+
+def cube_queries(cube):
+    world = cube.select_series(region='World', segment='Total')
+    agriculture = cube.rollup('region', type='Agriculture', segment='Total', reason='All',
+                              include_world=False)
+    energy = cube.rollup('region', type='Energy', segment='Total', reason='All',
+                         include_world=False)
+    top5 = cube.select_series(country=TOP5, segment='Total', type=['Agriculture', 'Energy'])
+    top5_types = cube.select_series(country=TOP5, segment='Total')
+    reasons = cube.select_series(type='Energy', segment=GAS, country=TOP5)
+    countries = cube.select_series(type='Agriculture', segment='Total', include_world=False)
+    return world, agriculture, energy, top5, top5_types, reasons, countries
+
+
+def best_of(func, *args, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('csv')
+    parser.add_argument('--scale', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    df = scale_frame(read_emissions_csv(args.csv), args.scale)
+    start = time.perf_counter()
+    cube = EmissionsCube.from_frame(df)
+    build = time.perf_counter() - start
+
+    masks = best_of(mask_queries, df, repeat=args.repeat)
+    queries = best_of(cube_queries, cube, repeat=args.repeat)
+    print(f'rows: {len(df):,}  cube cells: {len(cube):,}')
+    print(f'mask filters : {masks * 1000:8.2f} ms per run')
+    print(f'cube build   : {build * 1000:8.2f} ms once')
+    print(f'cube queries : {queries * 1000:8.2f} ms per run ({masks / queries:.1f}x faster)')
+
+
+if __name__ == '__main__':
+    main()
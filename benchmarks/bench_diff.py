@@ -0,0 +1,83 @@
+"""Time the vintage diff on a synthetic pair of million-row vintages.
+
+The old vintage is the real dataset grown ``--scale`` times with
+``synthetic.scale_frame``. The new vintage revises a tenth of its
+emissions by up to 5%, drops ``--removed`` rows and adds ``--added``
+rows from renamed countries. The row level of ``diff_frames`` is first
+checked against a pandas outer merge on the five keys. Then the diff is
+timed against that merge, which gives only the row level.
+
+    python benchmarks/bench_diff.py IEA-MethaneEmissionsComparison-World.csv --scale 1800
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from bench_cube import best_of  # noqa: E402
+from synthetic import scale_frame  # noqa: E402
+
+from methane_emissions.diff import DIFF_KEYS, ROW_LEVEL, diff_frames  # noqa: E402
+from methane_emissions.loader import read_emissions_csv  # noqa: E402
+
+
+def revise(old, added, removed, seed=0):
+    """Return a new vintage: revised emissions, ``removed`` rows dropped, ``added`` rows new."""
+    rng = np.random.default_rng(seed)
+    new = old.copy()
+    revised = rng.random(len(new)) < 0.1
+    factors = np.where(revised, rng.uniform(0.95, 1.05, len(new)), 1.0)
+    new['emissions'] = (new['emissions'] * factors).astype(new['emissions'].dtype)
+    new = new.iloc[np.sort(rng.choice(len(new), len(new) - removed, replace=False))]
+    extra = old[old['region'] != 'World'].iloc[:added].copy()
+    extra['country'] = extra['country'].cat.rename_categories(lambda name: f'{name} (new)')
+    return pd.concat([new, extra], ignore_index=True).astype({key: 'category' for key in DIFF_KEYS})
+
+
+def merge_diff(old, new):
+    """The row level with an outer merge, as the comparison would be written in pandas."""
+    keys = DIFF_KEYS
+    merged = pd.merge(old.groupby(keys, observed=True, dropna=False)['emissions'].sum(),
+                      new.groupby(keys, observed=True, dropna=False)['emissions'].sum(),
+                      how='outer', left_index=True, right_index=True, suffixes=('_old', '_new'),
+                      indicator=True)
+    merged['delta'] = merged['emissions_new'].fillna(0) - merged['emissions_old'].fillna(0)
+    return merged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('csv')
+    parser.add_argument('--scale', type=int, default=1800)
+    parser.add_argument('--added', type=int, default=1000)
+    parser.add_argument('--removed', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    old = scale_frame(read_emissions_csv(args.csv), args.scale)
+    new = revise(old, args.added, args.removed)
+
+    diff = diff_frames(old, new)
+    rows = diff.level(ROW_LEVEL)
+    expected = merge_diff(old, new)
+    assert len(rows) == len(expected)
+    assert (rows['status'] == 'added').sum() == (expected['_merge'] == 'right_only').sum()
+    assert (rows['status'] == 'removed').sum() == (expected['_merge'] == 'left_only').sum()
+    np.testing.assert_allclose(np.sort(rows['delta'].to_numpy()),
+                               np.sort(expected['delta'].to_numpy()), rtol=1e-9, atol=1e-6)
+
+    diff_time = best_of(diff_frames, old, new, repeat=args.repeat)
+    merge_time = best_of(merge_diff, old, new, repeat=args.repeat)
+    print(f'rows: {len(old):,} old, {len(new):,} new  groups: {len(diff.table):,}')
+    print(diff)
+    print(f'outer merge, rows only : {merge_time:8.3f} s')
+    print(f'diff_frames, all levels: {diff_time:8.3f} s ({merge_time / diff_time:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Load-test the query service and report latency percentiles and throughput.
+
+``--concurrency`` clients each hold one keep-alive connection. Each client
+sends requests from a fixed mix of the service's queries, one after
+another, until ``--requests`` have been answered in total. The latency of
+every request is recorded, and p50/p90/p99, the maximum and requests per
+second are reported overall and per endpoint.
+
+    python -m methane_emissions.service IEA-MethaneEmissionsComparison-World.csv --port 8080 &
+    python benchmarks/load_test.py --port 8080 --requests 20000 --concurrency 64
+
+With ``--revalidate`` the clients send ``If-None-Match`` with the ETag they
+got last, so the 304 path is measured instead.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict
+from urllib.parse import quote
+
+import numpy as np
+
+QUERIES = [
+    '/top?n=5',
+    '/top?n=10&type=Energy',
+    '/top?n=5&type=Agriculture&baseYear=2022',
+    '/regions',
+    '/regions?type=Agriculture',
+    '/regions?type=Energy',
+    '/countries/China',
+    '/countries/' + quote('United States'),
+    '/reasons?type=Energy',
+    '/reasons?type=Energy&segment=' + quote('Gas pipelines and LNG facilities') + '&country=China',
+    '/regions?type=Energy&format=arrow',
+]
+
+
+async def _request(reader, writer, host, target, etag=None):
+    lines = [f'GET {target} HTTP/1.1', f'Host: {host}']
+    if etag:
+        lines.append(f'If-None-Match: {etag}')
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('etag')
+
+
+async def _client(host, port, queries, counter, latencies, statuses, revalidate):
+    reader, writer = await asyncio.open_connection(host, port)
+    etags = {}
+    try:
+        i = 0
+        while counter[0] > 0:
+            counter[0] -= 1
+            target = queries[i % len(queries)]
+            i += 1
+            start = time.perf_counter()
+            status, etag = await _request(reader, writer, host, target,
+                                          etags.get(target) if revalidate else None)
+            latencies[target.split('?')[0]].append(time.perf_counter() - start)
+            statuses[status] += 1
+            if etag:
+                etags[target] = etag
+    finally:
+        writer.close()
+
+
+async def run(host, port, requests, concurrency, revalidate=False, queries=QUERIES):
+    """Send ``requests`` requests over ``concurrency`` connections and return the statistics."""
+    counter = [requests]
+    latencies = defaultdict(list)
+    statuses = defaultdict(int)
+    # each client starts at a different query, so the mix is spread evenly over time
+    rotations = [queries[i % len(queries):] + queries[:i % len(queries)] for i in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, rotation, counter, latencies, statuses, revalidate)
+                           for rotation in rotations))
+    seconds = time.perf_counter() - start
+    every = np.concatenate([np.asarray(values) for values in latencies.values()])
+    return {
+        'requests': int(len(every)),
+        'concurrency': concurrency,
+        'seconds': seconds,
+        'rps': len(every) / seconds,
+        'statuses': dict(statuses),
+        'latency_ms': _percentiles(every),
+        'endpoints': {path: _percentiles(np.asarray(values)) for path, values in latencies.items()},
+    }
+
+
+def _percentiles(seconds):
+    p50, p90, p99 = np.percentile(seconds, [50, 90, 99]) * 1000
+    return {'p50': p50, 'p90': p90, 'p99': p99, 'max': seconds.max() * 1000}
+
+
+def format_report(report):
+    lines = [f'{report["requests"]:,} requests over {report["concurrency"]} connections in '
+             f'{report["seconds"]:.2f} s: {report["rps"]:,.0f} requests/s',
+             f'statuses: {report["statuses"]}',
+             f'{"endpoint":<30} {"p50 ms":>9} {"p90 ms":>9} {"p99 ms":>9} {"max ms":>9}']
+    rows = [('all', report['latency_ms'])] + sorted(report['endpoints'].items())
+    for path, stats in rows:
+        lines.append(f'{path:<30} {stats["p50"]:9.3f} {stats["p90"]:9.3f} {stats["p99"]:9.3f} '
+                     f'{stats["max"]:9.3f}')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test the emissions query service.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('-n', '--requests', type=int, default=10_000)
+    parser.add_argument('-c', '--concurrency', type=int, default=32)
+    parser.add_argument('--revalidate', action='store_true',
+                        help='send If-None-Match to measure 304 responses')
+    parser.add_argument('-o', '--output', help='also write the report as JSON')
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args.host, args.port, args.requests, args.concurrency,
+                             args.revalidate))
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
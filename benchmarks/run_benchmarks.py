@@ -0,0 +1,308 @@
+"""Time and memory-profile every stage of the analysis on scaled datasets.
+
+For each scale a synthetic dataset is written with ``synthetic.py``, and
+every stage of the script runs on it: the load and drop, the
+world/agriculture/energy/top-5/reasons filters, the cube and its
+chart tables, each original ``pd.pivot_table``, the map merge and each figure. Each stage gets a
+best-of-N wall time and, in a separate run under ``tracemalloc``, its peak
+allocation. A stage that raises is recorded with its error, and the run
+carries on. The results are written to JSON. With ``--baseline``, every
+stage is compared with an earlier run's JSON, for example one written on
+the main branch, and the exit code is 1 if any stage regressed.
+
+    python benchmarks/run_benchmarks.py IEA-MethaneEmissionsComparison-World.csv --scales 1 100 -o main.json
+    python benchmarks/run_benchmarks.py IEA-MethaneEmissionsComparison-World.csv --scales 1 100 --baseline main.json
+
+Above ``--max-rows`` only the streaming stage runs, because the in-memory
+stages would not fit.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from bench_cube import GAS, TOP5, cube_queries  # noqa: E402
+from synthetic import write_scaled_csv  # noqa: E402
+
+from methane_emissions.countries import iso_codes  # noqa: E402
+from methane_emissions.cube import EmissionsCube  # noqa: E402
+from methane_emissions.loader import load_emissions, read_emissions_csv  # noqa: E402
+from methane_emissions.streaming import stream_aggregates  # noqa: E402
+from methane_emissions.tables import chart_tables  # noqa: E402
+
+TEMPLATE_ROWS = 1548
+
+
+def stages(csv_path, cache_path, out_dir):
+    """Return the (name, function) stages in pipeline order.
+
+    Each function takes the shared state dict, stores its outputs in it for
+    later stages, and returns the number of rows it produced.
+    """
+    def read_csv(state):
+        state['raw'] = pd.read_csv(csv_path)
+        return len(state['raw'])
+
+    def drop(state):
+        state['df'] = state['raw'].drop(['notes', 'source'], axis=1, errors='ignore')
+        return len(state['df'])
+
+    def typed_csv(state):
+        state['typed'] = read_emissions_csv(csv_path)
+        return len(state['typed'])
+
+    def arrow_cache(state):
+        load_emissions(csv_path, cache_path=cache_path)  # make sure the cache exists
+        state['typed'] = load_emissions(csv_path, cache_path=cache_path)
+        return len(state['typed'])
+
+    def world(state):
+        df = state['df']
+        state['world_data'] = df.loc[(df['region'] == 'World') & (df['segment'] == 'Total')]
+        return len(state['world_data'])
+
+    def region_filter(type):
+        def run(state):
+            df = state['df']
+            data = df.loc[(df['type'] == type) & (df['segment'] == 'Total') & (df['reason'] == 'All')]
+            cleaned = data.drop(data[data['region'] == 'World'].index, axis=0)
+            state[f'{type}_region_data'] = cleaned.groupby('region', as_index=False)['emissions'].sum()
+            return len(cleaned)
+        return run
+
+    def top5(state):
+        df = state['df']
+        state['top5_country_data'] = df.loc[df['country'].isin(TOP5) & (df['segment'] == 'Total')
+                                            & df['type'].isin(['Agriculture', 'Energy'])]
+        return len(state['top5_country_data'])
+
+    def top5_by_type(state):
+        df = state['df']
+        state['top5_by_emission_type'] = df.loc[df['country'].isin(TOP5) & (df['segment'] == 'Total')]
+        return len(state['top5_by_emission_type'])
+
+    def reasons(state):
+        df = state['df']
+        energy_reasons = df.loc[(df['type'] == 'Energy') & (df['segment'] == GAS)]
+        state['top5_by_energy_reasons'] = energy_reasons.loc[energy_reasons['country'].isin(TOP5)]
+        return len(state['top5_by_energy_reasons'])
+
+    def countries(state):
+        df = state['df']
+        data = df.loc[(df['type'] == 'Agriculture') & (df['segment'] == 'Total')]
+        state['countries_agriculture_emissions'] = data.drop(data[data['region'] == 'World'].index,
+                                                             axis=0)
+        return len(state['countries_agriculture_emissions'])
+
+    def cube_build(state):
+        state['cube'] = EmissionsCube.from_frame(state['typed'])
+        return len(state['cube'])
+
+    def cube_query(state):
+        return sum(len(result) for result in cube_queries(state['cube']))
+
+    def cube_tables(state):
+        return sum(len(table) for table in chart_tables(state['cube']).values())
+
+    def pivot(name, source, **kwargs):
+        def run(state):
+            state[name] = pd.pivot_table(state[source], **kwargs)
+            return len(state[name])
+        return run
+
+    def merge(state):
+        from methane_emissions.geometry import load_geometry
+
+        table = state['countries_agriculture_emissions1'].copy()
+        table['iso_a3'] = iso_codes(table.index).astype(object)
+        state['merged'] = load_geometry('medium').merge(table, on='iso_a3')
+        return len(state['merged'])
+
+    def figure(name, table_name):
+        def run(state):
+            from methane_emissions import figures
+            from methane_emissions.render import FigureSpec, render_figure
+
+            table = state[table_name]
+            if name == 'agriculture_choropleth':
+                table = table.assign(iso_a3=iso_codes(table.index))
+            result = render_figure(FigureSpec(name, getattr(figures, name), table), out_dir)
+            if result.error:
+                raise RuntimeError(result.error)
+            return 1
+        return run
+
+    def streaming(state):
+        return int(stream_aggregates(csv_path)['count'].sum())
+
+    return [
+        ('load.read_csv', read_csv),
+        ('load.drop', drop),
+        ('load.typed_csv', typed_csv),
+        ('load.arrow_cache', arrow_cache),
+        ('filter.world', world),
+        ('filter.agriculture', region_filter('Agriculture')),
+        ('filter.energy', region_filter('Energy')),
+        ('filter.top5', top5),
+        ('filter.top5_by_type', top5_by_type),
+        ('filter.reasons', reasons),
+        ('filter.countries_agriculture', countries),
+        ('cube.build', cube_build),
+        ('cube.queries', cube_query),
+        ('cube.chart_tables', cube_tables),
+        ('pivot.world_emissions_data', pivot('world_emissions_data', 'world_data',
+                                             values='emissions', index='type')),
+        ('pivot.agriculture_region_data1', pivot('agriculture_region_data1',
+                                                 'Agriculture_region_data',
+                                                 index='region', values='emissions')),
+        ('pivot.energy_region_data1', pivot('energy_region_data1', 'Energy_region_data',
+                                            index='region', values='emissions')),
+        ('pivot.top5_country_data1', pivot('top5_country_data1', 'top5_country_data',
+                                           values=['emissions'], index=['country', 'type'])),
+        ('pivot.top5_by_emission_type1', pivot('top5_by_emission_type1', 'top5_by_emission_type',
+                                               index='type', columns='country',
+                                               values='emissions')),
+        ('pivot.top5_by_energy_reasons1', pivot('top5_by_energy_reasons1',
+                                                'top5_by_energy_reasons', values=['emissions'],
+                                                index='country', columns='reason')),
+        ('pivot.countries_agriculture_emissions1', pivot('countries_agriculture_emissions1',
+                                                         'countries_agriculture_emissions',
+                                                         index='country', values='emissions')),
+        ('merge.world', merge),
+        ('figure.world_types_pie', figure('world_types_pie', 'world_data')),
+        ('figure.agriculture_region_barh', figure('agriculture_region_barh',
+                                                  'agriculture_region_data1')),
+        ('figure.energy_region_barh', figure('energy_region_barh', 'energy_region_data1')),
+        ('figure.top_country_type_barh', figure('top_country_type_barh', 'top5_country_data1')),
+        ('figure.top_country_type_heatmap', figure('top_country_type_heatmap',
+                                                   'top5_by_emission_type1')),
+        ('figure.top_country_reason_bar', figure('top_country_reason_bar',
+                                                 'top5_by_energy_reasons1')),
+        ('figure.agriculture_choropleth', figure('agriculture_choropleth',
+                                                 'countries_agriculture_emissions1')),
+        ('stream.aggregates', streaming),
+    ]
+
+
+def measure(func, state, repeat):
+    """Return best-of-``repeat`` seconds, peak traced bytes and the output row count."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = func(state)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'seconds': best, 'peak_bytes': peak, 'rows_out': rows}
+
+
+def run_scale(template, scale, workdir, repeat, max_rows):
+    csv_path = os.path.join(workdir, f'synthetic-{scale}x.csv')
+    write_scaled_csv(template, csv_path, scale)
+    rows = sum(1 for _ in open(csv_path)) - 1
+    result = {'scale': scale, 'rows': rows, 'stages': {}, 'skipped': []}
+    state = {}
+    for name, func in stages(csv_path, csv_path + '.arrow', workdir):
+        if rows > max_rows and name != 'stream.aggregates':
+            result['skipped'].append(name)
+            continue
+        try:
+            result['stages'][name] = measure(func, state, repeat)
+        except Exception as exc:  # recorded per stage, the run carries on
+            result['stages'][name] = {'error': f'{type(exc).__name__}: {exc}'}
+            print(f'{scale:>9}x {name:<42} {"failed":>13}  {result["stages"][name]["error"]}',
+                  file=sys.stderr)
+            continue
+        print(f'{scale:>9}x {name:<42} {result["stages"][name]["seconds"] * 1000:10.2f} ms',
+              file=sys.stderr)
+    os.remove(csv_path)
+    return result
+
+
+def compare(results, baseline, tolerance, floor):
+    """Return (scale, stage, baseline seconds, seconds, ratio) for every regressed stage."""
+    regressions = []
+    for key, result in results['results'].items():
+        base = baseline.get('results', {}).get(key)
+        if not base:
+            continue
+        for stage, timing in result['stages'].items():
+            before = base['stages'].get(stage)
+            if not before or 'seconds' not in before or 'seconds' not in timing:
+                continue
+            ratio = timing['seconds'] / before['seconds'] if before['seconds'] else float('inf')
+            if ratio > 1 + tolerance and timing['seconds'] - before['seconds'] > floor:
+                regressions.append((key, stage, before['seconds'], timing['seconds'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark every analysis stage.')
+    parser.add_argument('template', help='the real CSV, used as the synthetic data template')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 100],
+                        help='multiples of the dataset size, e.g. 1 100 10000 1000000')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-rows', type=int, default=20_000_000,
+                        help='above this only the streaming stage runs')
+    parser.add_argument('-o', '--output', default='benchmark-results.json')
+    parser.add_argument('--baseline', help='earlier results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown as a fraction of the baseline time')
+    parser.add_argument('--floor', type=float, default=0.005,
+                        help='ignore slowdowns smaller than this many seconds')
+    args = parser.parse_args(argv)
+
+    import matplotlib
+    matplotlib.use('Agg')
+
+    results = {
+        'meta': {
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'template_rows': TEMPLATE_ROWS,
+        },
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in args.scales:
+            results['results'][f'{scale}x'] = run_scale(args.template, scale, workdir,
+                                                        args.repeat, args.max_rows)
+    with open(args.output, 'w') as handle:
+        json.dump(results, handle, indent=2)
+    print(f'results written to {args.output}')
+    failed = [(key, stage, timing['error']) for key, result in results['results'].items()
+              for stage, timing in result['stages'].items() if 'error' in timing]
+    for key, stage, error in failed:
+        print(f'FAILED {key} {stage}: {error}')
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        regressions = compare(results, baseline, args.tolerance, args.floor)
+        for scale, stage, before, after, ratio in regressions:
+            print(f'REGRESSION {scale} {stage}: {before * 1000:.2f} ms -> '
+                  f'{after * 1000:.2f} ms ({ratio:.2f}x)')
+        if regressions:
+            return 1
+        print('no regressions against', args.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
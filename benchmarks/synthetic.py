@@ -0,0 +1,90 @@
+"""Synthetic IEA-shaped datasets at any multiple of the real dataset's size.
+
+The template (the real CSV) is repeated ``scale`` times. Each copy renames
+its countries with a ``#i`` suffix, so every copy adds new keys while the
+schema, the regions/types/segments/reasons and their proportions stay the
+same. The World rows are written once, with emissions multiplied by the
+scale, so they still equal the sum of the regions. The CSV keeps the
+``source`` and ``notes`` columns of the IEA file (filled in when the
+template lacks them), so the loaders read and drop them as on the real data.
+
+Small scales are built in memory with ``scale_frame``. ``write_scaled_csv``
+streams copies to disk in batches, so even the 1,000,000x file (about 1.5
+billion rows) is written in bounded memory.
+
+    python benchmarks/synthetic.py IEA-MethaneEmissionsComparison-World.csv --scale 10000 -o synthetic-10000x.csv
+"""
+
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from methane_emissions.loader import CATEGORY_COLUMNS  # noqa: E402
+
+SCALES = (1, 100, 10_000, 1_000_000)
+# the column order of the IEA file, including the columns the loader skips
+RAW_COLUMNS = ['region', 'country', 'emissions', 'source', 'type', 'segment', 'reason',
+               'baseYear', 'notes']
+
+
+def _split_world(df):
+    world = df['region'] == 'World'
+    return df[~world], df[world]
+
+
+def _copy(countries, i):
+    copy = countries.copy()
+    if i:
+        copy['country'] = copy['country'].cat.rename_categories(lambda name: f'{name} #{i}')
+    return copy
+
+
+def scale_frame(df, scale):
+    """Return ``df`` grown ``scale`` times, as a typed frame in memory."""
+    countries, world = _split_world(df)
+    world = world.assign(emissions=world['emissions'] * scale)
+    tiled = pd.concat([_copy(countries, i) for i in range(scale)] + [world], ignore_index=True)
+    return tiled.astype({column: 'category' for column in CATEGORY_COLUMNS})
+
+
+def read_raw_template(template):
+    """Read every column of the template, adding ``source`` and ``notes`` if it lacks them."""
+    df = pd.read_csv(template, dtype={'country': 'category'})
+    if 'source' not in df:
+        df['source'] = 'IEA'
+    if 'notes' not in df:
+        df['notes'] = ''
+    return df[RAW_COLUMNS + [column for column in df if column not in RAW_COLUMNS]]
+
+
+def write_scaled_csv(template, path, scale, batch=100):
+    """Write the template grown ``scale`` times to ``path``, ``batch`` copies at a time."""
+    df = read_raw_template(template)
+    countries, world = _split_world(df)
+    header = True
+    for start in range(0, scale, batch):
+        copies = pd.concat([_copy(countries, i) for i in range(start, min(start + batch, scale))])
+        copies.to_csv(path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+    world.assign(emissions=world['emissions'] * scale).to_csv(path, mode='a', header=False,
+                                                              index=False)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write a synthetic scaled copy of the dataset.')
+    parser.add_argument('template')
+    parser.add_argument('--scale', type=int, default=100)
+    parser.add_argument('-o', '--output')
+    parser.add_argument('--batch', type=int, default=100, help='copies written per batch')
+    args = parser.parse_args(argv)
+    output = args.output or f'synthetic-{args.scale}x.csv'
+    print(write_scaled_csv(args.template, output, args.scale, args.batch))
+
+
+if __name__ == '__main__':
+    main()
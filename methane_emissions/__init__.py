@@ -0,0 +1,9 @@
+"""Analysis of the IEA Methane Tracker emissions comparison dataset."""
+
+from .cube import EmissionsCube
+from .loader import load_emissions
+from .ranking import top_emitters
+from .report import analyze
+from .stats import emission_statistics
+
+__all__ = ['EmissionsCube', 'analyze', 'emission_statistics', 'load_emissions', 'top_emitters']
@@ -0,0 +1,300 @@
+"""Per-region and per-country reports generated on a process pool.
+
+The cube is copied once into a ``multiprocessing.shared_memory`` block that
+holds the emissions values and the six level-code arrays. Each worker
+attaches to the block in its initializer and wraps it in an
+``EmissionsCube``, so a task carries only the entity it reports on, never
+the data. Every task computes that entity's tables, writes them as CSV and
+renders its figures on the Agg backend. The number of submitted tasks is
+capped at twice the number of workers, and progress is printed as they
+finish.
+
+    python -m methane_emissions.batch IEA-MethaneEmissionsComparison-World.csv -o reports -j 8 --countries 20
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from . import figures, profiling
+from .countries import AGGREGATE_COUNTRIES
+from .cube import KEYS, WORLD, EmissionsCube
+from .ranking import largest
+from .render import FigureSpec, render_figure, use_agg
+from .reshape import sum_table
+from .stats import ALL_REASONS, TOTAL_SEGMENT, leaf_mask
+from .tables import GAS_SEGMENT
+
+KINDS = ('region', 'country')
+
+
+class SharedCube:
+    """A cube's values and level codes in one shared-memory block.
+
+    The block holds ``n`` float64 values followed by ``len(KEYS)`` int32
+    code arrays of length ``n``. ``handle`` is the small picklable
+    description that workers pass to ``attach``.
+    """
+
+    def __init__(self, cube):
+        index = cube.series.index
+        n = len(cube)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(n * (8 + 4 * len(KEYS)), 1))
+        values, codes = _views(self.shm.buf, n)
+        values[:] = cube.series.to_numpy(dtype='float64')
+        for i, level_codes in enumerate(index.codes):
+            codes[i] = level_codes
+        self.handle = (self.shm.name, n, list(index.levels))
+
+    @staticmethod
+    def attach(handle):
+        """Return the (SharedMemory, EmissionsCube) for a ``handle``, without copying the values."""
+        name, n, levels = handle
+        shm = shared_memory.SharedMemory(name=name)
+        values, codes = _views(shm.buf, n)
+        index = pd.MultiIndex(levels=levels, codes=list(codes), names=KEYS, verify_integrity=False)
+        return shm, EmissionsCube(pd.Series(values, index=index, name='emissions', copy=False))
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _views(buffer, n):
+    values = np.ndarray((n,), dtype='float64', buffer=buffer)
+    codes = np.ndarray((len(KEYS), n), dtype='int32', buffer=buffer, offset=8 * n)
+    return values, codes
+
+
+@dataclass
+class EntityResult:
+    """The outcome of one region or country report."""
+
+    kind: str
+    name: str
+    seconds: float = 0.0
+    tables: list = field(default_factory=list)
+    figures: list = field(default_factory=list)
+    error: str = None
+
+
+def slug(name):
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def _top_countries(cube, k, **filters):
+    totals = cube.table('country', segment=TOTAL_SEGMENT, reason=ALL_REASONS, include_world=False,
+                        **filters)['emissions']
+    totals = totals[~totals.index.isin(list(AGGREGATE_COUNTRIES))]
+    return pd.Index(totals.index.take(largest(totals.to_numpy(), k)), name='country')
+
+
+def entity_tables(cube, kind, name, k=5):
+    """Return the report tables of one region or country, keyed by table name."""
+    if kind not in KINDS:
+        raise ValueError(f'unknown report kind {kind!r}; expected one of {KINDS}')
+    entity = {kind: name}
+    energy = cube.select_series(type='Energy', include_world=False, **entity)
+    tables = {
+        'type_data': cube.rollup('type', segment=TOTAL_SEGMENT, reason=ALL_REASONS,
+                                 include_world=False, **entity)
+                         .sort_values(by='emissions', ascending=False),
+        # leaf cells only, so a segment's All row is not stacked on its itemized reasons
+        'energy_segment_reasons': sum_table(energy[leaf_mask(energy.index)], 'segment', 'reason')
+                                      .drop(index=TOTAL_SEGMENT, errors='ignore'),
+    }
+    if kind == 'region':
+        for type in ('Agriculture', 'Energy'):
+            tables[f'{type.lower()}_country_data'] = (
+                cube.table('country', type=type, segment=TOTAL_SEGMENT, reason=ALL_REASONS,
+                           include_world=False, **entity)
+                    .sort_values(by='emissions', ascending=False))
+        top = _top_countries(cube, k, **entity)
+        tables['top_by_emission_type'] = cube.table('type', columns='country', country=top,
+                                                    segment=TOTAL_SEGMENT, reason=ALL_REASONS)
+        tables['top_by_energy_reasons'] = cube.table('country', columns='reason',
+                                                     nest_values=True, type='Energy',
+                                                     segment=GAS_SEGMENT, country=top)
+    return tables
+
+
+def entity_figures(kind, name, tables):
+    """Return the figure specs of one entity's report, skipping empty tables."""
+    specs = [
+        FigureSpec('type_pie', figures.world_types_pie, tables['type_data'],
+                   {'title': f'Methane Emissions per Type in {name}'}),
+        FigureSpec('energy_segment_reasons', figures.segment_reason_bar,
+                   tables['energy_segment_reasons'],
+                   {'title': f'Energy Methane Emissions by Segment and Reason in {name}'}),
+    ]
+    if kind == 'region':
+        specs += [
+            FigureSpec('agriculture_country_barh', figures.region_barh,
+                       tables['agriculture_country_data'],
+                       {'title': f'Agriculture Methane Emissions in {name}',
+                        'color': figures.AGRICULTURE_COLOR}),
+            FigureSpec('energy_country_barh', figures.region_barh, tables['energy_country_data'],
+                       {'title': f'Energy Methane Emissions in {name}',
+                        'color': figures.ENERGY_COLOR}),
+            FigureSpec('top_country_type_heatmap', figures.top_country_type_heatmap,
+                       tables['top_by_emission_type']),
+            FigureSpec('top_country_reason_bar', figures.top_country_reason_bar,
+                       tables['top_by_energy_reasons']),
+        ]
+    return [spec for spec in specs if len(spec.table)]
+
+
+_worker_cube = None
+_worker_shm = None
+
+
+def _init_worker(handle):
+    global _worker_cube, _worker_shm
+    use_agg()
+    profiling.init_worker()
+    _worker_shm, _worker_cube = SharedCube.attach(handle)
+
+
+def entity_report(kind, name, out_dir, formats=('png',), dpi=150, k=5, cube=None):
+    """Write one entity's tables and figures under ``out_dir/<kind>/<slug>``."""
+    cube = cube if cube is not None else _worker_cube
+    start = time.perf_counter()
+    result = EntityResult(kind, name)
+    directory = os.path.join(out_dir, kind, slug(name))
+    try:
+        os.makedirs(directory, exist_ok=True)
+        tables = entity_tables(cube, kind, name, k)
+        for table_name, table in tables.items():
+            path = os.path.join(directory, f'{table_name}.csv')
+            table.to_csv(path)
+            result.tables.append(path)
+        for spec in entity_figures(kind, name, tables):
+            rendered = render_figure(spec, directory, formats, dpi)
+            if rendered.error:
+                raise RuntimeError(f'{spec.name}: {rendered.error}')
+            result.figures.extend(rendered.paths)
+    except Exception as exc:  # reported per entity, the batch carries on
+        result.error = f'{type(exc).__name__}: {exc}'
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def entity_names(cube, kind):
+    """Return the names a ``kind`` report can be generated for: the cube's regions
+    (without World) or countries."""
+    if kind not in KINDS:
+        raise ValueError(f'unknown report kind {kind!r}; expected one of {KINDS}')
+    names = cube.series.index.unique(kind).dropna()
+    return sorted(str(name) for name in names if name != WORLD)
+
+
+def unknown_entities(cube, entities):
+    """Return the (kind, name) pairs of ``entities`` that are not in the cube."""
+    valid = {kind: set(entity_names(cube, kind)) for kind in {kind for kind, _ in entities}}
+    return [(kind, name) for kind, name in entities if name not in valid[kind]]
+
+
+def default_entities(cube, countries=20):
+    """Every region except World, and the ``countries`` largest emitting countries."""
+    regions = [region for region in cube.series.index.unique('region').dropna()
+               if region != WORLD]
+    top = _top_countries(cube, countries)
+    return [('region', str(region)) for region in sorted(regions)] + \
+           [('country', str(country)) for country in top]
+
+
+def run_reports(cube, entities, out_dir, workers=None, formats=('png',), dpi=150, k=5,
+                progress=sys.stderr):
+    """Generate a report per (kind, name) in ``entities`` and return their results in order.
+
+    ``workers=1`` runs in this process. Otherwise the cube is placed in
+    shared memory and at most ``2 * workers`` tasks are in flight at once.
+    """
+    start = time.perf_counter()
+    results = {}
+
+    def report(result):
+        results[(result.kind, result.name)] = result
+        if progress is not None:
+            done, elapsed = len(results), time.perf_counter() - start
+            status = result.error or f'{len(result.figures)} figures'
+            print(f'[{done:>{len(str(len(entities)))}}/{len(entities)}] {elapsed:7.1f}s '
+                  f'{result.kind:<8} {result.name:<32} {result.seconds:6.2f}s  {status}',
+                  file=progress, flush=True)
+
+    if workers == 1:
+        use_agg()
+        for kind, name in entities:
+            report(entity_report(kind, name, out_dir, formats, dpi, k, cube=cube))
+    else:
+        workers = workers or os.cpu_count() or 1
+        with SharedCube(cube) as shared, \
+                ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                    initargs=(shared.handle,)) as pool:
+            pending = set()
+            for kind, name in entities:
+                pending.add(pool.submit(entity_report, kind, name, out_dir, formats, dpi, k))
+                if len(pending) >= 2 * workers:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        report(future.result())
+            for future in wait(pending).done:
+                report(future.result())
+    return [results[entity] for entity in entities]
+
+
+def main(argv=None):
+    from .loader import load_emissions
+
+    parser = argparse.ArgumentParser(description='Generate a report per region and country.')
+    parser.add_argument('csv')
+    parser.add_argument('-o', '--out-dir', default='reports')
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    parser.add_argument('--regions', nargs='*', help='regions to report on (default: all)')
+    parser.add_argument('--countries', nargs='*',
+                        help='countries to report on (default: the 20 largest emitters)')
+    parser.add_argument('-k', '--top', type=int, default=5,
+                        help='number of countries in the top-N views of a region')
+    parser.add_argument('-f', '--formats', nargs='+', default=['png'])
+    parser.add_argument('--dpi', type=int, default=150)
+    args = parser.parse_args(argv)
+
+    cube = EmissionsCube.from_frame(load_emissions(args.csv))
+    entities = default_entities(cube)
+    if args.regions is not None:
+        entities = [entity for entity in entities if entity[0] != 'region'] + \
+                   [('region', region) for region in args.regions]
+    if args.countries is not None:
+        entities = [entity for entity in entities if entity[0] != 'country'] + \
+                   [('country', country) for country in args.countries]
+    unknown = unknown_entities(cube, entities)
+    if unknown:
+        options = {'region': '--regions', 'country': '--countries'}
+        parser.error('\n'.join(f'{options[kind]}: unknown {name!r}; choose from '
+                                f'{", ".join(entity_names(cube, kind))}' for kind, name in unknown))
+
+    start = time.perf_counter()
+    results = run_reports(cube, entities, args.out_dir, args.workers, args.formats, args.dpi,
+                          args.top)
+    failed = [result for result in results if result.error]
+    print(f'{len(results) - len(failed)}/{len(results)} reports in '
+          f'{time.perf_counter() - start:.1f} s, written to {args.out_dir}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,368 @@
+"""Incremental report build over a dependency graph of fingerprinted nodes.
+
+The report is a DAG::
+
+    data -> cube -> top5, cube.<type> -> tables -> figures -> report.html, report.pdf
+
+A table that reads only some emission types (``TABLES``) depends on those
+types' slices of the cube. A table over every type depends on the whole
+cube, so a type added to the data is never left out. A node's input
+fingerprint hashes its own version with the output fingerprints of its
+dependencies. The version covers the node's settings and the source of
+every package module its builder imports, directly or not, so editing a
+helper or a constant rebuilds the nodes that use it.
+
+A node whose input fingerprint matches the previous build is skipped. Its
+stored output fingerprint is passed on, and its value is read back from
+``<out>/.build`` only if a dependent has to rebuild. Output fingerprints
+are content hashes. A node that rebuilds to the same content (for example
+the Agriculture slice of the cube, after only Energy rows changed) stops
+the rebuild there. Only the tables, figures and report pages that depend
+on changed data are recomputed.
+
+    python -m methane_emissions.build IEA-MethaneEmissionsComparison-World.csv -o report
+"""
+
+import argparse
+import ast
+import hashlib
+import html
+import importlib
+import importlib.util
+import inspect
+import json
+import os
+import pickle
+import sys
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import pandas as pd
+
+from .cube import EmissionsCube
+from .render import FIGURES, FigureSpec, render_figure, use_agg
+from .tables import TABLES
+
+STATE_DIR = '.build'
+STATE_FILE = 'state.json'
+# tables built over the top-N countries, which are ranked over every type
+TOP_TABLES = ('top5_country_data1', 'top5_by_emission_type1', 'top5_by_energy_reasons1')
+
+
+@dataclass
+class Node:
+    """One step of the build.
+
+    ``build`` receives the values of ``deps`` in order. A ``source`` node
+    has no deps. Its ``source()`` returns its output fingerprint without
+    building it. ``files`` nodes return the paths they wrote, and they are
+    rebuilt if any of those files is missing.
+    """
+
+    name: str
+    build: object
+    deps: tuple = ()
+    version: str = ''
+    source: object = None
+    files: bool = False
+    persist: bool = True
+
+
+@dataclass
+class NodeResult:
+    name: str
+    action: str
+    seconds: float = 0.0
+
+
+@dataclass
+class BuildReport:
+    results: list = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def built(self):
+        return [result.name for result in self.results if result.action == 'built']
+
+    def __str__(self):
+        return (f'{len(self.built)} of {len(self.results)} nodes rebuilt in '
+                f'{self.seconds:.2f} s')
+
+
+def content_hash(value):
+    """Return a hex digest of ``value``'s content."""
+    if isinstance(value, EmissionsCube):
+        return value.content_hash
+    if isinstance(value, pd.Index):
+        value = value.to_frame(index=False)
+    elif isinstance(value, pd.Series):
+        value = value.to_frame()
+    if isinstance(value, pd.DataFrame):
+        value = value.reset_index()
+        columns = repr(list(value.columns)).encode()
+        hashed = pd.util.hash_pandas_object(value, index=False).to_numpy()
+        return hashlib.sha256(columns + hashed.tobytes()).hexdigest()
+    return hashlib.sha256(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+
+
+def _imported_modules(module):
+    """Return the package modules ``module`` imports anywhere in its source, by name."""
+    package = module.__name__.rpartition('.')[0]
+    names = set()
+    for node in ast.walk(ast.parse(inspect.getsource(module))):
+        if isinstance(node, ast.ImportFrom) and node.level == 1:
+            if node.module:
+                names.add(f'{package}.{node.module}')
+            else:
+                names.update(f'{package}.{alias.name}' for alias in node.names)
+        elif isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names
+                         if alias.name.startswith(package + '.'))
+    return {name for name in names if importlib.util.find_spec(name) is not None}
+
+
+@lru_cache(maxsize=None)
+def module_closure(name):
+    """Return ``name`` and every package module it imports, directly or not, sorted."""
+    seen, pending = set(), [name]
+    while pending:
+        current = pending.pop()
+        if current not in seen:
+            seen.add(current)
+            pending.extend(_imported_modules(importlib.import_module(current)) - seen)
+    return tuple(sorted(seen))
+
+
+@lru_cache(maxsize=None)
+def _module_hash(name):
+    return hashlib.sha256(inspect.getsource(importlib.import_module(name)).encode()).hexdigest()
+
+
+def source_version(*objects):
+    """Hash the code behind functions and classes together with plain settings.
+
+    A function or class contributes the source of its module and of every
+    package module that module imports, so an edit to anything it may call
+    changes the version. This module's source is always included, since
+    it holds the node wiring.
+    """
+    modules = {__name__}
+    parts = []
+    for item in objects:
+        if callable(item) and getattr(item, '__module__', '').startswith(__package__ + '.'):
+            modules.update(module_closure(item.__module__))
+        else:
+            parts.append(repr(item))
+    parts += [f'{name}:{_module_hash(name)}' for name in sorted(modules)]
+    return hashlib.sha256('\n'.join(parts).encode()).hexdigest()[:16]
+
+
+class Graph:
+    """Nodes in dependency order, with the previous build's state in ``state_dir``."""
+
+    def __init__(self, nodes, state_dir):
+        self.nodes = {}
+        for node in nodes:
+            missing = [dep for dep in node.deps if dep not in self.nodes]
+            if missing:
+                raise ValueError(f'{node.name} depends on {missing}, which come later or are unknown')
+            self.nodes[node.name] = node
+        self.state_dir = state_dir
+        self._values = {}
+
+    def _state_path(self):
+        return os.path.join(self.state_dir, STATE_FILE)
+
+    def _value_path(self, name):
+        return os.path.join(self.state_dir, f'{name}.pkl')
+
+    def _read_state(self):
+        if not os.path.exists(self._state_path()):
+            return {}
+        with open(self._state_path()) as handle:
+            return json.load(handle)
+
+    def _write_state(self, state):
+        path = self._state_path()
+        with open(path + '.tmp', 'w') as handle:
+            json.dump(state, handle, indent=2, sort_keys=True)
+        os.replace(path + '.tmp', path)
+
+    def _input_fingerprint(self, node, outputs):
+        text = '\n'.join([node.version] + [outputs[dep] for dep in node.deps])
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _fresh(self, node, previous, fingerprint):
+        if previous is None or previous['input'] != fingerprint:
+            return False
+        if node.files:
+            return all(os.path.exists(path) for path in previous['files'])
+        return not node.persist or os.path.exists(self._value_path(node.name))
+
+    def _value(self, name):
+        """Return a node's value, built this run or read back from the last one."""
+        if name not in self._values:
+            node = self.nodes[name]
+            if node.persist and os.path.exists(self._value_path(name)):
+                with open(self._value_path(name), 'rb') as handle:
+                    self._values[name] = pickle.load(handle)
+            else:
+                self._values[name] = node.build(*[self._value(dep) for dep in node.deps])
+        return self._values[name]
+
+    def run(self, force=False, progress=sys.stderr):
+        """Build every node whose inputs changed since the last run and return a ``BuildReport``."""
+        os.makedirs(self.state_dir, exist_ok=True)
+        start = time.perf_counter()
+        previous_state = self._read_state()
+        state, outputs, report = {}, {}, BuildReport()
+        for node in self.nodes.values():
+            node_start = time.perf_counter()
+            previous = previous_state.get(node.name)
+            if node.source is not None:
+                fingerprint = node.source()
+            else:
+                fingerprint = self._input_fingerprint(node, outputs)
+            if not force and self._fresh(node, previous, fingerprint):
+                state[node.name] = previous
+                outputs[node.name] = previous['output']
+                action = 'skipped'
+            else:
+                value = node.build(*[self._value(dep) for dep in node.deps])
+                self._values[node.name] = value
+                entry = {'input': fingerprint}
+                if node.files:
+                    entry['files'] = list(value)
+                    entry['output'] = fingerprint
+                else:
+                    entry['output'] = fingerprint if node.source is not None else content_hash(value)
+                    if node.persist:
+                        with open(self._value_path(node.name), 'wb') as handle:
+                            pickle.dump(value, handle, protocol=pickle.HIGHEST_PROTOCOL)
+                state[node.name] = entry
+                outputs[node.name] = entry['output']
+                action = 'built'
+            result = NodeResult(node.name, action, time.perf_counter() - node_start)
+            report.results.append(result)
+            if progress is not None:
+                print(f'{action:<8} {node.name:<36} {result.seconds:8.3f}s', file=progress)
+            self._write_state(state)
+        report.seconds = time.perf_counter() - start
+        return report
+
+
+def _slice(cube, type):
+    return cube.select_series(type=type)
+
+
+def _subcube(*slices):
+    return EmissionsCube(pd.concat(slices).sort_index())
+
+
+def _figure(name, builder, out_dir, formats, dpi):
+    def build(table):
+        result = render_figure(FigureSpec(name, builder, table), out_dir, formats, dpi)
+        if result.error:
+            raise RuntimeError(f'{name}: {result.error}')
+        return result.paths
+    return build
+
+
+def _html_report(path, figure_dir, formats):
+    def build(*tables):
+        sections = []
+        for name in FIGURES:
+            src = os.path.relpath(os.path.join(figure_dir, f'{name}.{formats[0]}'),
+                                  os.path.dirname(path))
+            sections.append(f'<figure><img src="{html.escape(src)}" alt="{name}">'
+                            f'<figcaption>{name}</figcaption></figure>')
+        for name, table in zip(TABLES, tables):
+            sections.append(f'<h2>{name}</h2>\n{table.to_html(float_format="{:,.1f}".format)}')
+        page = ('<!DOCTYPE html>\n<html><head><meta charset="utf-8">'
+                '<title>Methane emissions report</title></head><body>\n'
+                '<h1>Methane emissions report</h1>\n' + '\n'.join(sections) + '\n</body></html>\n')
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(page)
+        return [path]
+    return build
+
+
+def _pdf_report(path):
+    def build(*figure_paths):
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_pdf import PdfPages
+
+        with PdfPages(path) as pdf:
+            for paths in figure_paths:
+                image = plt.imread([p for p in paths if p.endswith('.png')][0])
+                fig, ax = plt.subplots(figsize=(11.69, 8.27))
+                ax.imshow(image)
+                ax.axis('off')
+                pdf.savefig(fig)
+                plt.close(fig)
+        return [path]
+    return build
+
+
+def report_graph(csv_path, out_dir, k=5, formats=('png',), dpi=150, pdf=True):
+    """Return the report's ``Graph``, writing figures and pages under ``out_dir``."""
+    from .loader import file_sha256, load_emissions
+    from .ranking import top_emitters
+
+    formats = tuple(formats) if 'png' in formats or not pdf else ('png',) + tuple(formats)
+    figure_dir = os.path.join(out_dir, 'figures')
+    os.makedirs(figure_dir, exist_ok=True)
+    nodes = [
+        Node('data', lambda: load_emissions(csv_path), source=lambda: file_sha256(csv_path),
+             persist=False),
+        Node('cube', EmissionsCube.from_frame, ('data',), source_version(EmissionsCube.from_frame)),
+        Node('top5', lambda cube: top_emitters(cube, k=k), ('cube',), source_version(top_emitters, k)),
+    ]
+    types = sorted({type for _, table_types in TABLES.values() for type in table_types or ()})
+    nodes += [Node(f'cube.{type}', lambda cube, type=type: _slice(cube, type), ('cube',),
+                   source_version(_slice, EmissionsCube, type)) for type in types]
+    for name, (builder, table_types) in TABLES.items():
+        deps = ('cube',) if table_types is None else tuple(f'cube.{type}' for type in table_types)
+        uses_top = name in TOP_TABLES
+        if uses_top:
+            deps += ('top5',)
+
+        def build(*values, builder=builder, uses_top=uses_top):
+            parts, top = (values[:-1], values[-1]) if uses_top else (values, None)
+            cube = parts[0] if isinstance(parts[0], EmissionsCube) else _subcube(*parts)
+            return builder(cube, top)
+        nodes.append(Node(name, build, deps, source_version(builder, EmissionsCube)))
+    for name, (builder, table) in FIGURES.items():
+        nodes.append(Node(f'figure.{name}', _figure(name, builder, figure_dir, formats, dpi),
+                          (table,), source_version(builder, render_figure, formats, dpi),
+                          files=True))
+    html_path = os.path.join(out_dir, 'report.html')
+    nodes.append(Node('report.html', _html_report(html_path, figure_dir, formats), tuple(TABLES),
+                      source_version(_html_report, formats), files=True))
+    if pdf:
+        nodes.append(Node('report.pdf', _pdf_report(os.path.join(out_dir, 'report.pdf')),
+                          tuple(f'figure.{name}' for name in FIGURES), source_version(_pdf_report),
+                          files=True))
+    return Graph(nodes, os.path.join(out_dir, STATE_DIR))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the report, redoing only what changed.')
+    parser.add_argument('csv')
+    parser.add_argument('-o', '--out-dir', default='report')
+    parser.add_argument('-k', '--top', type=int, default=5)
+    parser.add_argument('-f', '--formats', nargs='+', default=['png'])
+    parser.add_argument('--dpi', type=int, default=150)
+    parser.add_argument('--no-pdf', action='store_true')
+    parser.add_argument('--force', action='store_true', help='rebuild every node')
+    args = parser.parse_args(argv)
+
+    use_agg()
+    graph = report_graph(args.csv, args.out_dir, args.top, args.formats, args.dpi,
+                         pdf=not args.no_pdf)
+    print(graph.run(force=args.force))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""The ``methane-report`` command line.
+
+    methane-report tables IEA-MethaneEmissionsComparison-World.csv -o tables
+    methane-report stats IEA-MethaneEmissionsComparison-World.csv --level country
+    methane-report top IEA-MethaneEmissionsComparison-World.csv -k 10
+    methane-report profile IEA-MethaneEmissionsComparison-World.csv -o trace.json
+    methane-report render IEA-MethaneEmissionsComparison-World.csv -o figures -f png svg
+    methane-report build IEA-MethaneEmissionsComparison-World.csv -o report
+    methane-report interactive IEA-MethaneEmissionsComparison-World.csv -o html
+    methane-report batch IEA-MethaneEmissionsComparison-World.csv -o reports -j 8
+    methane-report metrics IEA-MethaneEmissionsComparison-World.csv --reference production.csv --gwp GWP20
+    methane-report scenarios IEA-MethaneEmissionsComparison-World.csv --levers levers.json --per-region
+    methane-report diff old/IEA-MethaneEmissionsComparison-World.csv IEA-MethaneEmissionsComparison-World.csv -o diff
+    methane-report store ingest IEA-MethaneEmissionsComparison-World.csv --store store
+    methane-report sql --store store --view agriculture_region_data
+    methane-report stream facility-inventory.csv --by country
+    methane-report validate IEA-MethaneEmissionsComparison-World.csv --rtol 1e-3
+    methane-report serve IEA-MethaneEmissionsComparison-World.csv --port 8080
+
+Every command imports its modules only when it runs. The table commands
+never load matplotlib, seaborn or geopandas.
+"""
+
+import argparse
+import importlib
+import sys
+
+# commands implemented by another module's main(argv); the remaining arguments are passed on
+FORWARDED = {
+    'render': ('methane_emissions.render', 'render every report figure headlessly'),
+    'build': ('methane_emissions.build', 'rebuild only the report parts whose inputs changed'),
+    'interactive': ('methane_emissions.interactive', 'write interactive HTML figures'),
+    'batch': ('methane_emissions.batch', 'write a report per region and country'),
+    'metrics': ('methane_emissions.metrics', 'emission intensities and CO2e per country'),
+    'scenarios': ('methane_emissions.scenarios', 'evaluate abatement scenarios'),
+    'diff': ('methane_emissions.diff', 'compare two vintages at every roll-up level'),
+    'store': ('methane_emissions.store', 'ingest vintages into the partitioned store'),
+    'sql': ('methane_emissions.sql', 'query the partitioned store with SQL'),
+    'stream': ('methane_emissions.streaming', 'stream region roll-ups from a large CSV'),
+    'serve': ('methane_emissions.service', 'serve emissions queries over HTTP'),
+    'validate': ('methane_emissions.validate', 'check a vintage for consistency'),
+}
+
+
+def _tables(args):
+    from .report import analyze, write_tables
+
+    report = analyze(args.csv, k=args.top, cache=not args.no_cache)
+    if args.output:
+        for path in write_tables(report.tables, args.output, args.format):
+            print(path)
+        return 0
+    for name, table in report.tables.items():
+        print(name)
+        print(table.to_string())
+        print()
+    return 0
+
+
+def _stats(args):
+    from .cube import EmissionsCube
+    from .loader import load_emissions
+    from .stats import emission_statistics
+
+    cube = EmissionsCube.from_frame(load_emissions(args.csv, cache=not args.no_cache))
+    print(emission_statistics(cube, level=args.level, types=args.types).to_string())
+    return 0
+
+
+def _top(args):
+    from .cube import EmissionsCube
+    from .loader import load_emissions
+    from .ranking import country_totals, top_emitters
+
+    cube = EmissionsCube.from_frame(load_emissions(args.csv, cache=not args.no_cache))
+    totals = country_totals(cube, args.type)
+    for country in top_emitters(cube, k=args.top, type=args.type):
+        print(f'{country:<40} {totals[country]:>14,.1f}')
+    return 0
+
+
+def _profile(args):
+    from . import profiling
+    from .cube import EmissionsCube
+    from .loader import load_emissions
+    from .ranking import top_emitters
+    from .render import figure_specs, render_all
+    from .tables import chart_tables
+
+    profiler = profiling.enable(memory=not args.no_memory)
+    with profiling.stage('report'):
+        cube = EmissionsCube.from_frame(load_emissions(args.csv, cache=not args.no_cache))
+        tables = chart_tables(cube, top_emitters(cube, k=args.top))
+        render_all(figure_specs(tables), args.figures, workers=1)
+    profiling.disable()
+    profiler.write_trace(args.output)
+    print(profiler.format_summary())
+    print(f'trace written to {args.output}')
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='methane-report',
+                                     description='Analyse the IEA methane emissions dataset.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def command(name, func, help):
+        sub = subparsers.add_parser(name, help=help)
+        sub.add_argument('csv')
+        sub.add_argument('--no-cache', action='store_true', help='do not use the Arrow cache')
+        sub.set_defaults(func=func)
+        return sub
+
+    tables = command('tables', _tables, 'print or save the chart tables')
+    tables.add_argument('-k', '--top', type=int, default=5)
+    tables.add_argument('-o', '--output', help='directory to write the tables to')
+    tables.add_argument('--format', default='csv', choices=['csv', 'json', 'parquet'])
+
+    stats = command('stats', _stats, 'summary statistics per region or country')
+    stats.add_argument('--level', default='region', choices=['region', 'country', 'segment'])
+    stats.add_argument('--types', nargs='+')
+
+    top = command('top', _top, 'the largest emitting countries')
+    top.add_argument('-k', '--top', type=int, default=5)
+    top.add_argument('--type', help='rank on one emission type (default: all types)')
+
+    profile = command('profile', _profile, 'time every stage of a report run')
+    profile.add_argument('-k', '--top', type=int, default=5)
+    profile.add_argument('-o', '--output', default='methane-profile.json',
+                         help='Chrome trace JSON to write')
+    profile.add_argument('--figures', default='figures', help='directory to render the figures to')
+    profile.add_argument('--no-memory', action='store_true', help='skip the tracemalloc peaks')
+
+    for name, (_, help) in FORWARDED.items():
+        subparsers.add_parser(name, help=help, add_help=False)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in FORWARDED:
+        module = importlib.import_module(FORWARDED[argv[0]][0])
+        # argparse takes its prog from sys.argv[0], so usage reads 'methane-report <command>'
+        saved, sys.argv[0] = sys.argv[0], f'methane-report {argv[0]}'
+        try:
+            return module.main(argv[1:]) or 0
+        finally:
+            sys.argv[0] = saved
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,106 @@
+"""Country name normalization to ISO 3166 alpha-3 codes.
+
+``data/country_aliases.csv`` maps every spelling we have met to an ISO code:
+the IEA names, the Natural Earth map names and common variants. Lookups
+ignore case, accents and punctuation. The mapping is applied to the
+categories of the ``country`` column, not to every row, so coding a frame
+costs one dictionary lookup per distinct country plus an integer take.
+"""
+
+import csv
+import os
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+ALIASES_PATH = os.path.join(os.path.dirname(__file__), 'data', 'country_aliases.csv')
+
+# rows that aggregate several countries: they have no ISO code and are not
+# ranked against single countries
+AGGREGATE_COUNTRIES = ('European Union',)
+
+_APOSTROPHES = re.compile("['\u2019`]")
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_name(name):
+    """Return the lookup key for a country name: ASCII, lower case, words only."""
+    name = _APOSTROPHES.sub('', name).replace('&', ' and ')
+    ascii_name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+    return _NON_WORD.sub(' ', ascii_name.lower()).strip()
+
+
+@lru_cache(maxsize=None)
+def alias_index(path=ALIASES_PATH):
+    """Return the normalized alias -> ISO code dict, read once per process."""
+    with open(path, newline='', encoding='utf-8') as handle:
+        return {normalize_name(row['alias']): row['iso_a3'] for row in csv.DictReader(handle)}
+
+
+def iso_code(name, index=None):
+    """Return the ISO alpha-3 code for one country name, or None."""
+    if not isinstance(name, str):
+        return None
+    return (index or alias_index()).get(normalize_name(name))
+
+
+def iso_codes(names):
+    """Return a categorical of the ISO codes for ``names``, NaN where unknown."""
+    categorical = pd.Categorical(names)
+
+    index = alias_index()
+    category_codes = [iso_code(name, index) for name in categorical.categories]
+    iso_positions, iso_categories = pd.factorize(pd.Series(category_codes, dtype=object))
+    # position -1 (unknown name) and code -1 (missing name) both become NaN
+    lookup = np.append(iso_positions, -1)
+    return pd.Categorical.from_codes(lookup[categorical.codes], categories=iso_categories)
+
+
+@dataclass
+class CountryMatchReport:
+    """How many distinct country names resolved to an ISO code."""
+
+    matched: int
+    total: int
+    unmatched: list = field(default_factory=list)
+    aggregates: list = field(default_factory=list)
+
+    @property
+    def rate(self):
+        return self.matched / self.total if self.total else 1.0
+
+    def __str__(self):
+        text = f'{self.matched}/{self.total} country names matched ({self.rate:.1%})'
+        if self.unmatched:
+            text += '; unmatched: ' + ', '.join(self.unmatched)
+        if self.aggregates:
+            text += '; aggregates without a code: ' + ', '.join(self.aggregates)
+        return text
+
+
+def match_report(names, codes):
+    """Compare distinct ``names`` with their ``codes``. Known aggregates are listed apart."""
+    pairs = pd.DataFrame({'name': np.asarray(names, dtype=object),
+                          'code': np.asarray(codes, dtype=object)}).dropna(subset=['name'])
+    pairs = pairs.drop_duplicates('name')
+    missing = pairs.loc[pairs['code'].isna(), 'name']
+    aggregates = sorted(missing[missing.isin(AGGREGATE_COUNTRIES)])
+    unmatched = sorted(missing[~missing.isin(AGGREGATE_COUNTRIES)])
+    total = len(pairs) - len(aggregates)
+    return CountryMatchReport(matched=total - len(unmatched), total=total,
+                              unmatched=unmatched, aggregates=aggregates)
+
+
+def add_iso_codes(df):
+    """Add a categorical ``iso_a3`` column coded from ``df['country']``.
+
+    The match report is stored in ``df.attrs['country_match']``.
+    """
+    df['iso_a3'] = iso_codes(df['country'])
+    categories = df['country'].cat.categories
+    df.attrs['country_match'] = match_report(categories, iso_codes(categories))
+    return df
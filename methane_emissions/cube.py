@@ -0,0 +1,145 @@
+"""Precomputed emissions cube.
+
+The cube sums ``emissions`` once over every key combination with a single
+groupby. Its index is ordered (type, segment, reason, region, country,
+baseYear), so every (type, segment, reason) slice is a contiguous block. The
+block boundaries are kept in a dict, so the analysis queries slice the cube
+instead of scanning the whole frame with boolean masks.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from .profiling import stage
+from .reshape import AGGREGATION, sum_table
+
+KEYS = ['type', 'segment', 'reason', 'region', 'country', 'baseYear']
+BLOCK_KEYS = KEYS[:3]
+ROW_KEYS = KEYS[3:]
+WORLD = 'World'
+
+
+def _is_listlike(wanted):
+    return isinstance(wanted, (list, tuple, set, frozenset, pd.Index))
+
+
+def _matches(value, wanted):
+    if wanted is None:
+        return True
+    if _is_listlike(wanted):
+        return value in wanted
+    return value == wanted
+
+
+class EmissionsCube:
+    """Summed emissions for every (type, segment, reason, region, country, baseYear)."""
+
+    def __init__(self, series):
+        self.series = series
+        self._content_hash = None
+        self._blocks = self._block_offsets(series.index)
+        self._codes = {name: np.asarray(codes)
+                       for name, codes in zip(series.index.names, series.index.codes)}
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build the cube from a loaded frame with one sorted groupby."""
+        with stage('cube.build', len(df)) as timing:
+            series = (df['emissions'].astype('float64')
+                      .groupby([df[key] for key in KEYS], observed=True, dropna=False, sort=True)
+                      .sum())
+            timing.rows_out = len(series)
+        return cls(series)
+
+    @staticmethod
+    def _block_offsets(index):
+        if len(index) == 0:
+            return {}
+        codes = [np.asarray(index.codes[i]) for i in range(len(BLOCK_KEYS))]
+        change = np.zeros(len(index), dtype=bool)
+        change[0] = True
+        for level_codes in codes:
+            change[1:] |= level_codes[1:] != level_codes[:-1]
+        starts = np.flatnonzero(change)
+        stops = np.append(starts[1:], len(index))
+        keys = zip(*(index.levels[i].take(level_codes[starts])
+                     for i, level_codes in enumerate(codes)))
+        return {key: (start, stop) for key, start, stop in zip(keys, starts, stops)}
+
+    def __len__(self):
+        return len(self.series)
+
+    @property
+    def content_hash(self):
+        """SHA-256 of the cube's keys and values, computed on first use."""
+        if self._content_hash is None:
+            hashed = pd.util.hash_pandas_object(self.series.reset_index(), index=False).to_numpy()
+            self._content_hash = hashlib.sha256(hashed.tobytes()).hexdigest()
+        return self._content_hash
+
+    @property
+    def blocks(self):
+        """The (type, segment, reason) combinations present in the cube."""
+        return list(self._blocks)
+
+    def get(self, type, segment, reason, region, country, baseYear):
+        """Return the emissions for one fully specified key."""
+        return self.series.loc[(type, segment, reason, region, country, baseYear)]
+
+    def select_series(self, type=None, segment=None, reason=None, region=None,
+                      country=None, baseYear=None, include_world=True):
+        """Return the matching part of the cube as a Series.
+
+        Each filter is a single value, a list of values, or None to match
+        everything. (type, segment, reason) filters pick whole blocks through
+        the offset dict. The remaining filters mask only those blocks.
+        """
+        spans = [self._blocks[key] for key in self._blocks
+                 if _matches(key[0], type) and _matches(key[1], segment)
+                 and _matches(key[2], reason)]
+        row_filters = [(level, wanted) for level, wanted in
+                       (('region', region), ('country', country), ('baseYear', baseYear))
+                       if wanted is not None]
+        if not include_world:
+            row_filters.append(('region', None))
+        if not spans:
+            return self.series.iloc[:0]
+        if len(spans) == 1 and not row_filters:
+            return self.series.iloc[spans[0][0]:spans[0][1]]
+
+        positions = np.concatenate([np.arange(start, stop) for start, stop in spans])
+        for level, wanted in row_filters:
+            codes = self._codes[level][positions]
+            if wanted is None:
+                mask = codes != self._code(level, WORLD)
+            else:
+                mask = np.isin(codes, self._wanted_codes(level, wanted))
+            positions = positions[mask]
+        return self.series.iloc[positions]
+
+    def _code(self, level, value):
+        categories = self.series.index.levels[self.series.index.names.index(level)]
+        return categories.get_loc(value) if value in categories else -2
+
+    def _wanted_codes(self, level, wanted):
+        values = list(wanted) if _is_listlike(wanted) else [wanted]
+        return [self._code(level, value) for value in values]
+
+    def select(self, **filters):
+        """Return the matching cube cells as a frame with key columns and ``emissions``."""
+        return self.select_series(**filters).reset_index()
+
+    def rollup(self, by, **filters):
+        """Sum the selected cells over the levels in ``by``.
+
+        Returns a frame with ``by`` as columns, the same shape as
+        ``df.groupby(by, as_index=False)['emissions'].sum()``.
+        """
+        selected = self.select_series(**filters)
+        return selected.groupby(level=by, observed=True, sort=True).agg(AGGREGATION).reset_index()
+
+    def table(self, index, columns=None, nest_values=False, **filters):
+        """Return the selected cells summed into a chart table (see ``reshape.sum_table``)."""
+        return sum_table(self.select_series(**filters), index, columns, nest_values=nest_values)
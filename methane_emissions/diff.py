@@ -0,0 +1,298 @@
+"""What changed between two vintages of the dataset, at every roll-up level.
+
+The rows of both vintages are aligned on (region, country, type, segment,
+reason) with one hash join. Each level's labels are coded against the union
+of both vintages' categories. The codes are combined into one int64 key per
+row, and ``pd.factorize`` over the old and new keys together gives every
+row its cell. The two vintages' emissions per cell are then two
+``np.bincount`` calls, and a cell missing on one side was added or removed.
+
+The roll-ups are summed over the leaf cells only: no World rows, no Total
+segment of a type that has component segments, and no All reason of a
+segment that has itemized reasons. Every prefix of type/segment/reason is
+crossed with every prefix of region/country. All of those groupings are
+stacked into one key array and summed in a single pass. The groupings
+without country read the leaves pre-aggregated per type/segment/reason/
+region, so only the country groupings touch every leaf. The published rows
+themselves, aggregates included, are the ``row`` level.
+
+    python -m methane_emissions.diff old/IEA-MethaneEmissionsComparison-World.csv IEA-MethaneEmissionsComparison-World.csv -o diff
+    python -m methane_emissions.diff old.csv new.csv --level type/segment --atol 1
+"""
+
+import argparse
+import itertools
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .cube import WORLD
+from .stats import leaf_mask
+
+DIFF_KEYS = ['region', 'country', 'type', 'segment', 'reason']
+ROW_LEVEL = 'row'
+TOTAL_LEVEL = 'total'
+STATUSES = ['added', 'removed', 'changed', 'unchanged']
+_MAX_SPAN = 2**62
+
+
+def _groupings():
+    """Every prefix of type/segment/reason crossed with every prefix of region/country."""
+    sector = ('type', 'segment', 'reason')
+    geography = ('region', 'country')
+    groupings = [sector[:i] + geography[:j] for i, j in itertools.product(range(4), range(3))]
+    # the finest grouping is the leaf rows themselves, already in the row level
+    return groupings[:-1]
+
+
+GROUPINGS = _groupings()
+LEVELS = [ROW_LEVEL] + ['/'.join(grouping) or TOTAL_LEVEL for grouping in GROUPINGS]
+
+
+def _combine(codes, sizes, length):
+    """Combine per-level codes into one int64 key, re-coding densely if the key would overflow."""
+    key = np.zeros(length, dtype='int64')
+    span = 1
+    for level_codes, size in zip(codes, sizes):
+        if span * size >= _MAX_SPAN:
+            key, uniques = pd.factorize(key)
+            span = len(uniques)
+        key = key * size + level_codes
+        span *= size
+    return key, span
+
+
+def _aggregate(group, n_groups, codes, values):
+    """Sum each of ``values`` per group, and carry over the codes the group's rows share."""
+    sums = [np.bincount(group, weights=level_values, minlength=n_groups) for level_values in values]
+    group_codes = {}
+    for level, level_codes in codes.items():
+        group_codes[level] = np.empty(n_groups, dtype='int64')
+        group_codes[level][group] = level_codes
+    return group_codes, sums
+
+
+def _union_codes(old, new):
+    """Code two label columns against the union of their categories, 0 for a missing label."""
+    categories = []
+    for column in (old, new):
+        values = (column.cat.categories if isinstance(column.dtype, pd.CategoricalDtype)
+                  else pd.Index(column.dropna().unique()))
+        categories.append(pd.Index(values))
+    dtype = pd.CategoricalDtype(categories[0].union(categories[1], sort=False))
+    return [np.asarray(pd.Categorical(column, dtype=dtype).codes, dtype='int64') + 1
+            for column in (old, new)], dtype
+
+
+def _leaves(codes, dtypes):
+    """Return the non-World cells that add up without double counting (``stats.leaf_mask``)."""
+    labels = pd.DataFrame({key: pd.Categorical.from_codes(codes[key] - 1, dtype=dtypes[key])
+                           for key in DIFF_KEYS})
+    return np.asarray(labels['region'] != WORLD) & leaf_mask(labels)
+
+
+@dataclass
+class VintageDiff:
+    """Every level's old and new emissions, deltas and status, in one frame."""
+
+    table: pd.DataFrame
+    old_rows: int
+    new_rows: int
+
+    def level(self, name):
+        """Return the groups of one level, such as ``'region/country'`` or ``'type/segment'``."""
+        if name not in LEVELS:
+            raise ValueError(f'unknown level {name!r}; expected one of {LEVELS}')
+        rows = self.table[self.table['level'] == name]
+        columns = [key for key in DIFF_KEYS if name == ROW_LEVEL or key in name.split('/')]
+        return rows.drop(columns=[key for key in DIFF_KEYS if key not in columns])
+
+    def changes(self, level=None, min_delta=0.0):
+        """Return the added, removed and changed groups, largest absolute delta first."""
+        table = self.table if level is None else self.level(level)
+        changed = table[(table['status'] != 'unchanged') & (table['delta'].abs() >= min_delta)]
+        order = np.lexsort((-changed['delta'].abs().to_numpy(),
+                            changed['level'].cat.codes.to_numpy()))
+        return changed.iloc[order].reset_index(drop=True)
+
+    def top(self, level='region/country', n=20):
+        """Return the ``n`` groups of ``level`` with the largest absolute deltas."""
+        table = self.level(level)
+        return table.iloc[np.argsort(-table['delta'].abs().to_numpy(), kind='stable')[:n]]
+
+    def pivot(self, index='country', columns='type', n=15):
+        """Return the deltas of the ``n`` most changed ``index`` groups per ``columns`` group."""
+        table = self.level(_level_name(index, columns))
+        top = self.top(_level_name(index), n)[index]
+        table = table[table[index].isin(top)]
+        pivot = table.pivot_table(index=index, columns=columns, values='delta', aggfunc='sum',
+                                  observed=True)
+        return pivot.reindex(top.dropna().tolist())
+
+    @property
+    def counts(self):
+        rows = self.table[self.table['level'] == ROW_LEVEL]
+        return rows['status'].value_counts().reindex(STATUSES, fill_value=0)
+
+    def __str__(self):
+        counts = self.counts
+        total = self.level(TOTAL_LEVEL).iloc[0]
+        return (f'{self.old_rows:,} -> {self.new_rows:,} rows: {counts["added"]:,} added, '
+                f'{counts["removed"]:,} removed, {counts["changed"]:,} changed, '
+                f'{counts["unchanged"]:,} unchanged; total {total["old"]:,.1f} -> '
+                f'{total["new"]:,.1f} kt ({total["delta"]:+,.1f})')
+
+
+def _level_name(*levels):
+    """Return the level grouping by ``levels``. A country is grouped with its region."""
+    levels = set(levels) | ({'region'} if 'country' in levels else set())
+    order = ('type', 'segment', 'reason', 'region', 'country')
+    return '/'.join(level for level in order if level in levels) or TOTAL_LEVEL
+
+
+def diff_frames(old, new, rtol=1e-6, atol=1e-6):
+    """Diff two loaded frames at every level and return a ``VintageDiff``.
+
+    A group whose old and new emissions agree within ``rtol`` and ``atol``
+    (as in ``np.isclose``) is unchanged. A group with no old rows was added,
+    and one with no new rows was removed. ``relative`` is the delta over the
+    old emissions, NaN where those are zero.
+    """
+    codes, dtypes = {}, {}
+    for key in DIFF_KEYS:
+        (old_codes, new_codes), dtypes[key] = _union_codes(old[key], new[key])
+        codes[key] = np.concatenate([old_codes, new_codes])
+    sizes = dict(zip(DIFF_KEYS, [len(dtypes[key].categories) + 1 for key in DIFF_KEYS]))
+    n_old, n_rows = len(old), len(old) + len(new)
+    row_key, _ = _combine([codes[key] for key in DIFF_KEYS], sizes.values(), n_rows)
+    emissions = np.concatenate([old['emissions'].to_numpy(dtype='float64'),
+                                new['emissions'].to_numpy(dtype='float64')])
+    is_old = np.arange(n_rows) < n_old
+    # old emissions, new emissions, old row count, new row count
+    values = [np.where(is_old, emissions, 0.0), np.where(is_old, 0.0, emissions),
+              is_old.astype('float64'), (~is_old).astype('float64')]
+
+    # the hash join: one cell per distinct key over both vintages
+    cell, cell_keys = pd.factorize(row_key)
+    n_cells = len(cell_keys)
+    cell_codes, cell_values = _aggregate(cell, n_cells, codes, values)
+
+    leaves = np.flatnonzero(_leaves(cell_codes, dtypes))
+    leaf_codes = {key: level_codes[leaves] for key, level_codes in cell_codes.items()}
+    leaf_values = [level_values[leaves] for level_values in cell_values]
+    # the groupings without country are summed from the leaves pre-aggregated per
+    # type/segment/reason/region, a few thousand cells at most
+    base_levels = ('type', 'segment', 'reason', 'region')
+    base_key, _ = _combine([leaf_codes[level] for level in base_levels],
+                           [sizes[level] for level in base_levels], len(leaves))
+    base, base_keys = pd.factorize(base_key)
+    base_codes, base_values = _aggregate(
+        base, len(base_keys), {level: leaf_codes[level] for level in base_levels}, leaf_values)
+
+    # stack the row level and every grouping, then sum them all at once
+    keys, level_of = [np.arange(n_cells)], [np.zeros(n_cells, dtype='int64')]
+    stacked_codes = {key: [cell_codes[key]] for key in DIFF_KEYS}
+    stacked_values = [[level_values] for level_values in cell_values]
+    offset = n_cells
+    for level_id, grouping in enumerate(GROUPINGS, start=1):
+        source_codes, source_values = ((leaf_codes, leaf_values) if 'country' in grouping
+                                       else (base_codes, base_values))
+        n = len(source_values[0])
+        key, span = _combine([source_codes[level] for level in grouping],
+                             [sizes[level] for level in grouping], n)
+        keys.append(key + offset)
+        offset += span
+        level_of.append(np.full(n, level_id))
+        for level in DIFF_KEYS:
+            stacked_codes[level].append(source_codes[level] if level in grouping
+                                        else np.zeros(n, dtype='int64'))
+        for parts, level_values in zip(stacked_values, source_values):
+            parts.append(level_values)
+    group, uniques = pd.factorize(np.concatenate(keys), sort=True)
+    group_codes, (old_sum, new_sum, old_count, new_count) = _aggregate(
+        group, len(uniques),
+        {'level': np.concatenate(level_of),
+         **{level: np.concatenate(parts) for level, parts in stacked_codes.items()}},
+        [np.concatenate(parts) for parts in stacked_values])
+    n_groups = len(uniques)
+    columns = {'level': pd.Categorical.from_codes(group_codes['level'], categories=LEVELS)}
+    for key in DIFF_KEYS:
+        columns[key] = pd.Categorical.from_codes(group_codes[key] - 1, dtype=dtypes[key])
+
+    delta = new_sum - old_sum
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = np.where(old_sum != 0, delta / old_sum, np.nan)
+    status = np.full(n_groups, STATUSES.index('changed'))
+    status[np.isclose(new_sum, old_sum, rtol=rtol, atol=atol)] = STATUSES.index('unchanged')
+    status[old_count == 0] = STATUSES.index('added')
+    status[new_count == 0] = STATUSES.index('removed')
+    table = pd.DataFrame({**columns, 'old': old_sum, 'new': new_sum, 'delta': delta,
+                          'relative': relative,
+                          'status': pd.Categorical.from_codes(status, categories=STATUSES)})
+    return VintageDiff(table, len(old), len(new))
+
+
+def diff_vintages(old_path, new_path, rtol=1e-6, atol=1e-6):
+    """Load two vintage CSVs (through the Arrow cache) and diff them."""
+    from .loader import load_emissions
+
+    return diff_frames(load_emissions(old_path), load_emissions(new_path), rtol, atol)
+
+
+def diff_figures(diff, out_dir, level='region/country', n=20, formats=('png',), dpi=150):
+    """Save the diverging bar of the ``n`` largest ``level`` deltas and the country x type heatmap."""
+    import matplotlib.pyplot as plt
+
+    from .figures import diff_barh, diff_heatmap
+
+    os.makedirs(out_dir, exist_ok=True)
+    top = diff.top(level, n)
+    labels = top[[key for key in DIFF_KEYS if key in top.columns]].astype(str)
+    bars = pd.Series(top['delta'].to_numpy(), index=labels.agg(' / '.join, axis=1))
+    figures = {'diff_bar': diff_barh(bars, f'Largest changes by {level}'),
+               'diff_heatmap': diff_heatmap(diff.pivot('country', 'type', n))}
+    paths = []
+    for name, fig in figures.items():
+        for fmt in formats:
+            path = os.path.join(out_dir, f'{name}.{fmt}')
+            fig.savefig(path, dpi=dpi, bbox_inches='tight')
+            paths.append(path)
+        plt.close(fig)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Diff two vintages of the dataset.')
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('-o', '--out-dir', help='write changes.csv and the figures here')
+    parser.add_argument('--level', default='region/country', choices=LEVELS,
+                        help='level of the printed changes and the bar chart')
+    parser.add_argument('-n', '--top', type=int, default=20)
+    parser.add_argument('--rtol', type=float, default=1e-6)
+    parser.add_argument('--atol', type=float, default=1e-6)
+    parser.add_argument('--min-delta', type=float, default=0.0,
+                        help='leave smaller absolute changes out of changes.csv')
+    parser.add_argument('-f', '--formats', nargs='+', default=['png'])
+    parser.add_argument('--no-figures', action='store_true')
+    args = parser.parse_args(argv)
+
+    diff = diff_vintages(args.old, args.new, args.rtol, args.atol)
+    print(diff)
+    changes = diff.changes(args.level).head(args.top)
+    print(changes.to_string(index=False) if len(changes) else f'no {args.level} changes')
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+        diff.changes(min_delta=args.min_delta).to_csv(
+            os.path.join(args.out_dir, 'changes.csv'), index=False)
+        if not args.no_figures:
+            from .render import use_agg
+
+            use_agg()
+            diff_figures(diff, args.out_dir, args.level, args.top, args.formats)
+
+
+if __name__ == '__main__':
+    main()
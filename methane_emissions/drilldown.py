@@ -0,0 +1,122 @@
+"""Drill-down index over type -> segment -> reason -> region -> country.
+
+Every node of the tree holds the summed emissions of everything below it,
+so a drill-down or roll-up is a dict lookup, not a scan of the frame:
+
+    index = DrillDownIndex.from_cube(cube)
+    index.total(type='Energy', segment=['Offshore oil', 'Onshore oil'], reason='Vented',
+                region='Middle East')
+    index.breakdown('segment', type='Energy', reason='Vented')
+    index.children('Energy', 'Onshore gas')
+
+The tree is built from the leaf cells of ``stats.leaf_mask``: component
+segments rather than their type's Total, itemized reasons rather than their
+segment's All row, and no satellite-detected emissions. A type whose only
+segment is Total (Agriculture, Waste, Other) keeps its Total rows, so every
+type node equals that type's Total row and no emissions are counted twice.
+World rows are left out, and the partial sums are computed once per depth
+with a groupby over the cube.
+"""
+
+import pandas as pd
+
+from .cube import _is_listlike
+from .stats import leaf_mask
+
+LEVELS = ('type', 'segment', 'reason', 'region', 'country')
+
+
+def component_series(cube, baseYear=None):
+    """Return the non-World leaf cells of the cube, which add up without double counting.
+
+    Types with component segments keep those and drop their Total segment,
+    and segments with itemized reasons drop their All row (see
+    ``stats.leaf_mask``). Types with only a Total segment keep it.
+    """
+    series = cube.select_series(baseYear=baseYear, include_world=False)
+    return series[leaf_mask(series.index)]
+
+
+class DrillDownIndex:
+    """Partial emission sums at every node of the type/segment/reason/region/country tree."""
+
+    def __init__(self, nodes, children):
+        self._nodes = nodes
+        self._children = children
+
+    @classmethod
+    def from_cube(cls, cube, baseYear=None):
+        """Build the index from a cube, over all base years unless ``baseYear`` is given."""
+        series = component_series(cube, baseYear).groupby(level=list(LEVELS), observed=True,
+                                                         dropna=False).sum()
+        nodes = {(): float(series.sum())}
+        children = {}
+        for depth in range(1, len(LEVELS) + 1):
+            grouped = series.groupby(level=list(LEVELS[:depth]), observed=True, dropna=False,
+                                     sort=True).sum()
+            keys = [(key,) if depth == 1 else key for key in grouped.index]
+            nodes.update(zip(keys, grouped.to_numpy().tolist()))
+            for key in keys:
+                children.setdefault(key[:-1], []).append(key[-1])
+        return cls(nodes, children)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, path):
+        return tuple(path) in self._nodes
+
+    def node(self, *path):
+        """Return the sum at ``path``, e.g. ``node('Energy', 'Onshore oil', 'Vented')``."""
+        return self._nodes[tuple(path)]
+
+    def children(self, *path):
+        """Return the sums of the nodes directly below ``path`` as a Series."""
+        path = tuple(path)
+        names = self._children.get(path, [])
+        level = LEVELS[len(path)] if len(path) < len(LEVELS) else None
+        return pd.Series([self._nodes[path + (name,)] for name in names],
+                         index=pd.Index(names, name=level), name='emissions', dtype='float64')
+
+    def _paths(self, filters, depth):
+        """Return every node path of length ``depth`` matching ``filters``."""
+        unknown = set(filters) - set(LEVELS)
+        if unknown:
+            raise ValueError(f'unknown levels {sorted(unknown)}; expected some of {LEVELS}')
+        paths = [()]
+        for level in LEVELS[:depth]:
+            wanted = filters.get(level)
+            if wanted is None:
+                paths = [path + (name,) for path in paths for name in self._children.get(path, ())]
+            else:
+                values = list(wanted) if _is_listlike(wanted) else [wanted]
+                paths = [path + (value,) for path in paths for value in values
+                         if path + (value,) in self._nodes]
+        return paths
+
+    def _depth(self, filters, level=None):
+        deepest = [LEVELS.index(name) + 1 for name, wanted in filters.items()
+                   if wanted is not None and name in LEVELS]
+        if level is not None:
+            deepest.append(LEVELS.index(level) + 1)
+        return max(deepest, default=0)
+
+    def total(self, **filters):
+        """Sum the emissions matching ``filters``; each is a value, a list, or None for all.
+
+        Only the nodes at the deepest filtered level are visited, so the cost
+        depends on the number of matching nodes, not on the number of rows.
+        """
+        depth = self._depth(filters)
+        return float(sum(self._nodes[path] for path in self._paths(filters, depth)))
+
+    def breakdown(self, level, **filters):
+        """Return the matching emissions summed per value of ``level``, largest first."""
+        if level not in LEVELS:
+            raise ValueError(f'unknown level {level!r}; expected one of {LEVELS}')
+        position = LEVELS.index(level)
+        sums = {}
+        for path in self._paths(filters, self._depth(filters, level)):
+            sums[path[position]] = sums.get(path[position], 0.0) + self._nodes[path]
+        result = pd.Series(sums, name='emissions', dtype='float64').rename_axis(level)
+        return result.sort_values(ascending=False)
@@ -0,0 +1,152 @@
+"""The report figures, one function per chart.
+
+Each function takes the table it plots and returns a matplotlib Figure. The
+script shows them interactively; ``render`` saves them in batch mode. pyplot,
+seaborn and geopandas are imported inside the functions, so the backend can
+be chosen before any of them load.
+"""
+
+WORLD_COLORS = ['#D7BDE2', '#ABEBC6', '#F8C471', '#AED6F1']
+AGRICULTURE_COLOR = '#DC9C27'
+ENERGY_COLOR = '#6FB646'
+TYPE_COLORS = ('#E7936B', '#5F93CB')
+REASON_COLORS = ('#28920F', '#76D6F0')
+DIFF_COLORS = ('#2E86C1', '#C0392B')
+
+
+def world_types_pie(world_data, title='World Methane Emissions per Type'):
+    """Pie of the emissions per type, largest slice popped out."""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    explode = [0.1] + [0] * (len(world_data) - 1)
+    ax.pie(world_data['emissions'], labels=world_data['type'], colors=WORLD_COLORS,
+           explode=explode, autopct='%1.1f%%', shadow=True)
+    ax.set_title(title)
+    return fig
+
+
+def region_barh(region_table, title, color):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    region_table.plot(kind='barh', color=color, ax=ax)
+    ax.set_title(title)
+    ax.set_xlabel('Emissions (kt)')
+    ax.set_ylabel('')
+    return fig
+
+
+def agriculture_region_barh(agriculture_region_data1):
+    return region_barh(agriculture_region_data1,
+                       'Agriculture Methane Emissions Per Region 2019-2021', AGRICULTURE_COLOR)
+
+
+def energy_region_barh(energy_region_data1):
+    return region_barh(energy_region_data1,
+                       'Energy Methane Emissions Per Region 2022', ENERGY_COLOR)
+
+
+def top_country_type_barh(top5_country_data1):
+    """Stacked agriculture vs energy bars for the top countries."""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    top5_country_data1.unstack().plot(kind='barh', stacked=True, color=TYPE_COLORS, ax=ax)
+    ax.set_xlabel('Emissions (kt)')
+    ax.set_ylabel('')
+    ax.set_title(f'Agriculture vs Energy Emissions of Top {_country_count(top5_country_data1)} Countries')
+    ax.legend(title='Type', bbox_to_anchor=(1.0, 0.7), loc='upper left')
+    return fig
+
+
+def top_country_type_heatmap(top5_by_emission_type1):
+    """Heatmap of type x country emissions for the top countries."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig, ax = plt.subplots()
+    sns.heatmap(top5_by_emission_type1, cmap='YlGnBu', ax=ax)
+    ax.set_title(f'Methane Emissions by Top {top5_by_emission_type1.shape[1]} Countries and Type')
+    ax.set_xlabel('Country')
+    ax.set_ylabel('Type')
+    return fig
+
+
+def top_country_reason_bar(top5_by_energy_reasons1):
+    """Stacked fugitive vs vented bars for the top countries."""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    top5_by_energy_reasons1.plot.bar(stacked=True, color=REASON_COLORS, ax=ax)
+    ax.set_xlabel('')
+    ax.set_xticklabels(ax.get_xticklabels(), rotation=0)
+    ax.set_ylabel('Emissions (kt)')
+    ax.set_title(f'Fugitive vs Vented Energy Emissions for Top {len(top5_by_energy_reasons1)} '
+                 'Methane Emitter Countries')
+    return fig
+
+
+def segment_reason_bar(segment_reasons, title):
+    """Stacked reason bars per energy segment, for a single region or country."""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    segment_reasons.plot.barh(stacked=True, ax=ax)
+    ax.set_xlabel('Emissions (kt)')
+    ax.set_ylabel('')
+    ax.set_title(title)
+    ax.legend(title='Reason', bbox_to_anchor=(1.0, 0.7), loc='upper left')
+    return fig
+
+
+def diff_barh(deltas, title):
+    """Diverging bars of emission changes, decreases in blue and increases in red."""
+    import matplotlib.pyplot as plt
+
+    deltas = deltas.iloc[::-1]
+    fig, ax = plt.subplots(figsize=(10, max(4, 0.3 * len(deltas))))
+    ax.barh(deltas.index, deltas, color=[DIFF_COLORS[value > 0] for value in deltas])
+    ax.axvline(0, color='black', linewidth=0.8)
+    ax.set_xlabel('Change in emissions (kt)')
+    ax.set_title(title)
+    return fig
+
+
+def diff_heatmap(deltas):
+    """Heatmap of country x type emission changes, on a colour scale centred at zero."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig, ax = plt.subplots(figsize=(8, max(4, 0.35 * len(deltas))))
+    sns.heatmap(deltas, cmap='RdBu_r', center=0, annot=True, fmt='+.1f', ax=ax)
+    ax.set_title('Change in Methane Emissions by Country and Type')
+    ax.set_xlabel('Type')
+    ax.set_ylabel('Country')
+    return fig
+
+
+def agriculture_choropleth(countries_agriculture_emissions1, world=None):
+    """Map of the agriculture emissions per country, joined on ``iso_a3``.
+
+    ``world`` defaults to the cached medium resolution country polygons.
+    """
+    import matplotlib.pyplot as plt
+
+    from .geometry import load_geometry
+    from .profiling import stage
+
+    if world is None:
+        world = load_geometry('medium')
+    emissions = countries_agriculture_emissions1.dropna(subset=['iso_a3'])
+    with stage('geometry.merge', len(emissions)) as timing:
+        merged = world.merge(emissions.astype({'iso_a3': world['iso_a3'].dtype}), on='iso_a3')
+        timing.rows_out = len(merged)
+    fig, ax = plt.subplots(figsize=(10, 8))
+    merged.plot(column='emissions', cmap='Oranges', legend=True, ax=ax)
+    ax.set_title('Agriculture Methane Emissions by Country')
+    return fig
+
+
+def _country_count(table):
+    return len(table.index.get_level_values('country').unique())
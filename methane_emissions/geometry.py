@@ -0,0 +1,81 @@
+"""Bundled world country geometry for the maps.
+
+The Natural Earth low resolution countries (the dataset geopandas used to
+ship as ``naturalearth_lowres``) are stored as GeoParquet in
+``methane_emissions/data``. The file holds one geometry column per
+resolution level. Each level is simplified with topology preserved, so
+neighbouring countries keep shared borders. A map reads only the level it
+draws, and each level is read once per process and then served from memory.
+"""
+
+import os
+from functools import lru_cache
+
+from .profiling import profiled
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+GEOMETRY_PATH = os.path.join(DATA_DIR, 'naturalearth_lowres.parquet')
+ATTRIBUTES = ['name', 'iso_a3', 'continent', 'pop_est', 'gdp_md_est']
+
+# simplification tolerance in degrees for each stored resolution level
+RESOLUTIONS = {'full': 0.0, 'medium': 0.5, 'low': 1.0}
+
+
+def _geometry_column(resolution):
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f'resolution must be one of {list(RESOLUTIONS)}, not {resolution!r}')
+    return 'geometry' if resolution == 'full' else f'geometry_{resolution}'
+
+
+def simplify_coverage(geometry, tolerance):
+    """Simplify polygons without opening gaps or overlaps between neighbours.
+
+    This uses ``shapely.coverage_simplify``, which needs shapely 2.1 and
+    GEOS 3.12. Older installs fall back to simplifying each polygon on its
+    own with ``preserve_topology``.
+    """
+    import geopandas as gpd
+    import shapely
+
+    if tolerance == 0:
+        return geometry
+    try:
+        simplified = shapely.coverage_simplify(geometry.to_numpy(), tolerance)
+    except (AttributeError, shapely.errors.GEOSException, NotImplementedError):
+        return geometry.simplify(tolerance, preserve_topology=True)
+    return gpd.GeoSeries(simplified, index=geometry.index, crs=geometry.crs)
+
+
+def build_geometry_store(source, path=GEOMETRY_PATH):
+    """Convert a Natural Earth countries file into the multi-resolution GeoParquet store.
+
+    ``source`` is any file geopandas can read that has the ``ATTRIBUTES``
+    columns, for example ``naturalearth_lowres.shp``.
+    """
+    import geopandas as gpd
+
+    world = gpd.read_file(source)[ATTRIBUTES + ['geometry']]
+    # Kosovo has no ISO 3166 alpha-3 code; use the user-assigned XKX
+    world['iso_a3'] = world['iso_a3'].replace('-99', 'XKX')
+    for resolution, tolerance in RESOLUTIONS.items():
+        if resolution != 'full':
+            world[_geometry_column(resolution)] = simplify_coverage(world.geometry, tolerance)
+    world.to_parquet(path, index=False, compression='zstd')
+    return path
+
+
+@lru_cache(maxsize=None)
+@profiled('geometry.read')
+def load_geometry(resolution='medium', path=GEOMETRY_PATH):
+    """Return the country polygons at ``resolution`` as a GeoDataFrame.
+
+    The frame is cached, so treat it as read only. ``merge`` and the other
+    joins return new frames and leave it intact.
+    """
+    import geopandas as gpd
+
+    column = _geometry_column(resolution)
+    world = gpd.read_parquet(path, columns=ATTRIBUTES + [column])
+    if column != 'geometry':
+        world = world.rename_geometry('geometry')
+    return world
@@ -0,0 +1,207 @@
+"""Interactive plotly versions of the report figures, written as static HTML.
+
+Each function mirrors one builder in ``figures`` and takes the same table.
+The traces are built from pre-aggregated arrays: only the labels and the
+summed emissions per bar, slice or cell go into the page, as float32, never
+the rows behind them. The choropleth embeds the low resolution country
+polygons of the countries it colours, with coordinates snapped to a 0.1
+degree grid. That keeps the map small even with every country in it, and
+it needs no tiles or topojson from the network.
+
+Pages are written with ``include_plotlyjs='directory'``. plotly.js is
+saved once as ``plotly.min.js`` next to the pages, so each page holds only
+its data and the directory opens offline, with no server.
+
+    python -m methane_emissions.interactive IEA-MethaneEmissionsComparison-World.csv -o html
+"""
+
+import argparse
+import itertools
+import os
+import time
+
+import numpy as np
+
+from .figures import (AGRICULTURE_COLOR, ENERGY_COLOR, REASON_COLORS, TYPE_COLORS, WORLD_COLORS,
+                      _country_count)
+
+# grid, in degrees, that the choropleth coordinates are snapped to
+GRID_SIZE = 0.1
+HTML_CONFIG = {'responsive': True, 'displaylogo': False}
+
+
+def _values(values):
+    return np.asarray(values, dtype='float32')
+
+
+def _labels(index):
+    return [str(label) for label in index]
+
+
+def world_types_pie(world_data, title='World Methane Emissions per Type'):
+    import plotly.graph_objects as go
+
+    totals = world_data.groupby('type', observed=True, sort=False)['emissions'].sum()
+    pull = [0.1] + [0] * (len(totals) - 1)
+    fig = go.Figure(go.Pie(labels=_labels(totals.index), values=_values(totals), pull=pull,
+                           marker={'colors': WORLD_COLORS}, sort=False))
+    fig.update_layout(title=title)
+    return fig
+
+
+def region_barh(region_table, title, color):
+    import plotly.graph_objects as go
+
+    emissions = region_table['emissions']
+    fig = go.Figure(go.Bar(y=_labels(emissions.index), x=_values(emissions), orientation='h',
+                           marker_color=color))
+    fig.update_layout(title=title, xaxis_title='Emissions (kt)')
+    return fig
+
+
+def agriculture_region_barh(agriculture_region_data1):
+    return region_barh(agriculture_region_data1,
+                       'Agriculture Methane Emissions Per Region 2019-2021', AGRICULTURE_COLOR)
+
+
+def energy_region_barh(energy_region_data1):
+    return region_barh(energy_region_data1,
+                       'Energy Methane Emissions Per Region 2022', ENERGY_COLOR)
+
+
+def _stacked_bars(table, orientation, colors):
+    import plotly.graph_objects as go
+
+    labels = _labels(table.index)
+    traces = []
+    for column, color in zip(table.columns, itertools.cycle(colors)):
+        name = str(column[-1] if isinstance(column, tuple) else column)
+        values = _values(table[column].fillna(0))
+        x, y = (values, labels) if orientation == 'h' else (labels, values)
+        traces.append(go.Bar(x=x, y=y, name=name, orientation=orientation, marker_color=color))
+    return go.Figure(traces, layout={'barmode': 'stack'})
+
+
+def top_country_type_barh(top5_country_data1):
+    fig = _stacked_bars(top5_country_data1['emissions'].unstack(), 'h', TYPE_COLORS)
+    fig.update_layout(title='Agriculture vs Energy Emissions of Top '
+                            f'{_country_count(top5_country_data1)} Countries',
+                      xaxis_title='Emissions (kt)', legend_title='Type')
+    return fig
+
+
+def top_country_type_heatmap(top5_by_emission_type1):
+    import plotly.graph_objects as go
+
+    table = top5_by_emission_type1
+    fig = go.Figure(go.Heatmap(z=_values(table.to_numpy(dtype='float64')),
+                               x=_labels(table.columns), y=_labels(table.index),
+                               colorscale='YlGnBu', colorbar={'title': 'kt'}))
+    fig.update_layout(title=f'Methane Emissions by Top {table.shape[1]} Countries and Type',
+                      xaxis_title='Country', yaxis_title='Type')
+    return fig
+
+
+def top_country_reason_bar(top5_by_energy_reasons1):
+    fig = _stacked_bars(top5_by_energy_reasons1, 'v', REASON_COLORS)
+    fig.update_layout(title=f'Fugitive vs Vented Energy Emissions for Top '
+                            f'{len(top5_by_energy_reasons1)} Methane Emitter Countries',
+                      yaxis_title='Emissions (kt)')
+    return fig
+
+
+def segment_reason_bar(segment_reasons, title):
+    from plotly.colors import qualitative
+
+    fig = _stacked_bars(segment_reasons, 'h', qualitative.Plotly)
+    fig.update_layout(title=title, xaxis_title='Emissions (kt)', legend_title='Reason')
+    return fig
+
+
+def country_geojson(iso_a3, world=None, grid_size=GRID_SIZE):
+    """Return a GeoJSON FeatureCollection of the ``iso_a3`` countries, keyed by ``id``.
+
+    ``world`` defaults to the cached low resolution polygons. Coordinates are
+    snapped to ``grid_size`` degrees, which drops the vertices that would
+    fall closer together than that.
+    """
+    import shapely
+
+    from .geometry import load_geometry
+
+    if world is None:
+        world = load_geometry('low')
+    world = world[world['iso_a3'].isin(list(iso_a3))]
+    geometry = shapely.set_precision(world.geometry.to_numpy(), grid_size)
+    features = [{'type': 'Feature', 'id': code, 'properties': {},
+                 'geometry': shapely.geometry.mapping(shape)}
+                for code, shape in zip(world['iso_a3'], geometry) if not shape.is_empty]
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def agriculture_choropleth(countries_agriculture_emissions1, world=None):
+    """Map of the agriculture emissions per country, joined on ``iso_a3``."""
+    import plotly.graph_objects as go
+
+    emissions = (countries_agriculture_emissions1.dropna(subset=['iso_a3'])
+                 .groupby('iso_a3', observed=True)['emissions'].sum())
+    codes = _labels(emissions.index)
+    fig = go.Figure(go.Choropleth(geojson=country_geojson(codes, world), locations=codes,
+                                  z=_values(emissions), featureidkey='id', colorscale='Oranges',
+                                  marker_line_width=0.3, colorbar={'title': 'kt'}))
+    fig.update_geos(fitbounds='locations', visible=False)
+    fig.update_layout(title='Agriculture Methane Emissions by Country',
+                      margin={'l': 0, 'r': 0, 't': 40, 'b': 0})
+    return fig
+
+
+def figure_specs(tables):
+    """Return the report figures as ``render.FigureSpec`` objects over these builders."""
+    from . import render
+
+    specs = render.figure_specs(tables)
+    for spec in specs:
+        spec.builder = globals()[spec.builder.__name__]
+    return specs
+
+
+def write_html(fig, path):
+    """Write ``fig`` as a static page that loads ``plotly.min.js`` from its own directory."""
+    fig.write_html(path, include_plotlyjs='directory', full_html=True, config=HTML_CONFIG)
+    return path
+
+
+def write_all(specs, out_dir):
+    """Write every spec as ``<name>.html`` in ``out_dir`` and return (name, path, bytes, seconds)."""
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for spec in specs:
+        start = time.perf_counter()
+        path = write_html(spec.builder(spec.table, **spec.kwargs),
+                          os.path.join(out_dir, f'{spec.name}.html'))
+        written.append((spec.name, path, os.path.getsize(path), time.perf_counter() - start))
+    return written
+
+
+def main(argv=None):
+    from .cube import EmissionsCube
+    from .loader import load_emissions
+    from .ranking import top_emitters
+    from .tables import chart_tables
+
+    parser = argparse.ArgumentParser(description='Write interactive HTML versions of the figures.')
+    parser.add_argument('csv')
+    parser.add_argument('-o', '--out-dir', default='html')
+    parser.add_argument('-k', '--top', type=int, default=5,
+                        help='number of countries in the top-N figures')
+    args = parser.parse_args(argv)
+
+    cube = EmissionsCube.from_frame(load_emissions(args.csv))
+    tables = chart_tables(cube, top_emitters(cube, k=args.top))
+    print(f'{"figure":<28} {"seconds":>8} {"KiB":>8}  output')
+    for name, path, size, seconds in write_all(figure_specs(tables), args.out_dir):
+        print(f'{name:<28} {seconds:>8.3f} {size / 1024:>8.1f}  {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""Typed, cached loading of the IEA methane emissions comparison CSV.
+
+Only the columns used by the analysis are parsed. The low-cardinality text
+columns are read as categoricals and ``emissions`` as float32. The parsed
+frame is written to an uncompressed Arrow IPC (Feather v2) cache beside the
+CSV. Later loads memory-map that cache instead of parsing the CSV again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+
+from .countries import add_iso_codes
+from .profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_COLUMNS = ['region', 'country', 'type', 'segment', 'reason', 'baseYear']
+COLUMNS = ['region', 'country', 'emissions', 'type', 'segment', 'reason', 'baseYear']
+DTYPES = {**{column: 'category' for column in CATEGORY_COLUMNS}, 'emissions': 'float32'}
+
+CACHE_SUFFIX = '.arrow'
+CACHE_METADATA_KEY = b'methane_emissions.source'
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+@dataclass
+class LoadReport:
+    """How a frame was loaded: from the CSV or from the Arrow cache."""
+
+    source: str
+    seconds: float
+    rows: int
+    frame_bytes: int
+    rss_bytes: int
+
+    def __str__(self):
+        return (f'{self.source}: {self.rows:,} rows in {self.seconds * 1000:.1f} ms, '
+                f'frame {self.frame_bytes / 2**20:.2f} MiB, '
+                f'process RSS {self.rss_bytes / 2**20:.1f} MiB')
+
+
+def file_sha256(path):
+    """Return the hex SHA-256 digest of a file, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(_HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def resident_memory():
+    """Return the resident set size of this process in bytes.
+
+    psutil gives the current RSS. Without it, fall back to the peak RSS that
+    the ``resource`` module reports.
+    """
+    try:
+        import psutil
+    except ImportError:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        return peak if sys.platform == 'darwin' else peak * 1024
+    return psutil.Process().memory_info().rss
+
+
+def default_cache_path(path):
+    return os.fspath(path) + CACHE_SUFFIX
+
+
+@profiled('load.read_csv')
+def read_emissions_csv(path, **kwargs):
+    """Parse the CSV with the analysis columns and dtypes only."""
+    return pd.read_csv(path, usecols=COLUMNS, dtype=DTYPES, **kwargs)[COLUMNS]
+
+
+def _source_fingerprint(path, sha256=None):
+    stat = os.stat(path)
+    return {'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': sha256 or file_sha256(path)}
+
+
+def _cached_fingerprint(cache_path):
+    import pyarrow as pa
+
+    with pa.memory_map(cache_path, 'r') as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    raw = metadata.get(CACHE_METADATA_KEY)
+    return json.loads(raw) if raw else None
+
+
+def cache_is_fresh(path, cache_path):
+    """Return the CSV's SHA-256 when the cache still matches it, else None.
+
+    When the mtime and size match, the stored hash is trusted. Otherwise the
+    CSV is hashed, so a touched but unchanged file still hits the cache.
+    """
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        cached = _cached_fingerprint(cache_path)
+    except (OSError, ValueError):
+        return None
+    if not cached:
+        return None
+    stat = os.stat(path)
+    if stat.st_size != cached['size']:
+        return None
+    if stat.st_mtime_ns == cached['mtime_ns']:
+        return cached['sha256']
+    sha256 = file_sha256(path)
+    return sha256 if sha256 == cached['sha256'] else None
+
+
+def write_cache(df, cache_path, fingerprint):
+    """Write ``df`` as an uncompressed Arrow IPC file tagged with the CSV fingerprint."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[CACHE_METADATA_KEY] = json.dumps(fingerprint).encode()
+    table = table.replace_schema_metadata(metadata)
+    tmp_path = cache_path + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, cache_path)
+
+
+@profiled('load.read_cache')
+def read_cache(cache_path):
+    """Memory-map an Arrow cache and return it as a DataFrame.
+
+    Numeric columns are not copied. They stay backed by the mapped file.
+    """
+    import pyarrow as pa
+
+    source = pa.memory_map(cache_path, 'r')
+    table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+@profiled('load')
+def load_emissions(path, cache=True, cache_path=None):
+    """Load the emissions CSV as a typed frame, going through the Arrow cache.
+
+    The returned frame has the columns in ``COLUMNS`` plus a categorical
+    ``iso_a3`` column coded from ``country``. ``df.attrs['load']`` holds a
+    ``LoadReport``, ``df.attrs['country_match']`` holds a
+    ``CountryMatchReport``, and ``df.attrs['content_hash']`` holds the SHA-256
+    of the source CSV. Caching is skipped when pyarrow is not installed.
+    """
+    if cache:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            logger.warning('pyarrow is not installed; loading %s without a cache', path)
+            cache = False
+    cache_path = cache_path or default_cache_path(path)
+
+    start = time.perf_counter()
+    sha256 = cache_is_fresh(path, cache_path) if cache else None
+    if sha256:
+        df = read_cache(cache_path)
+        source = 'cache'
+    else:
+        df = read_emissions_csv(path)
+        source = 'csv'
+        if cache:
+            fingerprint = _source_fingerprint(path)
+            sha256 = fingerprint['sha256']
+            write_cache(df, cache_path, fingerprint)
+        else:
+            sha256 = file_sha256(path)
+    seconds = time.perf_counter() - start
+
+    report = LoadReport(source=source,
+                        seconds=seconds,
+                        rows=len(df),
+                        frame_bytes=int(df.memory_usage(deep=True).sum()),
+                        rss_bytes=resident_memory())
+    logger.info('loaded %s from %s', path, report)
+    df.attrs['load'] = report
+    df.attrs['content_hash'] = sha256
+    add_iso_codes(df)
+    logger.info('%s', df.attrs['country_match'])
+    return df
@@ -0,0 +1,242 @@
+"""Memoized analysis results keyed on the cube's content hash.
+
+A ``ResultCache`` maps (function, cube content hash, arguments) to the
+result of the call. The in-process tier is an LRU bounded by the estimated
+size of the cached results in bytes. With ``directory`` set, results are
+also pickled to disk, so a new process or an evicted entry is served without
+recomputing. Counters for hits, misses, disk hits and evictions are kept in
+``cache.stats``.
+
+    from methane_emissions import memo
+
+    memo.table(cube, 'region', type='Energy', segment='Total', reason='All', include_world=False)
+    memo.top_emitters(cube, k=5)
+    print(memo.default_cache().stats)
+
+``report.analyze`` and the HTTP service's drill-down tree go through this
+cache, so with ``METHANE_CACHE_DIR`` set a restart reuses them. Cached
+results are shared between callers, like ``load_geometry``'s frames. Copy
+a result before modifying it.
+"""
+
+import functools
+import hashlib
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .cube import EmissionsCube
+from .drilldown import DrillDownIndex
+from .ranking import country_totals as _country_totals
+from .ranking import top_emitters as _top_emitters
+from .stats import emission_statistics as _emission_statistics
+from .tables import chart_tables as _chart_tables
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+
+@dataclass
+class CacheStats:
+    """Counters of a ``ResultCache``."""
+
+    hits: int = 0
+    misses: int = 0
+    disk_hits: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __str__(self):
+        return (f'{self.hits} hits ({self.disk_hits} from disk), {self.misses} misses, '
+                f'{self.hit_rate:.1%} hit rate, {self.entries} entries in '
+                f'{self.bytes / 2**20:.2f} MiB, {self.evictions} evictions')
+
+
+def result_size(value):
+    """Estimate the memory held by a cached result, in bytes."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, pd.Index):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(result_size(key) + result_size(item)
+                                          for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(result_size(item) for item in value)
+    if hasattr(value, '__dict__'):  # e.g. a DrillDownIndex
+        return sys.getsizeof(value) + result_size(vars(value))
+    return sys.getsizeof(value)
+
+
+def _normalize(value):
+    """Reduce an argument to builtins whose repr is exact, so equal arguments give one key.
+
+    Cubes stand for their content hash, and frames, series and arrays for a
+    SHA-256 of their values and labels; their printed repr is neither unique
+    (it is truncated) nor stable (it depends on the display options).
+    """
+    if isinstance(value, np.generic):  # before float, which np.float64 subclasses
+        return value.item()
+    if value is None or isinstance(value, (str, bytes, bool, int, float)):
+        return value
+    if isinstance(value, EmissionsCube):
+        return ('cube', value.content_hash)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        frame = value.to_frame() if isinstance(value, pd.Series) else value
+        rows = pd.util.hash_pandas_object(frame, index=True).to_numpy()
+        return (type(value).__name__, _normalize(list(frame.columns)),
+                tuple(str(dtype) for dtype in frame.dtypes),
+                hashlib.sha256(rows.tobytes()).hexdigest())
+    if isinstance(value, np.ndarray) and value.dtype != object:
+        return ('ndarray', str(value.dtype), value.shape,
+                hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest())
+    if isinstance(value, dict):
+        return ('dict', tuple(sorted(((_normalize(key), _normalize(item))
+                                      for key, item in value.items()), key=repr)))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted((_normalize(item) for item in value), key=repr))
+    if isinstance(value, (list, tuple, pd.Index, np.ndarray)):
+        return tuple(_normalize(item) for item in value)
+    raise TypeError(f'cannot derive a cache key from a {type(value).__name__} argument')
+
+
+def result_key(name, cube, args=(), kwargs=None):
+    """Return the cache key of ``name(cube, *args, **kwargs)`` as a hex digest.
+
+    The key is the cube's content hash plus the normalized arguments (see
+    ``_normalize``), so it changes with the data and with nothing else.
+    """
+    params = (tuple(_normalize(arg) for arg in args),
+              tuple(sorted((key, _normalize(value)) for key, value in (kwargs or {}).items())))
+    text = repr((name, cube.content_hash, params))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResultCache:
+    """Size-bounded LRU of analysis results, with an optional pickle directory."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.pkl')
+
+    def get(self, key, default=None):
+        """Return the cached result for ``key``, from memory or disk."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return self._entries[key][0]
+        if self.directory and os.path.exists(self._path(key)):
+            with open(self._path(key), 'rb') as handle:
+                value = pickle.load(handle)
+            self._store(key, value)
+            with self._lock:
+                self.stats.hits += 1
+                self.stats.disk_hits += 1
+            return value
+        with self._lock:
+            self.stats.misses += 1
+        return default
+
+    def put(self, key, value):
+        """Cache ``value`` under ``key`` in memory and, if enabled, on disk."""
+        if self.directory:
+            path = self._path(key)
+            with open(path + '.tmp', 'wb') as handle:
+                pickle.dump(value, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + '.tmp', path)
+        self._store(key, value)
+
+    def _store(self, key, value):
+        size = result_size(value)
+        with self._lock:
+            if key in self._entries:
+                self.stats.bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                self.stats.entries = len(self._entries)
+                return
+            self._entries[key] = (value, size)
+            self.stats.bytes += size
+            while self.stats.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.stats.bytes -= evicted
+                self.stats.evictions += 1
+            self.stats.entries = len(self._entries)
+
+    def clear(self, disk=False):
+        """Drop every in-memory entry, and the pickled ones too if ``disk``."""
+        with self._lock:
+            self._entries.clear()
+            self.stats.entries = self.stats.bytes = 0
+        if disk and self.directory:
+            for name in os.listdir(self.directory):
+                if name.endswith('.pkl'):
+                    os.remove(os.path.join(self.directory, name))
+
+
+_default_cache = ResultCache(max_bytes=int(os.environ.get('METHANE_CACHE_BYTES', DEFAULT_MAX_BYTES)),
+                             directory=os.environ.get('METHANE_CACHE_DIR') or None)
+
+
+def default_cache():
+    """The process-wide cache used by ``memoize`` when no cache is given."""
+    return _default_cache
+
+
+def memoize(func=None, cache=None):
+    """Cache ``func(cube, *args, **kwargs)`` on the cube's content hash and the arguments.
+
+    Without ``cache`` the wrapper looks up ``default_cache()`` on every call.
+    """
+    if func is None:
+        return functools.partial(memoize, cache=cache)
+    name = f'{func.__module__}.{func.__qualname__}'
+
+    @functools.wraps(func)
+    def wrapper(cube, *args, **kwargs):
+        store = cache if cache is not None else default_cache()
+        key = result_key(name, cube, args, kwargs)
+        missing = object()
+        result = store.get(key, missing)
+        if result is missing:
+            result = func(cube, *args, **kwargs)
+            store.put(key, result)
+        return result
+
+    return wrapper
+
+
+select = memoize(EmissionsCube.select)
+rollup = memoize(EmissionsCube.rollup)
+table = memoize(EmissionsCube.table)
+country_totals = memoize(_country_totals)
+top_emitters = memoize(_top_emitters)
+emission_statistics = memoize(_emission_statistics)
+chart_tables = memoize(_chart_tables)
+drilldown_index = memoize(DrillDownIndex.from_cube)
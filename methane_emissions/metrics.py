@@ -0,0 +1,237 @@
+"""Emission intensities per country and CO2-equivalent conversion.
+
+Country emissions are joined on ISO alpha-3 code to a reference table and
+divided by it, for every country at once:
+
+* ``population`` and ``gdp_musd`` (GDP in million USD) come from the
+  bundled Natural Earth attributes (``pop_est``, ``gdp_md_est``);
+* ``land_area_km2`` is the equal-area size of the bundled country polygons,
+  when geopandas is installed;
+* ``oil_production``, ``gas_production`` and ``coal_production`` are read
+  from a user CSV, which can also override any of the columns above.
+
+The reference CSV has an ``iso_a3`` or a ``country`` column plus any of the
+``REFERENCE_COLUMNS``. Production is taken in whatever unit the CSV uses,
+and the intensities are in kt CH4 per that unit.
+
+Methane is converted to CO2-equivalent with the IPCC AR6 global warming
+potentials, which differ for fossil and non-fossil (biogenic) methane.
+Energy segments are fossil except Bioenergy; Agriculture, Waste and Other
+are non-fossil.
+
+Results are cached per dataset vintage, on the cube's content hash and the
+reference file's modification time.
+
+    python -m methane_emissions.metrics IEA-MethaneEmissionsComparison-World.csv --sort per_capita_kg
+"""
+
+import argparse
+import logging
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .countries import iso_codes
+from .drilldown import component_series
+from .geometry import GEOMETRY_PATH
+from .memo import memoize
+
+logger = logging.getLogger(__name__)
+
+# IPCC AR6 WG1, Table 7.15: kg CO2 per kg CH4
+GWP = {
+    'GWP20': {'fossil': 82.5, 'non_fossil': 79.7},
+    'GWP100': {'fossil': 29.8, 'non_fossil': 27.0},
+}
+NON_FOSSIL_SEGMENTS = ('Bioenergy',)
+FOSSIL_TYPES = ('Energy',)
+
+# the Energy segments each production intensity is computed over
+PRODUCTION_SEGMENTS = {
+    'oil': ('Offshore oil', 'Onshore oil'),
+    'gas': ('Offshore gas', 'Onshore gas', 'Gas pipelines and LNG facilities'),
+    'coal': ('Coking coal', 'Steam coal', 'Other from coal'),
+}
+
+REFERENCE_COLUMNS = ('population', 'gdp_musd', 'land_area_km2', 'oil_production',
+                     'gas_production', 'coal_production')
+
+# intensity column -> (emissions column, reference column, factor from kt)
+INTENSITIES = {
+    'per_capita_kg': ('emissions_kt', 'population', 1e6),
+    'per_gdp_t': ('emissions_kt', 'gdp_musd', 1e3),
+    'per_area_t': ('emissions_kt', 'land_area_km2', 1e3),
+    'co2e_per_capita_t': ('co2e_kt', 'population', 1e3),
+    'co2e_per_gdp_t': ('co2e_kt', 'gdp_musd', 1e3),
+    'oil_intensity': ('oil_kt', 'oil_production', 1.0),
+    'gas_intensity': ('gas_kt', 'gas_production', 1.0),
+    'coal_intensity': ('coal_kt', 'coal_production', 1.0),
+}
+
+EQUAL_AREA_CRS = 'ESRI:54009'  # Mollweide
+
+
+def co2e(fossil, non_fossil, horizon='GWP100'):
+    """Convert fossil and non-fossil methane to CO2-equivalent in the same mass unit."""
+    if horizon not in GWP:
+        raise ValueError(f'horizon must be one of {list(GWP)}, not {horizon!r}')
+    factors = GWP[horizon]
+    return (np.asarray(fossil, dtype='float64') * factors['fossil']
+            + np.asarray(non_fossil, dtype='float64') * factors['non_fossil'])
+
+
+def country_emissions(cube, baseYear=None):
+    """Return the emissions of every country per ISO code, split for the intensities.
+
+    The columns are ``country`` (the first name seen for the code),
+    ``emissions_kt``, ``fossil_kt``, ``non_fossil_kt`` and one ``<fuel>_kt``
+    column per ``PRODUCTION_SEGMENTS`` entry. Each column is one
+    ``np.bincount`` over the ISO codes of the leaf cells (``component_series``),
+    so no emissions are counted twice, and rows without a code (aggregates
+    such as the European Union) are left out.
+    """
+    series = component_series(cube, baseYear)
+    types = series.index.get_level_values('type')
+    segments = series.index.get_level_values('segment')
+    countries = series.index.get_level_values('country')
+
+    iso = iso_codes(countries)
+    coded = iso.codes >= 0
+    ids = iso.codes[coded]
+    values = series.to_numpy(dtype='float64')[coded]
+    size = len(iso.categories)
+
+    def total(mask=None):
+        weights = values if mask is None else np.where(np.asarray(mask)[coded], values, 0.0)
+        return np.bincount(ids, weights=weights, minlength=size)
+
+    fossil = np.asarray(types.isin(list(FOSSIL_TYPES)) & ~segments.isin(list(NON_FOSSIL_SEGMENTS)))
+    columns = {'emissions_kt': total(), 'fossil_kt': total(fossil), 'non_fossil_kt': total(~fossil)}
+    for fuel, fuel_segments in PRODUCTION_SEGMENTS.items():
+        columns[f'{fuel}_kt'] = total(segments.isin(list(fuel_segments)))
+
+    _, first = np.unique(ids, return_index=True)
+    names = np.full(size, None, dtype=object)
+    names[ids[first]] = np.asarray(countries, dtype=object)[coded][first]
+    frame = pd.DataFrame({'country': names, **columns},
+                         index=pd.Index(iso.categories, name='iso_a3'))
+    return frame[frame['country'].notna()]
+
+
+@lru_cache(maxsize=None)
+def land_area(path=GEOMETRY_PATH):
+    """Return the land area of every bundled country in km2, keyed by ISO code."""
+    from .geometry import load_geometry
+
+    world = load_geometry('full', path)
+    area = world.geometry.to_crs(EQUAL_AREA_CRS).area.to_numpy() / 1e6
+    return pd.Series(area, index=pd.Index(world['iso_a3'], name='iso_a3'),
+                     name='land_area_km2').groupby(level=0).sum()
+
+
+@lru_cache(maxsize=None)
+def _bundled_reference(path=GEOMETRY_PATH):
+    attributes = pd.read_parquet(path, columns=['iso_a3', 'pop_est', 'gdp_md_est'])
+    reference = (attributes.rename(columns={'pop_est': 'population', 'gdp_md_est': 'gdp_musd'})
+                           .groupby('iso_a3').sum().astype('float64'))
+    try:
+        reference['land_area_km2'] = land_area(path)
+    except ImportError:
+        logger.warning('geopandas is not installed; land area intensities are not available')
+    return reference
+
+
+def read_reference(path):
+    """Read a user reference CSV into a frame indexed by ISO code.
+
+    Rows are keyed by ``iso_a3`` when the column exists, and otherwise by
+    the ISO code of ``country``. Rows that resolve to no code are dropped,
+    and columns outside ``REFERENCE_COLUMNS`` are ignored.
+    """
+    frame = pd.read_csv(path)
+    if 'iso_a3' in frame:
+        codes = frame['iso_a3'].astype(str).str.upper()
+    elif 'country' in frame:
+        codes = pd.Series(np.asarray(iso_codes(frame['country']), dtype=object), index=frame.index)
+    else:
+        raise ValueError(f'{path}: the reference CSV needs an iso_a3 or a country column')
+    columns = [column for column in REFERENCE_COLUMNS if column in frame]
+    reference = frame[columns].apply(pd.to_numeric, errors='coerce').set_index(
+        pd.Index(codes, name='iso_a3'))
+    return reference[reference.index.notna()].groupby(level=0).sum(min_count=1)
+
+
+def reference_table(path=None):
+    """Return the reference values per ISO code, with the user CSV at ``path`` taking precedence."""
+    reference = _bundled_reference()
+    if path is not None:
+        reference = read_reference(path).combine_first(reference)
+    return reference.reindex(columns=[column for column in REFERENCE_COLUMNS
+                                      if column in reference])
+
+
+def compute_intensities(cube, reference, horizon='GWP100', baseYear=None):
+    """Join ``country_emissions`` to ``reference`` and return one row per country.
+
+    Every intensity in ``INTENSITIES`` whose reference column exists is
+    computed as one array division. Missing or non-positive reference values
+    give NaN instead of infinities.
+    """
+    emissions = country_emissions(cube, baseYear)
+    emissions['co2e_kt'] = co2e(emissions['fossil_kt'], emissions['non_fossil_kt'], horizon)
+    joined = emissions.join(reference, how='left')
+    for name, (numerator, denominator, factor) in INTENSITIES.items():
+        if denominator not in joined:
+            continue
+        values = joined[denominator].to_numpy(dtype='float64')
+        ratio = np.full(len(joined), np.nan)
+        np.divide(joined[numerator].to_numpy(dtype='float64') * factor, values, out=ratio,
+                  where=values > 0)
+        joined[name] = ratio
+    joined.attrs['gwp'] = horizon
+    return joined
+
+
+@memoize
+def _cached_intensities(cube, reference_path, reference_mtime, horizon, baseYear):
+    return compute_intensities(cube, reference_table(reference_path), horizon, baseYear)
+
+
+def intensities(cube, reference=None, horizon='GWP100', baseYear=None):
+    """Return ``compute_intensities`` for the bundled and optional user reference tables.
+
+    The result is cached on the cube's content hash, so each vintage is
+    computed once; editing the reference CSV invalidates it.
+    """
+    mtime = os.stat(reference).st_mtime_ns if reference is not None else None
+    return _cached_intensities(cube, reference and os.fspath(reference), mtime, horizon, baseYear)
+
+
+def main(argv=None):
+    from .cube import EmissionsCube
+    from .loader import load_emissions
+
+    parser = argparse.ArgumentParser(description='Emission intensities and CO2e per country.')
+    parser.add_argument('csv')
+    parser.add_argument('--reference', help='CSV of reference values per country')
+    parser.add_argument('--gwp', default='GWP100', choices=list(GWP))
+    parser.add_argument('--base-year')
+    parser.add_argument('--sort', default='per_capita_kg', help='column to rank countries by')
+    parser.add_argument('-n', '--top', type=int, default=20)
+    parser.add_argument('-o', '--output', help='write every country to this CSV')
+    args = parser.parse_args(argv)
+
+    cube = EmissionsCube.from_frame(load_emissions(args.csv))
+    table = intensities(cube, args.reference, args.gwp, args.base_year)
+    if args.sort not in table:
+        parser.error(f'--sort must be one of {list(table.columns[1:])}')
+    if args.output:
+        table.to_csv(args.output)
+    ranked = table.sort_values(args.sort, ascending=False, na_position='last')
+    print(ranked.head(args.top).to_string(float_format='{:,.3f}'.format))
+
+
+if __name__ == '__main__':
+    main()
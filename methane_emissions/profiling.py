@@ -0,0 +1,274 @@
+"""Stage-level profiling of the pipeline, off unless asked for.
+
+The pipeline stages (CSV parsing, the cube build, the chart tables, the
+map geometry read and merge, each figure) are wrapped in ``stage`` blocks
+or the ``profiled`` decorator. While profiling is off, a stage costs one
+global lookup. Profiling is switched on by ``enable()``, or by
+setting ``METHANE_PROFILE`` before the package is imported:
+
+    METHANE_PROFILE=trace.json python Methane_Emissions_Project.py
+    methane-report profile IEA-MethaneEmissionsComparison-World.csv -o trace.json
+
+Each stage records its wall time, its CPU time (of the calling thread),
+its peak traced allocation (``tracemalloc``) and the rows going in and out.
+Stages nest. At exit, the stages are written as a Chrome trace, which
+chrome://tracing, Perfetto and speedscope open as a flame graph, and a
+summary table per stage name is printed to stderr.
+
+Pool workers leave through ``os._exit``, so ``atexit`` never runs in them.
+The pools of ``render`` and ``batch`` call ``init_worker`` instead, and each
+worker writes ``<trace>.<pid>.json`` next to the main trace when the pool
+shuts it down.
+"""
+
+import atexit
+import functools
+import json
+import multiprocessing
+import multiprocessing.util
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+ENV_VAR = 'METHANE_PROFILE'
+DEFAULT_TRACE = 'methane-profile.json'
+
+_profiler = None
+_trace = None  # the main trace path while profiling from METHANE_PROFILE
+
+
+@dataclass
+class StageRecord:
+    """One completed stage."""
+
+    name: str
+    start: float
+    wall: float
+    cpu: float
+    peak_bytes: int = None
+    rows_in: int = None
+    rows_out: int = None
+    thread: int = 0
+    depth: int = 0
+
+
+class _Frame:
+    __slots__ = ('rows_out', 'start_bytes', 'peak_bytes')
+
+    def __init__(self, start_bytes):
+        self.rows_out = None
+        self.start_bytes = start_bytes
+        self.peak_bytes = start_bytes
+
+
+class Profiler:
+    """Collects ``StageRecord``s from every thread of the process."""
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.records = []
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        stack = self._stack()
+        start_bytes = 0
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak_bytes = max(stack[-1].peak_bytes, peak)
+            tracemalloc.reset_peak()
+            start_bytes = current
+        frame = _Frame(start_bytes)
+        stack.append(frame)
+        start, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield frame
+        finally:
+            wall, cpu = time.perf_counter() - start, time.thread_time() - cpu
+            stack.pop()
+            peak_bytes = None
+            if self.memory:
+                peak = max(frame.peak_bytes, tracemalloc.get_traced_memory()[1])
+                peak_bytes = peak - frame.start_bytes
+                if stack:
+                    stack[-1].peak_bytes = max(stack[-1].peak_bytes, peak)
+            record = StageRecord(name, start - self.origin, wall, cpu, peak_bytes, rows_in,
+                                 frame.rows_out, threading.get_ident(), len(stack))
+            with self._lock:
+                self.records.append(record)
+
+    def chrome_trace(self):
+        """Return the records as a Chrome trace event dict."""
+        pid = os.getpid()
+        events = []
+        for record in self.records:
+            args = {'cpu_ms': round(record.cpu * 1000, 3)}
+            for key in ('peak_bytes', 'rows_in', 'rows_out'):
+                if getattr(record, key) is not None:
+                    args[key] = getattr(record, key)
+            events.append({'name': record.name, 'cat': 'stage', 'ph': 'X', 'pid': pid,
+                           'tid': record.thread, 'ts': round(record.start * 1e6, 3),
+                           'dur': round(record.wall * 1e6, 3), 'args': args})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_trace(self, path):
+        with open(path, 'w') as handle:
+            json.dump(self.chrome_trace(), handle)
+        return path
+
+    def summary(self):
+        """Return one row per stage name, in order of first appearance, as a frame."""
+        import pandas as pd
+
+        rows = {}
+        for record in sorted(self.records, key=lambda record: record.start):
+            row = rows.setdefault(record.name, {'stage': record.name, 'calls': 0, 'wall_s': 0.0,
+                                                'cpu_s': 0.0, 'peak_mib': None,
+                                                'rows_in': None, 'rows_out': None})
+            row['calls'] += 1
+            row['wall_s'] += record.wall
+            row['cpu_s'] += record.cpu
+            if record.peak_bytes is not None:
+                row['peak_mib'] = max(row['peak_mib'] or 0.0, record.peak_bytes / 2**20)
+            for key in ('rows_in', 'rows_out'):
+                if getattr(record, key) is not None:
+                    row[key] = (row[key] or 0) + getattr(record, key)
+        return pd.DataFrame(list(rows.values()),
+                            columns=['stage', 'calls', 'wall_s', 'cpu_s', 'peak_mib',
+                                     'rows_in', 'rows_out'])
+
+    def format_summary(self):
+        summary = self.summary().astype({'peak_mib': 'float64'})
+        for key in ('rows_in', 'rows_out'):
+            summary[key] = summary[key].astype('Int64')
+        return summary.to_string(index=False, float_format='{:.3f}'.format, na_rep='')
+
+
+class _NullStage:
+    """What ``stage`` returns while profiling is off."""
+
+    rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name, rows_in=None):
+    """Context manager timing the block as stage ``name``; set ``.rows_out`` on what it yields."""
+    if _profiler is None:
+        return _NULL_STAGE
+    return _profiler.stage(name, rows_in)
+
+
+def _rows(value):
+    shape = getattr(value, 'shape', None)
+    if shape is not None:
+        return shape[0] if shape else None
+    if hasattr(value, 'series'):  # an EmissionsCube
+        return len(value)
+    return None
+
+
+def profiled(name=None):
+    """Decorator recording each call as a stage, with the rows of the first argument and result."""
+    def decorate(func):
+        stage_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return func(*args, **kwargs)
+            with _profiler.stage(stage_name, _rows(args[0]) if args else None) as frame:
+                result = func(*args, **kwargs)
+                frame.rows_out = _rows(result)
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+def enabled():
+    return _profiler is not None
+
+
+def enable(memory=True):
+    """Start profiling this process and return the ``Profiler``."""
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(memory)
+    return _profiler
+
+
+def disable():
+    """Stop profiling and return the ``Profiler`` that was collecting, if any."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None and profiler.memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return profiler
+
+
+def _trace_path(setting):
+    path = DEFAULT_TRACE if setting.lower() in ('1', 'true', 'yes', 'on') else setting
+    if multiprocessing.parent_process() is not None:
+        stem, ext = os.path.splitext(path)
+        path = f'{stem}.{os.getpid()}{ext or ".json"}'
+    return path
+
+
+def init_worker():
+    """Pool initializer: profile this worker afresh and write its trace at shutdown.
+
+    A forked worker inherits the parent's records and open stages; they are
+    dropped so each stage is written once, by the process that ran it. The
+    trace is written by a ``multiprocessing`` finalizer, which runs when the
+    worker process ends its loop, unlike ``atexit``. Does nothing unless
+    profiling was switched on with ``METHANE_PROFILE``.
+    """
+    global _profiler
+    inherited = _profiler
+    if _trace is None or inherited is None:
+        return
+    _profiler = None
+    enable(inherited.memory).origin = inherited.origin
+    multiprocessing.util.Finalize(None, _write_at_exit, args=(_trace_path(_trace),),
+                                  exitpriority=10)
+
+
+def _write_at_exit(path):
+    profiler = disable()
+    if profiler is None or not profiler.records:
+        return
+    profiler.write_trace(path)
+    print(profiler.format_summary(), file=sys.stderr)
+    print(f'trace written to {path}', file=sys.stderr)
+
+
+_setting = os.environ.get(ENV_VAR, '')
+if _setting.lower() not in ('', '0', 'false', 'no', 'off'):
+    _trace = _setting
+    enable()
+    atexit.register(_write_at_exit, _trace_path(_setting))
+
@@ -0,0 +1,65 @@
+"""Data-driven selection of the largest emitting countries.
+
+The countries are ranked from the cube, not taken from a hard-coded list.
+``np.argpartition`` finds the k largest totals in O(n), and only those k
+are sorted.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .countries import AGGREGATE_COUNTRIES
+from .profiling import profiled
+from .stats import ALL_REASONS, TOTAL_SEGMENT
+
+
+def largest(values, k):
+    """Return the positions of the ``k`` largest ``values``, largest first.
+
+    Ties are broken by position, as in a stable full sort: ``argpartition``
+    only finds the k-th largest value, and the values tied with it are
+    taken in order.
+    """
+    values = np.asarray(values)
+    if k <= 0 or len(values) == 0:
+        return np.array([], dtype=int)
+    if k < len(values):
+        kth = values[np.argpartition(-values, k - 1)[k - 1]]
+        above = np.flatnonzero(values > kth)
+        ties = np.flatnonzero(values == kth)[:k - len(above)]
+        positions = np.concatenate([above, ties])
+    else:
+        positions = np.arange(len(values))
+    return positions[np.lexsort((positions, -values[positions]))]
+
+
+def country_totals(cube, type=None, segment=TOTAL_SEGMENT, reason=None,
+                   exclude=AGGREGATE_COUNTRIES):
+    """Return emissions summed per country for the selected type(s) and segment(s).
+
+    ``reason`` defaults to ``All`` for the Total segment and to every reason
+    otherwise, so a component segment is summed over its reasons.
+    """
+    if reason is None and segment == TOTAL_SEGMENT:
+        reason = ALL_REASONS
+    selected = cube.select_series(type=type, segment=segment, reason=reason,
+                                  include_world=False)
+    totals = selected.groupby(level='country', observed=True, sort=False).sum()
+    if exclude:
+        totals = totals[~totals.index.isin(list(exclude))]
+    return totals
+
+
+@profiled('rank.top_emitters')
+def top_emitters(cube, k=5, type=None, segment=TOTAL_SEGMENT, reason=None,
+                 exclude=AGGREGATE_COUNTRIES):
+    """Return the ``k`` largest emitting countries as an Index, largest first.
+
+    With ``type=None`` the countries are ranked by their total over all
+    types. Pass a type, a segment, or lists of them to rank on that part of
+    the data. Pass the returned Index as the ``country`` filter of every
+    top-N view, so the ranking is computed only once.
+    """
+    totals = country_totals(cube, type=type, segment=segment, reason=reason, exclude=exclude)
+    positions = largest(totals.to_numpy(dtype='float64'), k)
+    return pd.Index(list(totals.index.take(positions)), name='country')
@@ -0,0 +1,155 @@
+"""Headless batch rendering of the report figures.
+
+Each figure is described by a ``FigureSpec``: the builder function from
+``figures`` and the table it plots. ``render_all`` renders the specs in
+parallel on a process pool. Every worker uses the Agg backend, saves each
+figure in the requested formats, and closes it before the next one, so
+memory stays bounded. The wall-clock render time of each figure is reported.
+
+    python -m methane_emissions.render IEA-MethaneEmissionsComparison-World.csv -o figures -f png svg
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from . import figures
+from . import profiling
+from .profiling import stage
+
+FORMATS = ('png', 'svg', 'pdf')
+
+
+@dataclass
+class FigureSpec:
+    """One figure to render: a name, its builder, and the table it plots."""
+
+    name: str
+    builder: object
+    table: object
+    kwargs: dict = field(default_factory=dict)
+
+
+@dataclass
+class RenderResult:
+    name: str
+    seconds: float
+    paths: list
+    error: str = None
+
+
+# figure name -> (builder in ``figures``, the ``chart_tables`` table it plots)
+FIGURES = {
+    'world_types_pie': (figures.world_types_pie, 'world_data'),
+    'agriculture_region_barh': (figures.agriculture_region_barh, 'agriculture_region_data1'),
+    'energy_region_barh': (figures.energy_region_barh, 'energy_region_data1'),
+    'top_country_type_barh': (figures.top_country_type_barh, 'top5_country_data1'),
+    'top_country_type_heatmap': (figures.top_country_type_heatmap, 'top5_by_emission_type1'),
+    'top_country_reason_bar': (figures.top_country_reason_bar, 'top5_by_energy_reasons1'),
+    'agriculture_choropleth': (figures.agriculture_choropleth, 'countries_agriculture_emissions1'),
+}
+
+
+def figure_specs(tables):
+    """Return the seven report figures as specs over the ``chart_tables`` output."""
+    return [FigureSpec(name, builder, tables[table]) for name, (builder, table) in FIGURES.items()]
+
+
+def use_agg():
+    """Select the non-interactive Agg backend. Call it before pyplot is used."""
+    import matplotlib
+
+    matplotlib.use('Agg')
+
+
+def _init_worker():
+    use_agg()
+    profiling.init_worker()
+
+
+def render_figure(spec, out_dir, formats=('png',), dpi=150):
+    """Build one figure, save it in every format, close it, and time it.
+
+    A failing builder is recorded in ``RenderResult.error``. It does not stop
+    the rest of the batch.
+    """
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    paths = []
+    fig = None
+    try:
+        with stage(f'figure.{spec.name}', len(spec.table)):
+            with stage('figure.build'):
+                fig = spec.builder(spec.table, **spec.kwargs)
+            with stage('figure.save'):
+                for fmt in formats:
+                    path = os.path.join(out_dir, f'{spec.name}.{fmt}')
+                    fig.savefig(path, dpi=dpi, bbox_inches='tight')
+                    paths.append(path)
+        error = None
+    except Exception as exc:  # reported per figure, the batch carries on
+        error = f'{type(exc).__name__}: {exc}'
+    finally:
+        if fig is not None:
+            plt.close(fig)
+    return RenderResult(spec.name, time.perf_counter() - start, paths, error)
+
+
+def render_all(specs, out_dir, formats=('png',), workers=None, dpi=150):
+    """Render ``specs`` on a process pool and return their results in spec order.
+
+    ``workers=1`` renders in this process without a pool.
+    """
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f'unsupported formats {sorted(unknown)}; choose from {FORMATS}')
+    os.makedirs(out_dir, exist_ok=True)
+    if workers == 1:
+        use_agg()
+        return [render_figure(spec, out_dir, formats, dpi) for spec in specs]
+
+    order = {spec.name: i for i, spec in enumerate(specs)}
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(render_figure, spec, out_dir, formats, dpi) for spec in specs]
+        for future in as_completed(futures):
+            results.append(future.result())
+    return sorted(results, key=lambda result: order[result.name])
+
+
+def format_results(results):
+    lines = [f'{"figure":<28} {"seconds":>8}  output']
+    for result in results:
+        outcome = result.error or ', '.join(result.paths)
+        lines.append(f'{result.name:<28} {result.seconds:>8.3f}  {outcome}')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    from .cube import EmissionsCube
+    from .loader import load_emissions
+    from .ranking import top_emitters
+    from .tables import chart_tables
+
+    parser = argparse.ArgumentParser(description='Render every report figure headlessly.')
+    parser.add_argument('csv')
+    parser.add_argument('-o', '--out-dir', default='figures')
+    parser.add_argument('-f', '--formats', nargs='+', default=['png'], choices=FORMATS)
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    parser.add_argument('-k', '--top', type=int, default=5,
+                        help='number of countries in the top-N figures')
+    parser.add_argument('--dpi', type=int, default=150)
+    args = parser.parse_args(argv)
+
+    cube = EmissionsCube.from_frame(load_emissions(args.csv))
+    tables = chart_tables(cube, top_emitters(cube, k=args.top))
+    results = render_all(figure_specs(tables), args.out_dir, args.formats, args.workers, args.dpi)
+    print(format_results(results))
+    return 1 if any(result.error for result in results) else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
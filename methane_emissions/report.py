@@ -0,0 +1,76 @@
+"""The analysis pipeline as importable functions.
+
+``analyze`` runs what the notebook script does (load, cube, top emitters,
+chart tables, region statistics) and returns the results without printing
+or plotting. Only pandas/numpy are imported, so services can call it
+without paying for matplotlib, seaborn or geopandas.
+
+    from methane_emissions.report import analyze
+
+    report = analyze('IEA-MethaneEmissionsComparison-World.csv')
+    report.tables['energy_region_data1']
+"""
+
+import os
+from dataclasses import dataclass
+
+import pandas as pd
+
+from . import memo
+from .cube import EmissionsCube
+from .loader import load_emissions
+
+TABLE_FORMATS = ('csv', 'json', 'parquet')
+
+
+@dataclass
+class Report:
+    """Everything the report shows, computed from one dataset."""
+
+    cube: EmissionsCube
+    top: pd.Index
+    tables: dict
+    statistics: pd.DataFrame
+
+
+def world_emissions_table(cube):
+    """World emissions per type, largest first."""
+    table = cube.table('type', region='World', segment='Total')
+    return table.sort_values(by=['emissions'], ascending=False).rename_axis('World Emission Types')
+
+
+def analyze(path, k=5, cache=True, level='region'):
+    """Load ``path`` and compute every table of the report.
+
+    ``k`` is the number of countries in the top-N views. ``level`` is the
+    level the summary statistics are computed over. The ranking, chart
+    tables and statistics come from the ``memo`` cache, so a vintage that
+    was analyzed before is not recomputed; the tables are shared with it.
+    """
+    cube = EmissionsCube.from_frame(load_emissions(path, cache=cache))
+    top = memo.top_emitters(cube, k=k)
+    tables = {'world_emissions_data': world_emissions_table(cube)}
+    tables.update(memo.chart_tables(cube, top))
+    return Report(cube, top, tables, memo.emission_statistics(cube, level=level))
+
+
+def write_tables(tables, out_dir, format='csv'):
+    """Write each table to ``out_dir/<name>.<format>`` and return the paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for name, table in tables.items():
+        path = os.path.join(out_dir, f'{name}.{format}')
+        if format == 'csv':
+            table.to_csv(path)
+        elif format == 'json':
+            table.to_json(path, orient='split', default_handler=str)
+        elif format == 'parquet':
+            flat = table.copy()
+            flat.attrs = {}
+            flat.columns = [' '.join(map(str, column)) if isinstance(column, tuple) else str(column)
+                            for column in flat.columns]
+            flat.to_parquet(path)
+        else:
+            raise ValueError(f'unknown table format {format!r}, expected one of {TABLE_FORMATS}')
+        paths.append(path)
+    return paths
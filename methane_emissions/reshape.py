@@ -0,0 +1,46 @@
+"""Chart tables reshaped straight from the sorted cube.
+
+``pd.pivot_table`` re-sorts its input, allocates a new frame per call and
+averages duplicate keys by default. The cube is already grouped and sorted
+once, so every chart table here is a groupby on cube levels followed by an
+optional ``unstack``.
+
+Aggregation contract: cells that share a table's index and column keys are
+summed (``AGGREGATION``). They are never averaged, so duplicated rows in a
+release add up instead of silently collapsing to their mean.
+"""
+
+import pandas as pd
+
+from .profiling import profiled
+
+AGGREGATION = 'sum'
+
+
+def _levels(levels):
+    if levels is None:
+        return []
+    return [levels] if isinstance(levels, str) else list(levels)
+
+
+@profiled('reshape.sum_table')
+def sum_table(series, index, columns=None, values='emissions', nest_values=False):
+    """Return ``series`` summed over the cube levels ``index`` x ``columns``.
+
+    Without ``columns`` the result has one ``values`` column, like
+    ``pd.pivot_table(frame, index=index, values=values)``. With ``columns``
+    those levels are unstacked into the columns. ``nest_values`` adds
+    ``values`` as the outer column level, as ``pivot_table`` does when
+    ``values`` is given as a list.
+    """
+    index, columns = _levels(index), _levels(columns)
+    summed = series.groupby(level=index + columns, observed=True, sort=True).agg(AGGREGATION)
+    if not columns:
+        return summed.to_frame(values)
+    table = summed.unstack(columns)
+    if nest_values:
+        table.columns = pd.MultiIndex.from_arrays(
+            [[values] * len(table.columns)]
+            + [table.columns.get_level_values(i) for i in range(table.columns.nlevels)],
+            names=[None] + columns)
+    return table
@@ -0,0 +1,234 @@
+"""Abatement what-if analysis over thousands of scenarios at once.
+
+A lever is a reduction that applies to the cells matching a set of filters,
+for example vented emissions of 'Gas pipelines and LNG facilities'. The
+levers form a coefficient matrix ``L`` (levers x cells). Each entry is the
+share of a cell's emissions the lever can reach, 1.0 by default. A
+scenario is a row of reduction fractions, one per lever. The scenarios
+form ``S`` (scenarios x levers), and the reduction of every cell under every
+scenario is ``S @ L``.
+
+The cells are the non-World leaves of the tree (``stats.leaf_mask``):
+component segments, with a segment's All row dropped where specific reasons
+exist, so no emissions are counted twice. The cells are sorted by outcome
+group once, so the group sums are a single ``np.add.reduceat``.
+
+When no cell is covered more than once (the column sums of ``L`` are at
+most 1), the engine aggregates the lever coefficients per group ahead of
+time. The outcomes are then ``S @ A``, one small product. Otherwise the
+per-cell reductions are clipped at 100%, and ``S`` is evaluated in chunks
+sized so that a chunk's (scenarios x cells) matrix fits in ``max_bytes``.
+
+    python -m methane_emissions.scenarios IEA-MethaneEmissionsComparison-World.csv --levers levers.json --steps 0 0.25 0.5 0.75 --per-region
+
+``levers.json`` maps lever names to filters::
+
+    {"gas vented": {"segment": "Gas pipelines and LNG facilities", "reason": "Vented"},
+     "onshore oil fugitive": {"segment": "Onshore oil", "reason": "Fugitive", "share": 0.8}}
+"""
+
+import argparse
+import itertools
+import json
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .cube import _is_listlike
+from .drilldown import component_series
+
+FILTER_LEVELS = ('type', 'segment', 'reason', 'region', 'country')
+OUTCOME_LEVELS = ('world', 'type', 'segment', 'reason', 'region', 'country')
+DEFAULT_MAX_BYTES = 64 * 2**20
+
+
+def emission_cells(cube, baseYear=None):
+    """Return the leaf cells the levers act on, without double counting."""
+    return component_series(cube, baseYear)
+
+
+def lever_matrix(cells, levers):
+    """Return the (levers x cells) coefficient matrix for ``levers``.
+
+    ``levers`` maps each name to a dict of ``FILTER_LEVELS`` filters (a
+    value or a list) and an optional ``share``, the fraction of the matched
+    emissions the lever can reach.
+    """
+    index = cells.index
+    matrix = np.zeros((len(levers), len(index)))
+    for row, (name, spec) in enumerate(levers.items()):
+        unknown = set(spec) - set(FILTER_LEVELS) - {'share'}
+        if unknown:
+            raise ValueError(f'lever {name!r}: unknown filters {sorted(unknown)}')
+        mask = np.ones(len(index), dtype=bool)
+        for level, wanted in spec.items():
+            if level == 'share' or wanted is None:
+                continue
+            values = list(wanted) if _is_listlike(wanted) else [wanted]
+            mask &= np.asarray(index.get_level_values(level).isin(values))
+        matrix[row, mask] = spec.get('share', 1.0)
+    return matrix
+
+
+def per_region(levers, regions):
+    """Split every lever into one lever per region, named ``'<lever> | <region>'``."""
+    return {f'{name} | {region}': {**spec, 'region': region}
+            for name, spec in levers.items() for region in regions}
+
+
+def grid(names, steps):
+    """Return every combination of ``steps`` over the levers ``names`` as a scenario frame."""
+    values = np.array(list(itertools.product(steps, repeat=len(names))), dtype='float64')
+    return pd.DataFrame(values.reshape(-1, len(names)), columns=list(names))
+
+
+def random_scenarios(names, n, seed=0, high=1.0):
+    """Return ``n`` scenarios with each lever drawn uniformly from [0, ``high``]."""
+    values = np.random.default_rng(seed).uniform(0.0, high, size=(n, len(names)))
+    return pd.DataFrame(values, columns=list(names))
+
+
+@dataclass
+class ScenarioResult:
+    """Remaining emissions (kt) per scenario and outcome group."""
+
+    scenarios: pd.DataFrame
+    remaining: pd.DataFrame
+    baseline: pd.Series
+
+    @property
+    def world(self):
+        return self.remaining.sum(axis=1).rename('world')
+
+    @property
+    def reduction(self):
+        return (self.baseline.sum() - self.world).rename('reduction')
+
+    def ranked(self, n=10):
+        """The ``n`` scenarios with the largest world reduction, with their lever settings."""
+        world = self.world.to_numpy()
+        order = np.argsort(world, kind='stable')[:n]
+        frame = self.scenarios.iloc[order].copy()
+        frame['world'] = world[order]
+        frame['reduction'] = self.baseline.sum() - world[order]
+        frame['reduction_pct'] = frame['reduction'] / self.baseline.sum() * 100
+        return frame
+
+    def groups(self, scenario, n=None):
+        """Baseline and remaining emissions per group for one scenario, largest cut first."""
+        remaining = self.remaining.iloc[scenario]
+        frame = pd.DataFrame({'baseline': self.baseline, 'remaining': remaining.to_numpy()})
+        frame['reduction'] = frame['baseline'] - frame['remaining']
+        frame = frame.sort_values('reduction', ascending=False)
+        return frame if n is None else frame.head(n)
+
+    def __str__(self):
+        best = self.ranked(1)
+        text = (f'{len(self.scenarios):,} scenarios over {self.scenarios.shape[1]} levers '
+                f'and {self.remaining.shape[1]} groups; baseline {self.baseline.sum():,.1f} kt')
+        if len(best):
+            text += f', best cuts {best["reduction"].iloc[0]:,.1f} kt ({best["reduction_pct"].iloc[0]:.1f}%)'
+        return text
+
+
+class ScenarioEngine:
+    """Evaluates scenario matrices against a fixed set of cells and levers."""
+
+    def __init__(self, cells, levers, by='region'):
+        if by not in OUTCOME_LEVELS:
+            raise ValueError(f'by must be one of {OUTCOME_LEVELS}, not {by!r}')
+        self.levers = list(levers)
+        self.by = by
+        if by == 'world':
+            codes, labels = np.zeros(len(cells), dtype=int), pd.Index(['World'], name='world')
+        else:
+            codes, labels = pd.factorize(cells.index.get_level_values(by), sort=True)
+            labels = pd.Index(labels, name=by)
+        order = np.argsort(codes, kind='stable')
+        self.labels = labels
+        self.emissions = cells.to_numpy(dtype='float64')[order]
+        self.matrix = lever_matrix(cells, levers)[:, order]
+        self.starts = np.searchsorted(codes[order], np.arange(len(labels)))
+        self.baseline = pd.Series(self._group_sums(self.emissions), index=labels,
+                                  name='emissions')
+        # levers never overlap on a cell: group outcomes are linear in the scenario
+        self.linear = bool((self.matrix.sum(axis=0) <= 1.0 + 1e-12).all())
+        self.impact = self._group_sums(self.matrix * self.emissions)
+
+    @classmethod
+    def from_cube(cls, cube, levers, by='region', baseYear=None):
+        return cls(emission_cells(cube, baseYear), levers, by)
+
+    def _group_sums(self, values):
+        if values.shape[-1] == 0:
+            return np.zeros(values.shape[:-1] + (len(self.labels),))
+        return np.add.reduceat(values, self.starts, axis=-1)
+
+    def chunk_size(self, max_bytes=DEFAULT_MAX_BYTES):
+        """Scenarios per chunk, so that one chunk's working matrix fits in ``max_bytes``."""
+        width = len(self.labels) if self.linear else self.matrix.shape[1]
+        return max(1, int(max_bytes // (8 * max(width, 1))))
+
+    def evaluate(self, scenarios, max_bytes=DEFAULT_MAX_BYTES):
+        """Return a ``ScenarioResult`` for a scenarios frame with one column per lever."""
+        missing = set(self.levers) - set(scenarios.columns)
+        if missing:
+            raise ValueError(f'scenarios lack the levers {sorted(missing)}')
+        values = scenarios[self.levers].to_numpy(dtype='float64')
+        if ((values < 0) | (values > 1)).any():
+            raise ValueError('reduction fractions must lie in [0, 1]')
+        remaining = np.empty((len(values), len(self.labels)))
+        baseline = self.baseline.to_numpy()
+        step = self.chunk_size(max_bytes)
+        for start in range(0, len(values), step):
+            chunk = values[start:start + step]
+            if self.linear:
+                remaining[start:start + step] = baseline - chunk @ self.impact
+            else:
+                cut = np.minimum(chunk @ self.matrix, 1.0)
+                np.subtract(1.0, cut, out=cut)
+                cut *= self.emissions
+                remaining[start:start + step] = self._group_sums(cut)
+        return ScenarioResult(scenarios.reset_index(drop=True),
+                              pd.DataFrame(remaining, columns=self.labels), self.baseline)
+
+
+def main(argv=None):
+    from .cube import WORLD, EmissionsCube
+    from .loader import load_emissions
+
+    parser = argparse.ArgumentParser(description='Evaluate abatement scenarios.')
+    parser.add_argument('csv')
+    parser.add_argument('--levers', required=True, help='JSON file of lever name -> filters')
+    parser.add_argument('--per-region', action='store_true', help='one lever per region')
+    parser.add_argument('--steps', type=float, nargs='+',
+                        help='sweep every combination of these reduction fractions')
+    parser.add_argument('--random', type=int, default=10_000,
+                        help='number of random scenarios when no --steps are given')
+    parser.add_argument('--by', default='region', choices=OUTCOME_LEVELS)
+    parser.add_argument('-n', '--top', type=int, default=10)
+    parser.add_argument('--max-mib', type=float, default=DEFAULT_MAX_BYTES / 2**20,
+                        help='memory bound of one evaluation chunk')
+    args = parser.parse_args(argv)
+
+    with open(args.levers) as handle:
+        levers = json.load(handle)
+    cube = EmissionsCube.from_frame(load_emissions(args.csv))
+    if args.per_region:
+        regions = [region for region in cube.series.index.unique('region').dropna()
+                   if region != WORLD]
+        levers = per_region(levers, sorted(regions))
+    engine = ScenarioEngine.from_cube(cube, levers, args.by)
+    scenarios = (grid(levers, args.steps) if args.steps
+                 else random_scenarios(levers, args.random))
+    result = engine.evaluate(scenarios, int(args.max_mib * 2**20))
+    print(result)
+    print(result.ranked(args.top).to_string(float_format='{:,.2f}'.format))
+    print()
+    print(result.groups(int(np.argmin(result.world.to_numpy())), args.top)
+                .to_string(float_format='{:,.1f}'.format))
+
+
+if __name__ == '__main__':
+    main()
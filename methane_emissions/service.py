@@ -0,0 +1,289 @@
+"""Asyncio HTTP service answering emissions queries from in-memory indexes.
+
+The dataset is loaded once at startup. The cube is reduced to two small
+indexes: the Total/All emissions per (type, region, country, baseYear), and
+the leaf cells per (type, segment, reason, region, country, baseYear), which
+add up to the Totals without double counting (see ``stats.leaf_mask``).
+Every query is a groupby over one of them, except ``/drilldown``, which is
+answered by a ``DrillDownIndex`` lookup (built through ``memo``, so it is
+read back from ``METHANE_CACHE_DIR`` on a restart). A drill-down filter can be
+repeated to select several values. Rendered responses are kept in an
+LRU keyed on the request, and carry an ETag derived from the cube's content
+hash, so repeated requests and ``If-None-Match`` revalidations cost nothing.
+
+    GET /top?n=5&type=Energy&baseYear=2022     largest emitting countries
+    GET /regions?type=Agriculture              regional sums, per type when no type is given
+    GET /countries/China                       one country's emissions per type
+    GET /reasons?type=Energy&country=China     emissions per reason (fugitive, vented, ...)
+    GET /drilldown?level=segment&type=Energy&reason=Vented&segment=Onshore%20oil&segment=Offshore%20oil
+    GET /health
+
+Responses are JSON, or an Arrow IPC stream with ``?format=arrow`` or
+``Accept: application/vnd.apache.arrow.stream``.
+
+    python -m methane_emissions.service IEA-MethaneEmissionsComparison-World.csv --port 8080
+"""
+
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from . import memo
+from .countries import AGGREGATE_COUNTRIES
+from .drilldown import component_series
+from .stats import ALL_REASONS, TOTAL_SEGMENT
+
+logger = logging.getLogger(__name__)
+
+ARROW_TYPE = 'application/vnd.apache.arrow.stream'
+JSON_TYPE = 'application/json'
+ENDPOINTS = {'/top': 'largest emitting countries', '/regions': 'regional sums by type',
+             '/countries/<name>': 'emissions per type for one country',
+             '/reasons': 'emissions per reason', '/drilldown': 'sums per level of the tree',
+             '/health': 'service status'}
+MAX_HEADER_LINES = 100
+
+
+class QueryError(ValueError):
+    """A request the service cannot answer; carries the HTTP status."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class QueryIndex:
+    """The precomputed indexes the service answers from."""
+
+    def __init__(self, cube):
+        self.content_hash = cube.content_hash
+        totals = cube.select_series(segment=TOTAL_SEGMENT, reason=ALL_REASONS, include_world=False)
+        self.totals = totals.droplevel(['segment', 'reason']).rename('emissions')
+        self.segments = component_series(cube).rename('emissions')
+        self.tree = memo.drilldown_index(cube)
+        self.types = sorted(map(str, self.totals.index.unique('type')))
+        self.base_years = sorted(map(str, cube.series.index.unique('baseYear').dropna()))
+
+    def _filter(self, series, **filters):
+        for level, value in filters.items():
+            if value is None:
+                continue
+            if level == 'type' and value not in self.types:
+                raise QueryError(f'unknown type {value!r}, expected one of {self.types}', 404)
+            if level == 'baseYear' and value not in self.base_years:
+                raise QueryError(f'unknown baseYear {value!r}, expected one of '
+                                 f'{self.base_years}', 404)
+            series = series[series.index.get_level_values(level) == value]
+        return series
+
+    def top(self, n=5, type=None, baseYear=None):
+        totals = self._filter(self.totals, type=type, baseYear=baseYear)
+        totals = totals.groupby(level='country', observed=True).sum()
+        totals = totals[~totals.index.isin(list(AGGREGATE_COUNTRIES))]
+        top = totals.nlargest(n)
+        return top.rename_axis('country').reset_index()
+
+    def regions(self, type=None, baseYear=None):
+        totals = self._filter(self.totals, type=type, baseYear=baseYear)
+        levels = ['region'] if type else ['region', 'type']
+        return totals.groupby(level=levels, observed=True).sum().reset_index()
+
+    def country(self, name, baseYear=None):
+        totals = self._filter(self.totals, baseYear=baseYear)
+        totals = totals[totals.index.get_level_values('country') == name]
+        if totals.empty:
+            raise QueryError(f'unknown country {name!r}', 404)
+        return totals.groupby(level='type', observed=True).sum().reset_index()
+
+    def reasons(self, type=None, segment=None, country=None, baseYear=None):
+        segments = self._filter(self.segments, type=type, baseYear=baseYear)
+        if segment is not None:
+            segments = segments[segments.index.get_level_values('segment') == segment]
+        if country is not None:
+            segments = segments[segments.index.get_level_values('country') == country]
+        if segments.empty:
+            raise QueryError('no segment rows match the query', 404)
+        return segments.groupby(level=['type', 'reason'], observed=True).sum().reset_index()
+
+    def drilldown(self, level, filters):
+        try:
+            breakdown = self.tree.breakdown(level, **filters)
+        except ValueError as error:
+            raise QueryError(str(error))
+        return breakdown.reset_index()
+
+
+def _json_body(frame):
+    records = frame.astype({column: object for column in frame.columns
+                            if column != 'emissions'}).to_dict(orient='records')
+    return json.dumps(records, default=str).encode()
+
+
+def _arrow_body(frame):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class QueryService:
+    """Routes requests to a ``QueryIndex`` and caches the rendered responses."""
+
+    def __init__(self, index, cache_size=4096):
+        self.index = index
+        self.respond = functools.lru_cache(maxsize=cache_size)(self._respond)
+
+    def _frame(self, path, query):
+        index = self.index
+        params = dict(query)
+        baseYear = params.get('baseYear')
+        if path == '/top':
+            try:
+                n = int(params.get('n', 5))
+            except ValueError:
+                raise QueryError('n must be an integer')
+            return index.top(n, params.get('type'), baseYear)
+        if path == '/regions':
+            return index.regions(params.get('type'), baseYear)
+        if path.startswith('/countries/'):
+            return index.country(unquote(path[len('/countries/'):]), baseYear)
+        if path == '/reasons':
+            return index.reasons(params.get('type'), params.get('segment'),
+                                 params.get('country'), baseYear)
+        if path == '/drilldown':
+            filters = {}
+            for key, value in query:
+                if key != 'level':
+                    filters.setdefault(key, []).append(value)
+            return index.drilldown(params.get('level', 'type'), filters)
+        raise QueryError(f'unknown path {path!r}; endpoints: {", ".join(ENDPOINTS)}', 404)
+
+    def _respond(self, path, query, format):
+        """Return (status, content type, body, etag) for a GET of ``path``."""
+        if path == '/health':
+            body = json.dumps({'status': 'ok', 'content_hash': self.index.content_hash}).encode()
+            return 200, JSON_TYPE, body, None
+        try:
+            frame = self._frame(path, query)
+        except QueryError as error:
+            return error.status, JSON_TYPE, json.dumps({'error': str(error)}).encode(), None
+        if format == 'arrow':
+            content_type, body = ARROW_TYPE, _arrow_body(frame)
+        else:
+            content_type, body = JSON_TYPE, _json_body(frame)
+        digest = hashlib.sha256(repr((self.index.content_hash, path, query, format)).encode())
+        return 200, content_type, body, f'"{digest.hexdigest()[:32]}"'
+
+    def handle(self, target, headers):
+        """Answer one GET request, honouring ``If-None-Match``."""
+        url = urlsplit(target)
+        params = parse_qsl(url.query)
+        format = dict(params).pop('format', None)
+        params = tuple(sorted((key, value) for key, value in params if key != 'format'))
+        if format is None:
+            format = 'arrow' if ARROW_TYPE in headers.get('accept', '') else 'json'
+        status, content_type, body, etag = self.respond(url.path.rstrip('/') or '/', params, format)
+        if etag and etag in headers.get('if-none-match', ''):
+            return 304, content_type, b'', etag
+        return status, content_type, body, etag
+
+
+STATUS_TEXT = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+               405: 'Method Not Allowed'}
+
+
+async def _read_request(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    parts = line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise QueryError('malformed request line')
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        header = await reader.readline()
+        if header in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = header.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return parts[0], parts[1], parts[2], headers
+
+
+async def _serve_connection(service, reader, writer):
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except QueryError:
+                request = ('', '', 'HTTP/1.0', {})
+            if request is None:
+                break
+            method, target, version, headers = request
+            if method in ('GET', 'HEAD'):
+                status, content_type, body, etag = service.handle(target, headers)
+            else:
+                status, content_type, body, etag = (405 if method else 400), JSON_TYPE, b'', None
+            keep_alive = (version == 'HTTP/1.1'
+                          and headers.get('connection', '').lower() != 'close')
+            lines = [f'HTTP/1.1 {status} {STATUS_TEXT.get(status, "")}',
+                     f'Content-Type: {content_type}',
+                     f'Content-Length: {len(body)}',
+                     'Cache-Control: no-cache',
+                     f'Connection: {"keep-alive" if keep_alive else "close"}']
+            if etag:
+                lines.append(f'ETag: {etag}')
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            if method != 'HEAD':
+                writer.write(body)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service, host='127.0.0.1', port=8080):
+    """Serve ``service`` until cancelled."""
+    server = await asyncio.start_server(functools.partial(_serve_connection, service), host, port)
+    logger.info('serving on %s', ', '.join(str(sock.getsockname()) for sock in server.sockets))
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    from .cube import EmissionsCube
+    from .loader import load_emissions
+
+    parser = argparse.ArgumentParser(description='Serve emissions queries over HTTP.')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('csv', nargs='?')
+    source.add_argument('--store', help='serve the cube of a partitioned store instead of a CSV')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if args.store:
+        from .store import load_cube
+
+        cube = load_cube(args.store)
+    else:
+        cube = EmissionsCube.from_frame(load_emissions(args.csv))
+    service = QueryService(QueryIndex(cube))
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""In-process SQL over the partitioned Parquet store, with DuckDB.
+
+The store's ``baseYear=<year>/type=<type>/data.parquet`` files are read in
+place, as the ``emissions`` view. No frame is loaded into pandas. DuckDB
+reads the hive partition keys from the paths, so ``type`` and ``baseYear``
+predicates skip whole files. Predicates on segment, reason, region and
+country are pushed into the Parquet scan and checked against the row-group
+statistics, which are tight because the store writes each partition sorted
+by those columns. Scans and aggregations run on ``threads`` threads.
+
+The analysis tables are named views over ``cells`` (the cube: emissions
+summed per key), so an ad-hoc slice is one statement:
+
+    python -m methane_emissions.sql --store store "SELECT country, SUM(emissions) FROM emissions
+        WHERE reason = 'Flared' AND region = 'Middle East' AND baseYear = '2022' GROUP BY 1"
+    python -m methane_emissions.sql --store store --view agriculture_region_data
+    python -m methane_emissions.sql --store store --list
+"""
+
+import argparse
+import os
+
+from .countries import AGGREGATE_COUNTRIES
+from .cube import KEYS, WORLD
+from .stats import ALL_REASONS, TOTAL_SEGMENT
+from .store import DATA_FILE, PARTITION_KEYS, read_manifest
+from .tables import GAS_SEGMENT
+
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _literals(values):
+    return ', '.join(_literal(value) for value in values)
+
+
+TOP_N = 5
+
+# the analysis tables, each a view over ``cells``; {top} is the TOP_N largest emitters
+VIEWS = {
+    'world_data': f"""
+        SELECT * FROM cells WHERE region = {_literal(WORLD)} AND segment = {_literal(TOTAL_SEGMENT)}
+        ORDER BY emissions DESC""",
+    'agriculture_region_data': f"""
+        SELECT region, SUM(emissions) AS emissions FROM cells
+        WHERE type = 'Agriculture' AND segment = {_literal(TOTAL_SEGMENT)}
+          AND reason = {_literal(ALL_REASONS)} AND region <> {_literal(WORLD)}
+        GROUP BY region ORDER BY region""",
+    'energy_region_data': f"""
+        SELECT region, SUM(emissions) AS emissions FROM cells
+        WHERE type = 'Energy' AND segment = {_literal(TOTAL_SEGMENT)}
+          AND reason = {_literal(ALL_REASONS)} AND region <> {_literal(WORLD)}
+        GROUP BY region ORDER BY region""",
+    'country_totals': f"""
+        SELECT country, SUM(emissions) AS emissions FROM cells
+        WHERE segment = {_literal(TOTAL_SEGMENT)} AND reason = {_literal(ALL_REASONS)}
+          AND region <> {_literal(WORLD)} AND country NOT IN ({_literals(AGGREGATE_COUNTRIES)})
+        GROUP BY country""",
+    'top_countries': f"""
+        SELECT country, emissions FROM country_totals ORDER BY emissions DESC, country
+        LIMIT {TOP_N}""",
+    'top5_country_data': f"""
+        SELECT country, type, SUM(emissions) AS emissions FROM cells
+        WHERE country IN (SELECT country FROM top_countries) AND segment = {_literal(TOTAL_SEGMENT)}
+          AND type IN ('Agriculture', 'Energy')
+        GROUP BY country, type ORDER BY country, type""",
+    'top5_by_emission_type': f"""
+        SELECT type, country, SUM(emissions) AS emissions FROM cells
+        WHERE country IN (SELECT country FROM top_countries) AND segment = {_literal(TOTAL_SEGMENT)}
+        GROUP BY type, country ORDER BY type, country""",
+    'top5_by_energy_reasons': f"""
+        SELECT country, reason, SUM(emissions) AS emissions FROM cells
+        WHERE country IN (SELECT country FROM top_countries) AND type = 'Energy'
+          AND segment = {_literal(GAS_SEGMENT)}
+        GROUP BY country, reason ORDER BY country, reason""",
+    'countries_agriculture_emissions': f"""
+        SELECT country, SUM(emissions) AS emissions FROM cells
+        WHERE type = 'Agriculture' AND segment = {_literal(TOTAL_SEGMENT)}
+          AND region <> {_literal(WORLD)}
+        GROUP BY country ORDER BY emissions""",
+}
+
+
+class SQLBackend:
+    """A DuckDB connection with the store's rows and the analysis tables as views."""
+
+    def __init__(self, store, threads=None, memory_limit=None):
+        import duckdb
+
+        if not read_manifest(store)['partitions']:
+            raise ValueError(f'{store} has no partitions; ingest a vintage first')
+        config = {'threads': threads or os.cpu_count() or 1}
+        if memory_limit:
+            config['memory_limit'] = memory_limit
+        self.store = store
+        self.connection = duckdb.connect(':memory:', config=config)
+        pattern = os.path.join(store, *['*'] * len(PARTITION_KEYS), DATA_FILE)
+        hive_types = '{' + ', '.join(f"'{key}': 'VARCHAR'" for key in PARTITION_KEYS) + '}'
+        self.connection.execute(f"""
+            CREATE VIEW emissions AS
+            SELECT region, country, CAST(emissions AS DOUBLE) AS emissions, type, segment, reason,
+                   baseYear
+            FROM read_parquet({_literal(pattern)}, hive_partitioning = true,
+                              hive_types = {hive_types}, union_by_name = true)""")
+        keys = ', '.join(KEYS)
+        self.connection.execute(f"""
+            CREATE VIEW cells AS
+            SELECT {keys}, SUM(emissions) AS emissions FROM emissions GROUP BY {keys}""")
+        for name, query in VIEWS.items():
+            self.connection.execute(f'CREATE VIEW {name} AS {query}')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def views(self):
+        return ['emissions', 'cells'] + list(VIEWS)
+
+    def query(self, sql, params=None):
+        """Run ``sql`` and return the result as a pandas frame."""
+        return self.connection.execute(sql, params or []).df()
+
+    def arrow(self, sql, params=None):
+        """Run ``sql`` and return the result as a pyarrow Table, without pandas."""
+        return self.connection.execute(sql, params or []).fetch_arrow_table()
+
+    def view(self, name):
+        if name not in self.views():
+            raise ValueError(f'unknown view {name!r}; expected one of {self.views()}')
+        return self.query(f'SELECT * FROM {name}')
+
+    def explain(self, sql, analyze=False):
+        """Return DuckDB's physical plan for ``sql``, to check what was pushed into the scan."""
+        rows = self.connection.execute(('EXPLAIN ANALYZE ' if analyze else 'EXPLAIN ') + sql)
+        return '\n'.join(row[-1] for row in rows.fetchall())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Query the partitioned store with SQL.')
+    parser.add_argument('sql', nargs='?')
+    parser.add_argument('--store', default='store')
+    parser.add_argument('--view', help='print one of the named analysis views')
+    parser.add_argument('--list', action='store_true', help='list the views')
+    parser.add_argument('--threads', type=int)
+    parser.add_argument('--memory-limit', help="for example '4GB'")
+    parser.add_argument('--explain', action='store_true', help='print the query plan instead')
+    parser.add_argument('-o', '--output', help='write the result to a .csv or .parquet file')
+    args = parser.parse_args(argv)
+
+    with SQLBackend(args.store, args.threads, args.memory_limit) as backend:
+        if args.list:
+            print('\n'.join(backend.views()))
+            return 0
+        sql = f'SELECT * FROM {args.view}' if args.view else args.sql
+        if not sql:
+            parser.error('give a query, --view or --list')
+        if args.explain:
+            print(backend.explain(sql))
+            return 0
+        result = backend.query(sql)
+        if args.output:
+            if args.output.endswith('.parquet'):
+                result.to_parquet(args.output, index=False)
+            else:
+                result.to_csv(args.output, index=False)
+        print(result.to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
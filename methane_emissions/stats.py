@@ -0,0 +1,141 @@
+"""Summary statistics of emissions per type at any grouping level.
+
+One call computes the statistics for every emission type at once. The
+grouped emissions are sorted a single time by (type, emissions). After that
+sort, min/max, the median and the quantiles are positional lookups, and the
+totals and means come from ``np.add.reduceat``. No Python loop runs over
+the types or the groups.
+"""
+
+import numpy as np
+import pandas as pd
+
+LEVELS = ('region', 'country', 'segment')
+TOTAL_SEGMENT = 'Total'
+ALL_REASONS = 'All'
+# reported next to the inventory segments, but not included in their Total
+SEPARATE_SEGMENTS = ('Satellite-detected large oil and gas emissions',)
+
+
+def _any_in_group(groups, flags):
+    """Return, for every row, whether any row of its group has ``flags`` set."""
+    if not len(groups):
+        return np.zeros(0, dtype=bool)
+    return (np.bincount(groups, weights=flags, minlength=groups.max() + 1) > 0)[groups]
+
+
+def _group_ids(frame, columns):
+    """Return a dense group id per row for the combinations of ``columns``, NaN included."""
+    ids = np.zeros(len(frame), dtype='int64')
+    for column in columns:
+        codes, uniques = pd.factorize(frame[column], use_na_sentinel=False)
+        ids, _ = pd.factorize(ids * (len(uniques) + 1) + codes)
+    return ids
+
+
+def leaf_mask(keys):
+    """Return the rows of ``keys`` that add up without double counting.
+
+    ``keys`` is a MultiIndex or a frame of label columns with ``type``,
+    ``segment`` and ``reason``. Every other column (region, country,
+    baseYear, ...) scopes the rules below, which are applied per type and
+    place:
+
+    * the separate segments (satellite-detected emissions) are left out;
+    * a type's Total segment is left out where component segments exist;
+    * a segment's All reason is left out where itemized reasons exist.
+
+    World rows are not treated specially. Leave them out, or group by
+    region, to avoid counting them next to the regions.
+    """
+    frame = keys.to_frame(index=False) if isinstance(keys, pd.MultiIndex) else keys
+    segment, reason = frame['segment'], frame['reason']
+    separate = np.asarray(segment.isin(list(SEPARATE_SEGMENTS)))
+    total = np.asarray(segment == TOTAL_SEGMENT)
+    all_reasons = np.asarray(reason == ALL_REASONS)
+    context = [column for column in frame.columns
+               if column not in ('segment', 'reason', 'emissions')]
+    owner = _group_ids(frame, context)
+    keep = ~separate & ~(total & _any_in_group(owner, ~total & ~separate))
+    segment_owner = _group_ids(frame, context + ['segment'])
+    keep &= ~(all_reasons & _any_in_group(segment_owner, ~all_reasons & ~separate))
+    return keep
+
+
+def grouped_emissions(cube, level='region', types=None, segment=None, reason=None):
+    """Return emissions summed per (type, ``level``), World rows excluded.
+
+    The region and country levels default to the ``Total``/``All`` rows. The
+    segment level defaults to every component segment, summed over the leaf
+    cells of ``leaf_mask`` so a segment's All row and its itemized reasons
+    are not both counted.
+    """
+    if level not in LEVELS:
+        raise ValueError(f'level must be one of {LEVELS}, not {level!r}')
+    if level == 'segment':
+        if segment is None:
+            segment = sorted({key[1] for key in cube.blocks} - {TOTAL_SEGMENT})
+    else:
+        segment = TOTAL_SEGMENT if segment is None else segment
+        reason = ALL_REASONS if reason is None else reason
+    selected = cube.select_series(type=types, segment=segment, reason=reason,
+                                  include_world=False)
+    if level == 'segment':
+        selected = selected[leaf_mask(selected.index)]
+    return selected.groupby(level=['type', level], observed=True, sort=False).sum()
+
+
+def _quantile_name(q):
+    return f'q{round(q * 100):02d}'
+
+
+def emission_statistics(cube, level='region', types=None, segment=None, reason=None,
+                        quantiles=(0.25, 0.75)):
+    """Return one row of statistics per emission type across the ``level`` groups.
+
+    The columns are the level, count, total, share (of the total over all
+    selected types), min/argmin, max/argmax, max_share (of the type total),
+    mean, median, and one ``qNN`` column for each quantile. Quantiles use
+    linear interpolation, as ``Series.quantile`` does.
+    """
+    grouped = grouped_emissions(cube, level, types, segment, reason)
+    values = grouped.to_numpy(dtype='float64')
+    type_codes, type_labels = pd.factorize(grouped.index.get_level_values('type'), sort=True)
+    group_labels = grouped.index.get_level_values(level).to_numpy(dtype=object)
+
+    order = np.lexsort((values, type_codes))
+    values = values[order]
+    group_labels = group_labels[order]
+    type_codes = type_codes[order]
+
+    if len(values):
+        starts = np.flatnonzero(np.r_[True, type_codes[1:] != type_codes[:-1]])
+        stops = np.append(starts[1:], len(values))
+        totals = np.add.reduceat(values, starts)
+    else:
+        starts = stops = np.array([], dtype=int)
+        totals = np.array([])
+    counts = stops - starts
+
+    def positional(q):
+        position = starts + q * (counts - 1)
+        lower = np.floor(position).astype(int)
+        upper = np.ceil(position).astype(int)
+        return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+    result = pd.DataFrame({
+        'level': level,
+        'count': counts,
+        'total': totals,
+        'share': totals / totals.sum(),
+        'min': values[starts],
+        'argmin': group_labels[starts],
+        'max': values[stops - 1],
+        'argmax': group_labels[stops - 1],
+        'max_share': values[stops - 1] / totals,
+        'mean': totals / counts,
+        'median': positional(0.5),
+    }, index=pd.Index(type_labels[type_codes[starts]], name='type'))
+    for q in quantiles:
+        result[_quantile_name(q)] = positional(q)
+    return result
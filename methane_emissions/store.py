@@ -0,0 +1,224 @@
+"""Partitioned on-disk store for incremental ingestion of dataset vintages.
+
+The rows are partitioned by (baseYear, type), in a hive-style layout::
+
+    store/
+        manifest.json
+        baseYear=2022/type=Energy/data.parquet   # rows, without the partition columns
+        baseYear=2022/type=Energy/cube.parquet   # the partition's cube cells
+
+Ingesting a vintage first runs ``validate.validate_frame`` on it, then
+hashes each of its partitions. Only partitions whose
+content changed are rewritten and re-aggregated. Partitions are disjoint on
+(type, baseYear), so the full cube is the concatenation of the partition
+cubes and needs no new groupby.
+
+    python -m methane_emissions.store ingest IEA-MethaneEmissionsComparison-World.csv --store store
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import dataclass, field
+from urllib.parse import quote
+
+import pandas as pd
+
+from .cube import KEYS, EmissionsCube
+from .loader import CATEGORY_COLUMNS, COLUMNS, read_emissions_csv
+from .validate import ValidationError, validate_frame
+
+PARTITION_KEYS = ['baseYear', 'type']
+SORT_KEYS = ['segment', 'reason', 'region', 'country']
+MANIFEST = 'manifest.json'
+DATA_FILE = 'data.parquet'
+CUBE_FILE = 'cube.parquet'
+
+
+@dataclass
+class IngestReport:
+    """What happened to each partition during an ingest."""
+
+    vintage: str
+    added: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    unchanged: list = field(default_factory=list)
+    validation: object = None
+
+    def __str__(self):
+        text = (f'{self.vintage}: {len(self.added)} added, {len(self.changed)} changed, '
+                f'{len(self.unchanged)} unchanged partitions')
+        return text if self.validation is None else f'{text}\n{self.validation}'
+
+
+def partition_dir(store, key):
+    """Return the directory of the (baseYear, type) partition ``key``."""
+    parts = [f'{name}={quote(str(value), safe="")}' for name, value in zip(PARTITION_KEYS, key)]
+    return os.path.join(store, *parts)
+
+
+def partition_name(key):
+    return '/'.join(f'{name}={value}' for name, value in zip(PARTITION_KEYS, key))
+
+
+def partition_hash(part):
+    """Return an order-independent content hash of a partition's rows."""
+    rows = part[COLUMNS].sort_values(COLUMNS, na_position='first', ignore_index=True)
+    hashed = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+    return hashlib.sha256(hashed.tobytes()).hexdigest()
+
+
+def read_manifest(store):
+    path = os.path.join(store, MANIFEST)
+    if not os.path.exists(path):
+        return {'partitions': {}, 'vintages': []}
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def _write_manifest(store, manifest):
+    path = os.path.join(store, MANIFEST)
+    with open(path + '.tmp', 'w') as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def _write_parquet(frame, path):
+    frame.to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+
+
+def write_partition(store, key, part):
+    """Write a partition's rows and its cube cells."""
+    directory = partition_dir(store, key)
+    os.makedirs(directory, exist_ok=True)
+    # sorted, so the row-group statistics let SQL scans skip rows (see ``sql``)
+    rows = part.drop(columns=PARTITION_KEYS).sort_values(SORT_KEYS, ignore_index=True)
+    _write_parquet(rows, os.path.join(directory, DATA_FILE))
+    cube = EmissionsCube.from_frame(part).series.rename('emissions').reset_index()
+    _write_parquet(cube, os.path.join(directory, CUBE_FILE))
+
+
+def ingest(path, store, vintage=None, replace=False, validate=True, strict=False):
+    """Add the CSV vintage at ``path`` to the store and return an ``IngestReport``.
+
+    Partitions in the CSV replace the stored partitions with the same
+    (baseYear, type). Partitions the CSV does not cover are kept, unless
+    ``replace`` is set, in which case they are dropped from the store.
+
+    The vintage is validated first, and the violation counts are recorded
+    in the manifest. With ``strict`` a vintage with violations raises
+    ``ValidationError`` and the store is left untouched.
+    """
+    vintage = vintage or os.path.basename(path)
+    df = read_emissions_csv(path)
+    validation = validate_frame(df) if validate else None
+    if strict and validation is not None and not validation.ok:
+        raise ValidationError(validation)
+
+    os.makedirs(store, exist_ok=True)
+    manifest = read_manifest(store)
+    stored = manifest['partitions']
+    report = IngestReport(vintage, validation=validation)
+
+    seen = set()
+    for key, part in df.groupby(PARTITION_KEYS, observed=True, sort=True):
+        name = partition_name(key)
+        seen.add(name)
+        digest = partition_hash(part)
+        if name in stored and stored[name]['hash'] == digest:
+            report.unchanged.append(name)
+            continue
+        (report.changed if name in stored else report.added).append(name)
+        write_partition(store, key, part)
+        stored[name] = {'key': list(key), 'hash': digest, 'rows': len(part), 'vintage': vintage}
+
+    if replace:
+        for name in sorted(set(stored) - seen):
+            shutil.rmtree(partition_dir(store, stored[name]['key']), ignore_errors=True)
+            del stored[name]
+
+    manifest['vintages'].append({
+        'vintage': vintage,
+        'ingested': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'added': report.added,
+        'changed': report.changed,
+        'validation': None if validation is None else validation.counts(),
+    })
+    _write_manifest(store, manifest)
+    return report
+
+
+def _selected(manifest, baseYear=None, type=None):
+    for entry in manifest['partitions'].values():
+        entry_year, entry_type = entry['key']
+        if baseYear is not None and entry_year != baseYear:
+            continue
+        if type is not None and entry_type != type:
+            continue
+        yield entry
+
+
+def load_store(store, baseYear=None, type=None):
+    """Read the stored rows back as a typed frame, optionally for one partition value."""
+    parts = []
+    for entry in _selected(read_manifest(store), baseYear, type):
+        part = pd.read_parquet(os.path.join(partition_dir(store, entry['key']), DATA_FILE))
+        for name, value in zip(PARTITION_KEYS, entry['key']):
+            part[name] = value
+        parts.append(part)
+    if not parts:
+        return _empty_frame()
+    df = pd.concat(parts, ignore_index=True)[COLUMNS]
+    return df.astype({column: 'category' for column in CATEGORY_COLUMNS})
+
+
+def _empty_frame():
+    return pd.DataFrame({column: pd.Series(dtype='category' if column in CATEGORY_COLUMNS
+                                           else 'float32') for column in COLUMNS})
+
+
+def load_cube(store, baseYear=None, type=None):
+    """Assemble the cube from the stored partition cubes, with no new groupby."""
+    cells = [pd.read_parquet(os.path.join(partition_dir(store, entry['key']), CUBE_FILE))
+             for entry in _selected(read_manifest(store), baseYear, type)]
+    if not cells:
+        return EmissionsCube.from_frame(_empty_frame())
+    series = pd.concat(cells, ignore_index=True).set_index(KEYS)['emissions']
+    return EmissionsCube(series.sort_index())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the partitioned emissions store.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    ingest_parser = subparsers.add_parser('ingest', help='add a CSV vintage to the store')
+    ingest_parser.add_argument('csv')
+    ingest_parser.add_argument('--store', default='store')
+    ingest_parser.add_argument('--vintage', help='label for this vintage (default: file name)')
+    ingest_parser.add_argument('--replace', action='store_true',
+                               help='drop stored partitions that the CSV does not contain')
+    ingest_parser.add_argument('--no-validate', action='store_true',
+                               help='skip the consistency checks')
+    ingest_parser.add_argument('--strict', action='store_true',
+                               help='refuse a vintage that fails the consistency checks')
+    status_parser = subparsers.add_parser('status', help='list the stored partitions')
+    status_parser.add_argument('--store', default='store')
+    args = parser.parse_args(argv)
+
+    if args.command == 'ingest':
+        try:
+            print(ingest(args.csv, args.store, args.vintage, args.replace,
+                         validate=not args.no_validate, strict=args.strict))
+        except ValidationError as error:
+            print(error.report.details())
+            return 1
+    else:
+        for name, entry in sorted(read_manifest(args.store)['partitions'].items()):
+            print(f'{name:<40} {entry["rows"]:>10,} rows  {entry["vintage"]}')
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
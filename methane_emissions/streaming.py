@@ -0,0 +1,89 @@
+"""Streaming region roll-ups for CSVs too large to load into memory.
+
+The CSV is read in chunks of a bounded number of rows. Each chunk is
+filtered with the same predicates as the in-memory analysis
+(``segment == 'Total'``, ``reason == 'All'``, ``region != 'World'``), then
+reduced to partial sum/count/min/max per (type, group). The partials are
+merged after every chunk, so memory is bounded by the chunk size and the
+number of groups, however many rows the file has.
+
+    python -m methane_emissions.streaming facility-inventory.csv --chunksize 1000000
+"""
+
+import argparse
+
+import pandas as pd
+
+from .cube import WORLD
+from .loader import COLUMNS, DTYPES
+from .stats import ALL_REASONS, TOTAL_SEGMENT
+
+AGGREGATES = ['sum', 'count', 'min', 'max']
+_MERGE = {'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'}
+
+
+def _partials(chunk, by, types):
+    mask = ((chunk['segment'] == TOTAL_SEGMENT) & (chunk['reason'] == ALL_REASONS)
+            & (chunk['region'] != WORLD))
+    if types is not None:
+        mask &= chunk['type'].isin(list(types))
+    selected = chunk.loc[mask, ['type', by]]
+    emissions = chunk.loc[mask, 'emissions'].astype('float64')
+    grouped = emissions.groupby([selected['type'], selected[by]], observed=True, sort=False)
+    partial = grouped.agg(AGGREGATES)
+    # group keys come back as each chunk's own categoricals; use plain values to merge
+    partial.index = partial.index.set_levels([level.astype(object)
+                                              for level in partial.index.levels])
+    return partial
+
+
+def _merge(total, partial):
+    if total is None:
+        return partial
+    combined = pd.concat([total, partial])
+    return combined.groupby(level=[0, 1], sort=False).agg(_MERGE)
+
+
+def stream_aggregates(path, by='region', types=None, chunksize=1_000_000):
+    """Return sum/count/min/max of the emissions per (type, ``by``), streamed in chunks.
+
+    ``types`` limits the result to a list of emission types. By default
+    every type is kept.
+    """
+    usecols = [column for column in COLUMNS if column != 'baseYear']
+    dtypes = {column: DTYPES[column] for column in usecols}
+    total = None
+    with pd.read_csv(path, usecols=usecols, dtype=dtypes, chunksize=chunksize) as reader:
+        for chunk in reader:
+            total = _merge(total, _partials(chunk, by, types))
+    if total is None:
+        index = pd.MultiIndex.from_arrays([[], []], names=['type', by])
+        return pd.DataFrame(columns=AGGREGATES, index=index, dtype='float64')
+    return total.astype({'count': 'int64'}).sort_index()
+
+
+def region_data(aggregates, type, by='region'):
+    """Return the summed emissions of one type, shaped like ``agriculture_region_data``."""
+    if type not in aggregates.index.get_level_values('type'):
+        return pd.DataFrame({by: pd.Series(dtype=object), 'emissions': pd.Series(dtype='float64')})
+    sums = aggregates.xs(type, level='type')['sum']
+    return sums.rename('emissions').rename_axis(by).reset_index()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stream region roll-ups from a large CSV.')
+    parser.add_argument('csv')
+    parser.add_argument('--by', default='region', choices=['region', 'country'])
+    parser.add_argument('--types', nargs='+', default=['Agriculture', 'Energy'])
+    parser.add_argument('--chunksize', type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    aggregates = stream_aggregates(args.csv, args.by, args.types, args.chunksize)
+    for type in args.types:
+        print(f'{type.lower()}_{args.by}_data')
+        print(region_data(aggregates, type, args.by).to_string(index=False))
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""The tables behind the report figures, reshaped straight from the cube."""
+
+from .countries import iso_codes
+from .profiling import profiled
+from .ranking import top_emitters
+
+GAS_SEGMENT = 'Gas pipelines and LNG facilities'
+
+
+def _world_data(cube, top):
+    return cube.select(region='World', segment='Total').sort_values(by=['emissions'],
+                                                                    ascending=False)
+
+
+def _agriculture_region_data1(cube, top):
+    return cube.table('region', type='Agriculture', segment='Total', reason='All',
+                      include_world=False).sort_values(by=['emissions'], ascending=False)
+
+
+def _energy_region_data1(cube, top):
+    return cube.table('region', type='Energy', segment='Total', reason='All',
+                      include_world=False).sort_values(by=['emissions'], ascending=False)
+
+
+def _top5_country_data1(cube, top):
+    return cube.table(['country', 'type'], country=top, segment='Total',
+                      type=['Agriculture', 'Energy'])
+
+
+def _top5_by_emission_type1(cube, top):
+    return cube.table('type', columns='country', country=top, segment='Total')
+
+
+def _top5_by_energy_reasons1(cube, top):
+    return cube.table('country', columns='reason', nest_values=True, type='Energy',
+                      segment=GAS_SEGMENT, country=top)
+
+
+def _countries_agriculture_emissions1(cube, top):
+    table = cube.table('country', type='Agriculture', segment='Total',
+                       include_world=False).sort_values(by='emissions')
+    table['iso_a3'] = iso_codes(table.index)
+    return table
+
+
+# table name -> (builder(cube, top), the emission types it reads, or None for all of them)
+TABLES = {
+    'world_data': (_world_data, None),
+    'agriculture_region_data1': (_agriculture_region_data1, ('Agriculture',)),
+    'energy_region_data1': (_energy_region_data1, ('Energy',)),
+    'top5_country_data1': (_top5_country_data1, ('Agriculture', 'Energy')),
+    'top5_by_emission_type1': (_top5_by_emission_type1, None),
+    'top5_by_energy_reasons1': (_top5_by_energy_reasons1, ('Energy',)),
+    'countries_agriculture_emissions1': (_countries_agriculture_emissions1, ('Agriculture',)),
+}
+
+
+@profiled('chart_tables')
+def chart_tables(cube, top=None):
+    """Return the table each report figure plots, keyed by table name.
+
+    ``top`` is the Index of countries for the top-N views. It defaults to the
+    five largest emitters.
+    """
+    if top is None:
+        top = top_emitters(cube, k=5)
+    return {name: builder(cube, top) for name, (builder, _) in TABLES.items()}
@@ -0,0 +1,200 @@
+"""Consistency checks for an emissions vintage.
+
+The analysis relies on hierarchical sum identities:
+
+* a ``segment == 'Total'`` / ``reason == 'All'`` row equals the sum of that
+  type's component segments, for every region, country and base year;
+* a segment's ``reason == 'All'`` row, where one exists next to specific
+  reasons, equals the sum of those reasons;
+* the ``World`` row equals the sum of the regions.
+
+All three are checked from a single groupby of the frame over the cube keys.
+The identities are then level groupbys on those sums, which are far smaller
+than the frame. The rows themselves are checked for duplicate keys, negative
+or missing emissions, and categories outside ``data/categories.json`` or the
+country alias table. Sums are compared with ``numpy.isclose`` tolerances,
+because the CSV stores rounded float32 values.
+
+    python -m methane_emissions.validate IEA-MethaneEmissionsComparison-World.csv --rtol 1e-3
+"""
+
+import argparse
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .countries import AGGREGATE_COUNTRIES, iso_codes
+from .cube import KEYS, WORLD
+from .stats import ALL_REASONS, TOTAL_SEGMENT, leaf_mask
+
+CATEGORIES_PATH = os.path.join(os.path.dirname(__file__), 'data', 'categories.json')
+
+DEFAULT_RTOL = 1e-3
+DEFAULT_ATOL = 0.01
+
+
+class ValidationError(ValueError):
+    """Raised when a vintage fails validation and the caller asked to stop."""
+
+    def __init__(self, report):
+        super().__init__(str(report))
+        self.report = report
+
+
+@dataclass
+class ValidationReport:
+    """The violations found by each check; an empty frame means the check passed."""
+
+    rows: int
+    seconds: float
+    violations: dict = field(default_factory=dict)
+
+    @property
+    def ok(self):
+        return not any(len(frame) for frame in self.violations.values())
+
+    def counts(self):
+        return {check: len(frame) for check, frame in self.violations.items()}
+
+    def __str__(self):
+        failed = {check: count for check, count in self.counts().items() if count}
+        status = 'passed' if not failed else ', '.join(f'{count} {check}'
+                                                       for check, count in failed.items())
+        return f'validated {self.rows:,} rows in {self.seconds * 1000:.1f} ms: {status}'
+
+    def details(self, limit=10):
+        """Return the report with up to ``limit`` violations listed per failed check."""
+        lines = [str(self)]
+        for check, frame in self.violations.items():
+            if len(frame):
+                lines.append(f'\n{check} ({len(frame)}):')
+                lines.append(frame.head(limit).to_string(index=False))
+        return '\n'.join(lines)
+
+
+@lru_cache(maxsize=None)
+def known_categories(path=CATEGORIES_PATH):
+    """Return the accepted values of each category column, read once per process."""
+    with open(path, encoding='utf-8') as handle:
+        return {column: frozenset(values) for column, values in json.load(handle).items()}
+
+
+def _mismatches(cells, expected, actual, levels, rtol, atol):
+    """Compare, per group of ``levels``, the sum of the ``expected`` cells with the ``actual`` ones.
+
+    Both masks select cells of the same series. The cells are grouped once,
+    and each side is summed with ``np.bincount`` over the group ids. Returns
+    the groups where both sides exist and differ beyond the tolerances.
+    """
+    selected = expected | actual
+    subset = cells[selected]
+    grouper = subset.groupby(level=levels, observed=True, dropna=False, sort=True)
+    ids = grouper.ngroup().to_numpy()
+    values = subset.to_numpy()
+    sides = []
+    for mask in (expected[selected], actual[selected]):
+        sums = np.bincount(ids[mask], weights=values[mask], minlength=grouper.ngroups)
+        present = np.bincount(ids[mask], minlength=grouper.ngroups) > 0
+        sides.append((sums, present))
+    (expected_sums, has_expected), (actual_sums, has_actual) = sides
+    wrong = (has_expected & has_actual
+             & ~np.isclose(actual_sums, expected_sums, rtol=rtol, atol=atol))
+    groups = np.flatnonzero(wrong)
+    _, first = np.unique(ids, return_index=True)
+    keys = subset.index[first[groups]]
+    frame = pd.DataFrame({level: keys.get_level_values(level) for level in levels})
+    frame['expected'] = expected_sums[groups]
+    frame['actual'] = actual_sums[groups]
+    frame['difference'] = frame['actual'] - frame['expected']
+    return frame
+
+
+def segment_totals(cells, rtol=DEFAULT_RTOL, atol=DEFAULT_ATOL):
+    """Total/All rows that differ from the sum of their type's component segments.
+
+    The components are the leaf cells of ``stats.leaf_mask``, so a segment's
+    All row is not added to the itemized reasons it sums up.
+    """
+    segment = cells.index.get_level_values('segment')
+    reason = cells.index.get_level_values('reason')
+    total = np.asarray(segment == TOTAL_SEGMENT)
+    expected = total & np.asarray(reason == ALL_REASONS)
+    actual = ~total & leaf_mask(cells.index)
+    return _mismatches(cells, expected, actual, ['type', 'region', 'country', 'baseYear'],
+                       rtol, atol)
+
+
+def reason_totals(cells, rtol=DEFAULT_RTOL, atol=DEFAULT_ATOL):
+    """Segment All rows that differ from the sum of the segment's specific reasons."""
+    component = np.asarray(cells.index.get_level_values('segment') != TOTAL_SEGMENT)
+    all_reasons = np.asarray(cells.index.get_level_values('reason') == ALL_REASONS)
+    return _mismatches(cells, component & all_reasons, component & ~all_reasons,
+                       ['type', 'segment', 'region', 'country', 'baseYear'], rtol, atol)
+
+
+def world_totals(cells, rtol=DEFAULT_RTOL, atol=DEFAULT_ATOL):
+    """World rows that differ from the sum of the regions."""
+    world = np.asarray(cells.index.get_level_values('region') == WORLD)
+    return _mismatches(cells, world, ~world, ['type', 'segment', 'reason', 'baseYear'],
+                       rtol, atol)
+
+
+def unknown_categories(df, categories=None):
+    """Category values outside the known vocabularies, with their row counts."""
+    categories = categories or known_categories()
+    found = []
+    for column, known in categories.items():
+        counts = df[column].value_counts(dropna=True)
+        counts = counts[counts > 0]
+        for value, rows in counts[~counts.index.isin(list(known))].items():
+            found.append((column, value, int(rows)))
+    countries = df['country'].value_counts(dropna=True)
+    countries = countries[countries > 0]
+    unmatched = (pd.isna(iso_codes(countries.index))
+                 & ~countries.index.isin(list(AGGREGATE_COUNTRIES)))
+    for value, rows in countries[unmatched].items():
+        found.append(('country', value, int(rows)))
+    return pd.DataFrame(found, columns=['column', 'value', 'rows'])
+
+
+def validate_frame(df, rtol=DEFAULT_RTOL, atol=DEFAULT_ATOL, categories=None):
+    """Run every check on a loaded frame and return a ``ValidationReport``."""
+    start = time.perf_counter()
+    emissions = df['emissions']
+    violations = {
+        'duplicates': df.loc[df.duplicated(KEYS, keep=False), KEYS + ['emissions']],
+        'negative': df.loc[emissions < 0, KEYS + ['emissions']],
+        'missing': df.loc[emissions.isna(), KEYS + ['emissions']],
+        'unknown_categories': unknown_categories(df, categories),
+    }
+    cells = (emissions.astype('float64')
+             .groupby([df[key] for key in KEYS], observed=True, dropna=False, sort=True).sum())
+    violations['segment_totals'] = segment_totals(cells, rtol, atol)
+    violations['reason_totals'] = reason_totals(cells, rtol, atol)
+    violations['world_totals'] = world_totals(cells, rtol, atol)
+    return ValidationReport(len(df), time.perf_counter() - start, violations)
+
+
+def main(argv=None):
+    from .loader import read_emissions_csv
+
+    parser = argparse.ArgumentParser(description='Check an emissions CSV for consistency.')
+    parser.add_argument('csv')
+    parser.add_argument('--rtol', type=float, default=DEFAULT_RTOL)
+    parser.add_argument('--atol', type=float, default=DEFAULT_ATOL,
+                        help='absolute tolerance in kt')
+    parser.add_argument('--limit', type=int, default=10, help='violations listed per check')
+    args = parser.parse_args(argv)
+
+    report = validate_frame(read_emissions_csv(args.csv), args.rtol, args.atol)
+    print(report.details(args.limit))
+    return 0 if report.ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,79 @@
+"""A small, internally consistent vintage shaped like the IEA dataset.
+
+Energy mixes every shape the sum identities have to handle: a segment with
+an All row next to its itemized reasons (Onshore oil), a segment with
+itemized reasons only (Offshore oil), a segment with only an All row
+(Bioenergy), and the satellite-detected segment, which is reported apart
+from the Total. The World rows are the sums of the regions.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from methane_emissions.loader import COLUMNS, DTYPES
+
+COUNTRIES = {'Africa': ['Nigeria', 'Algeria'], 'Europe': ['Norway', 'Germany', 'France']}
+SATELLITE = 'Satellite-detected large oil and gas emissions'
+GAS = 'Gas pipelines and LNG facilities'
+
+
+def make_frame(rows):
+    """Return a typed frame, as ``read_emissions_csv`` would, from (region, country,
+    type, segment, reason, baseYear, emissions) tuples."""
+    frame = pd.DataFrame(rows, columns=['region', 'country', 'type', 'segment', 'reason',
+                                        'baseYear', 'emissions'])
+    return frame[COLUMNS].astype(DTYPES)
+
+
+def country_rows(region, country, scale):
+    vented, fugitive = 6.0 * scale, 4.0 * scale
+    flared, offshore_vented = 2.0 * scale, 3.0 * scale
+    bioenergy = 1.5 * scale
+    gas_fugitive, gas_vented = 2.5 * scale, 1.0 * scale
+    energy = vented + fugitive + flared + offshore_vented + bioenergy + gas_fugitive + gas_vented
+    return [
+        (region, country, 'Agriculture', 'Total', 'All', '2019-2021', 20.0 * scale),
+        (region, country, 'Waste', 'Total', 'All', '2019-2021', 5.0 * scale),
+        (region, country, 'Energy', 'Total', 'All', '2022', energy),
+        (region, country, 'Energy', 'Onshore oil', 'All', '2022', vented + fugitive),
+        (region, country, 'Energy', 'Onshore oil', 'Vented', '2022', vented),
+        (region, country, 'Energy', 'Onshore oil', 'Fugitive', '2022', fugitive),
+        (region, country, 'Energy', 'Offshore oil', 'Flared', '2022', flared),
+        (region, country, 'Energy', 'Offshore oil', 'Vented', '2022', offshore_vented),
+        (region, country, 'Energy', 'Bioenergy', 'All', '2022', bioenergy),
+        (region, country, 'Energy', GAS, 'Fugitive', '2022', gas_fugitive),
+        (region, country, 'Energy', GAS, 'Vented', '2022', gas_vented),
+        (region, country, 'Energy', SATELLITE, 'All', '2022', 0.5 * scale),
+    ]
+
+
+def vintage_rows(scales=None):
+    rows = []
+    for i, (region, countries) in enumerate(COUNTRIES.items()):
+        for j, country in enumerate(countries):
+            scale = (scales or {}).get(country, 1.0 + i + 0.25 * j)
+            rows += country_rows(region, country, scale)
+    return rows
+
+
+def with_world(rows):
+    """Append the World rows, the sums of the regions."""
+    frame = pd.DataFrame(rows, columns=['region', 'country', 'type', 'segment', 'reason',
+                                        'baseYear', 'emissions'])
+    world = frame.groupby(['type', 'segment', 'reason', 'baseYear'], sort=False)['emissions'].sum()
+    return rows + [('World', np.nan, *key, value) for key, value in world.items()]
+
+
+@pytest.fixture
+def frame():
+    return make_frame(with_world(vintage_rows()))
+
+
+@pytest.fixture
+def write_csv(tmp_path):
+    def write(frame, name='vintage.csv'):
+        path = tmp_path / name
+        frame.to_csv(path, index=False)
+        return str(path)
+    return write
@@ -0,0 +1,44 @@
+import pytest
+
+from conftest import SATELLITE
+from methane_emissions.batch import (entity_figures, entity_names, entity_tables, main,
+                                     unknown_entities)
+from methane_emissions.cube import EmissionsCube
+
+
+def test_entity_names_leave_out_world(frame):
+    cube = EmissionsCube.from_frame(frame)
+    assert entity_names(cube, 'region') == ['Africa', 'Europe']
+    assert entity_names(cube, 'country') == ['Algeria', 'France', 'Germany', 'Nigeria', 'Norway']
+    assert unknown_entities(cube, [('region', 'Europe'), ('region', 'World'),
+                                   ('country', 'Narnia')]) == [('region', 'World'),
+                                                               ('country', 'Narnia')]
+
+
+def test_unknown_names_exit_with_the_valid_values(write_csv, frame, tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit:
+        main([write_csv(frame), '-o', str(tmp_path / 'reports'), '-j', '1',
+              '--regions', 'Europa', '--countries', 'Norway'])
+    assert exit.value.code == 2
+    error = capsys.readouterr().err
+    assert "--regions: unknown 'Europa'; choose from Africa, Europe" in error
+    assert '--countries:' not in error
+    assert not (tmp_path / 'reports').exists()
+
+
+@pytest.mark.parametrize('kind, name', [('country', 'Norway'), ('region', 'Europe')])
+def test_segment_reason_bars_add_up_to_the_energy_total(frame, kind, name):
+    cube = EmissionsCube.from_frame(frame)
+    bars = entity_tables(cube, kind, name)['energy_segment_reasons']
+    total = cube.select_series(type='Energy', segment='Total', reason='All',
+                               include_world=False, **{kind: name}).sum()
+    assert bars.sum().sum() == pytest.approx(total)
+    assert 'All' not in bars.loc['Onshore oil'].dropna().index
+    assert SATELLITE not in bars.index
+
+
+def test_entity_figures_are_titled_with_the_entity(frame):
+    tables = entity_tables(EmissionsCube.from_frame(frame), 'country', 'Norway')
+    pie = next(spec for spec in entity_figures('country', 'Norway', tables)
+               if spec.name == 'type_pie')
+    assert pie.kwargs['title'] == 'Methane Emissions per Type in Norway'
@@ -0,0 +1,143 @@
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import make_frame, vintage_rows, with_world
+from methane_emissions import build
+from methane_emissions.build import Graph, Node, report_graph, source_version
+from methane_emissions.cube import EmissionsCube
+from methane_emissions.tables import TABLES, chart_tables
+
+
+def counting(calls, name, value):
+    def run(*inputs):
+        calls.append(name)
+        return value(*inputs)
+    return run
+
+
+def toy_graph(state_dir, calls, source='v1', version='1', middle=lambda x: x.upper()):
+    return Graph([
+        Node('source', counting(calls, 'source', lambda: source), source=lambda: source,
+             persist=False),
+        Node('middle', counting(calls, 'middle', middle), ('source',), version),
+        Node('leaf', counting(calls, 'leaf', lambda x: x + '!'), ('middle',)),
+    ], str(state_dir))
+
+
+def test_unchanged_nodes_are_skipped(tmp_path):
+    calls = []
+    assert toy_graph(tmp_path, calls).run(progress=None).built == ['source', 'middle', 'leaf']
+    calls.clear()
+    assert toy_graph(tmp_path, calls).run(progress=None).built == []
+    assert calls == []
+
+
+def test_changed_source_and_version_rebuild(tmp_path):
+    toy_graph(tmp_path, []).run(progress=None)
+    assert toy_graph(tmp_path, [], source='v2').run(progress=None).built == [
+        'source', 'middle', 'leaf']
+    # the new version rebuilds middle, whose unchanged output leaves leaf alone
+    assert toy_graph(tmp_path, [], source='v2', version='2').run(progress=None).built == [
+        'middle']
+
+
+def test_same_output_stops_the_rebuild(tmp_path):
+    toy_graph(tmp_path, []).run(progress=None)
+    report = toy_graph(tmp_path, [], source='V1', middle=str.upper).run(progress=None)
+    assert report.built == ['source', 'middle']
+
+
+def test_skipped_dependency_is_read_back_for_a_rebuild(tmp_path):
+    toy_graph(tmp_path, []).run(progress=None)
+    calls = []
+    graph = Graph([
+        Node('source', lambda: 'v1', source=lambda: 'v1', persist=False),
+        Node('middle', counting(calls, 'middle', str.upper), ('source',), '1'),
+        Node('leaf', counting(calls, 'leaf', lambda x: x + '?'), ('middle',), 'changed'),
+    ], str(tmp_path))
+    graph.run(progress=None)
+    assert calls == ['leaf']
+    assert graph._value('leaf') == 'V1?'
+
+
+def test_missing_output_file_is_rebuilt(tmp_path):
+    path = tmp_path / 'out.txt'
+
+    def write():
+        path.write_text('x')
+        return [str(path)]
+
+    def graph():
+        return Graph([Node('file', write, source=lambda: 'same', files=True)],
+                     str(tmp_path / 'state'))
+
+    graph().run(progress=None)
+    assert graph().run(progress=None).built == []
+    os.remove(path)
+    assert graph().run(progress=None).built == ['file']
+
+
+def test_edit_to_an_imported_module_changes_the_version(monkeypatch):
+    builder = TABLES['world_data'][0]
+    before = source_version(builder, EmissionsCube)
+    original = build._module_hash
+
+    def edited(name):
+        return 'edited' if name == 'methane_emissions.reshape' else original(name)
+
+    monkeypatch.setattr(build, '_module_hash', edited)
+    assert source_version(builder, EmissionsCube) != before
+    assert source_version(builder, 'png', 150) != source_version(builder, 'png', 300)
+
+
+def industry_vintage():
+    rows = vintage_rows()
+    rows += [(row[0], row[1], 'Industry', 'Total', 'All', '2022', 100.0)
+             for row in rows if row[2] == 'Waste']
+    return make_frame(with_world(rows))
+
+
+def report_tables(graph):
+    return {name: graph._value(name) for name in TABLES}
+
+
+def test_tables_match_chart_tables_with_a_new_type(tmp_path, write_csv):
+    pytest.importorskip('matplotlib')
+    pytest.importorskip('seaborn')
+    pytest.importorskip('geopandas')
+    from methane_emissions.render import use_agg
+
+    use_agg()
+    frame = industry_vintage()
+    graph = report_graph(write_csv(frame), str(tmp_path / 'report'), pdf=False)
+    graph.run(progress=None)
+    expected = chart_tables(EmissionsCube.from_frame(frame))
+    for name, table in report_tables(graph).items():
+        pd.testing.assert_frame_equal(table, expected[name], check_categorical=False)
+    assert 'Industry' in set(graph._value('world_data')['type'])
+
+
+def test_energy_edit_leaves_agriculture_nodes_alone(tmp_path, write_csv, frame):
+    pytest.importorskip('matplotlib')
+    pytest.importorskip('seaborn')
+    pytest.importorskip('geopandas')
+    from methane_emissions.render import use_agg
+
+    use_agg()
+    out = str(tmp_path / 'report')
+    report_graph(write_csv(frame), out, pdf=False).run(progress=None)
+    edited = frame.copy()
+    energy = (edited['type'] == 'Energy') & (edited['country'] == 'Nigeria')
+    edited.loc[energy, 'emissions'] *= 2
+    world = (edited['type'] == 'Energy') & (edited['region'] == 'World')
+    edited.loc[world, 'emissions'] = (
+        edited[(edited['type'] == 'Energy') & (edited['region'] != 'World')]
+        .groupby(['segment', 'reason'], observed=True)['emissions'].sum()
+        .reindex(pd.MultiIndex.from_frame(edited.loc[world, ['segment', 'reason']])).to_numpy())
+    built = report_graph(write_csv(edited, 'edited.csv'), out, pdf=False).run(progress=None).built
+    assert 'energy_region_data1' in built
+    assert 'cube.Agriculture' in built
+    assert not {'agriculture_region_data1', 'countries_agriculture_emissions1',
+                'figure.agriculture_region_barh', 'figure.agriculture_choropleth'} & set(built)
@@ -0,0 +1,21 @@
+import sys
+
+import pytest
+
+from methane_emissions.cli import FORWARDED, main
+
+
+@pytest.mark.parametrize('command', ['store', 'validate', 'diff'])
+def test_forwarded_commands_are_named_in_their_usage(command, capsys):
+    argv0 = sys.argv[0]
+    with pytest.raises(SystemExit):
+        main([command, '--help'])
+    assert capsys.readouterr().out.startswith(f'usage: methane-report {command} ')
+    assert sys.argv[0] == argv0
+
+
+def test_every_forwarded_module_has_a_main():
+    import importlib
+
+    for module, _ in FORWARDED.values():
+        assert callable(importlib.import_module(module).main)
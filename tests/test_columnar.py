@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import GAS
+from methane_emissions.columnar import ColumnarEmissions
+from methane_emissions.cube import KEYS, EmissionsCube
+
+FILTERS = [
+    {},
+    {'type': 'Energy', 'segment': 'Total', 'reason': 'All', 'include_world': False},
+    {'region': 'World'},
+    {'country': ['Norway', 'Nigeria', 'Atlantis'], 'segment': ['Total', GAS]},
+    {'type': 'Energy', 'reason': ['Vented', 'Flared'], 'baseYear': '2022'},
+    {'segment': 'No such segment'},
+]
+GROUPINGS = ['region', 'country', ['type', 'region'], ['region', 'country'],
+             ['type', 'segment', 'reason']]
+
+
+@pytest.fixture
+def cube(frame):
+    return EmissionsCube.from_frame(frame)
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_mask_selects_the_cells_of_select_series(cube, filters):
+    mask = ColumnarEmissions.from_cube(cube).mask(**filters)
+    selected = cube.series if mask is None else cube.series[mask]
+    pd.testing.assert_series_equal(selected, cube.select_series(**filters))
+
+
+@pytest.mark.parametrize('by', GROUPINGS)
+@pytest.mark.parametrize('filters', FILTERS)
+def test_rollup_and_table_match_the_cube(cube, by, filters):
+    columns = ColumnarEmissions.from_cube(cube)
+    pd.testing.assert_frame_equal(columns.rollup(by, **filters), cube.rollup(by, **filters))
+    pd.testing.assert_frame_equal(columns.table(by, **filters), cube.table(by, **filters))
+
+
+def test_world_rows_with_no_country_are_kept_apart(cube):
+    columns = ColumnarEmissions.from_cube(cube)
+    world = columns.mask(region='World')
+    assert world.sum() == len(cube.select_series(region='World'))
+    assert (columns.codes['country'][world] == -1).all()
+    totals = columns.rollup('region', segment='Total', reason='All')
+    assert set(totals['region']) == {'Africa', 'Europe', 'World'}
+
+
+def test_frame_rows_match_within_tolerance(frame, cube):
+    columns = ColumnarEmissions.from_frame(frame)
+    pd.testing.assert_frame_equal(columns.rollup(['type', 'region']),
+                                  cube.rollup(['type', 'region']))
+
+
+def test_plain_object_levels_are_coded(frame):
+    plain = frame.astype({key: object for key in KEYS})
+    cube = EmissionsCube.from_frame(plain)
+    assert not isinstance(cube.series.index.levels[0].dtype, pd.CategoricalDtype)
+    columns = ColumnarEmissions.from_cube(cube)
+    for by in GROUPINGS:
+        expected = cube.rollup(by, include_world=False)
+        actual = columns.rollup(by, include_world=False)
+        labels = {level: str for level in expected if level != 'emissions'}
+        pd.testing.assert_frame_equal(actual.astype(labels), expected.astype(labels))
+    assert np.isclose(columns.emissions[columns.mask(region='World')].sum(),
+                      cube.select_series(region='World').sum())
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from methane_emissions.countries import (add_iso_codes, iso_code, iso_codes, match_report,
+                                         normalize_name)
+
+
+@pytest.mark.parametrize('name, code', [
+    ('United States', 'USA'),
+    ('United States of America', 'USA'),
+    ("Cote d'Ivoire", 'CIV'),
+    ('Côte d’Ivoire', 'CIV'),
+    (' COTE D`IVOIRE ', 'CIV'),
+    ('Democratic Republic of the Congo', 'COD'),
+    ('Republic of Congo', 'COG'),
+    ('Russia', 'RUS'),
+    ('Atlantis', None),
+    ('European Union', None),
+    (np.nan, None),
+])
+def test_iso_code_ignores_case_accents_and_punctuation(name, code):
+    assert iso_code(name) == code
+
+
+def test_normalize_name():
+    assert normalize_name('Bosnia & Herzegovina') == 'bosnia and herzegovina'
+    assert normalize_name("Côte d'Ivoire") == normalize_name('cote divoire')
+
+
+def test_iso_codes_code_each_distinct_name_once():
+    names = pd.Series(['Norway', 'Atlantis', np.nan, 'Norway', 'Nigeria'], dtype='category')
+    codes = iso_codes(names)
+    assert list(codes.astype(object)) == ['NOR', np.nan, np.nan, 'NOR', 'NGA']
+    assert sorted(codes.categories) == ['NGA', 'NOR']
+
+
+def test_match_report_lists_unmatched_names_and_aggregates_apart():
+    names = ['Norway', 'Atlantis', 'European Union', 'Narnia', np.nan, 'Norway']
+    report = match_report(names, iso_codes(names))
+    assert (report.matched, report.total) == (1, 3)
+    assert report.unmatched == ['Atlantis', 'Narnia']
+    assert report.aggregates == ['European Union']
+    assert report.rate == pytest.approx(1 / 3)
+    assert str(report) == ('1/3 country names matched (33.3%); unmatched: Atlantis, Narnia; '
+                           'aggregates without a code: European Union')
+
+
+def test_add_iso_codes(frame):
+    df = add_iso_codes(frame.copy())
+    assert df.attrs['country_match'].rate == 1.0
+    world = df['region'] == 'World'
+    assert df.loc[world, 'iso_a3'].isna().all()
+    assert set(df.loc[~world, 'iso_a3'].astype(str)) == {'NGA', 'DZA', 'NOR', 'DEU', 'FRA'}
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import GAS
+from methane_emissions.cube import KEYS, EmissionsCube
+
+
+def masked(frame, include_world=True, **filters):
+    """The original script's boolean-mask filter, summed per cube key."""
+    mask = np.ones(len(frame), dtype=bool)
+    for column, wanted in filters.items():
+        values = frame[column]
+        mask &= values.isin(wanted) if isinstance(wanted, list) else values == wanted
+    if not include_world:
+        mask &= frame['region'] != 'World'
+    return frame.loc[mask]
+
+
+def cells(table):
+    return (table.astype({key: str for key in KEYS if key in table})
+                 .sort_values([key for key in KEYS if key in table])
+                 .reset_index(drop=True))
+
+
+@pytest.mark.parametrize('filters', [
+    {'region': 'World', 'segment': 'Total'},
+    {'type': 'Agriculture', 'segment': 'Total', 'reason': 'All', 'include_world': False},
+    {'country': ['Norway', 'Nigeria', 'Atlantis'], 'segment': 'Total',
+     'type': ['Agriculture', 'Energy']},
+    {'type': 'Energy', 'segment': GAS, 'country': ['Norway', 'Nigeria']},
+    {'type': 'Energy', 'reason': ['Vented', 'Flared'], 'baseYear': '2022'},
+    {'segment': 'No such segment'},
+])
+def test_select_matches_the_mask_filters(frame, filters):
+    expected = masked(frame, **filters)[KEYS + ['emissions']]
+    actual = EmissionsCube.from_frame(frame).select(**filters)
+    pd.testing.assert_frame_equal(cells(actual), cells(expected), check_dtype=False,
+                                  check_categorical=False)
+
+
+def test_rollup_matches_a_masked_groupby(frame):
+    cube = EmissionsCube.from_frame(frame)
+    for type in ('Agriculture', 'Energy'):
+        expected = (masked(frame, type=type, segment='Total', reason='All', include_world=False)
+                    .groupby('region', as_index=False, observed=True)['emissions'].sum())
+        actual = cube.rollup('region', type=type, segment='Total', reason='All',
+                             include_world=False)
+        pd.testing.assert_frame_equal(cells(actual), cells(expected), check_dtype=False,
+                                      check_categorical=False)
+
+
+def test_get_and_blocks(frame):
+    cube = EmissionsCube.from_frame(frame)
+    assert cube.get('Energy', 'Onshore oil', 'Vented', 'Europe', 'Norway', '2022') == 6.0 * 2.0
+    assert ('Energy', GAS, 'Fugitive') in cube.blocks
+    assert len(cube.blocks) == len(frame[['type', 'segment', 'reason']].drop_duplicates())
+
+
+def test_content_hash_ignores_the_row_order(frame):
+    shuffled = frame.sample(frac=1.0, random_state=0)
+    assert (EmissionsCube.from_frame(frame).content_hash
+            == EmissionsCube.from_frame(shuffled).content_hash)
+    changed = frame.assign(emissions=frame['emissions'] + (frame.index == 0))
+    assert (EmissionsCube.from_frame(changed).content_hash
+            != EmissionsCube.from_frame(frame).content_hash)
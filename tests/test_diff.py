@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_frame, vintage_rows, with_world
+from methane_emissions.cube import EmissionsCube
+from methane_emissions.diff import GROUPINGS, LEVELS, ROW_LEVEL, diff_frames
+from methane_emissions.drilldown import component_series
+
+
+@pytest.fixture
+def vintages():
+    old = make_frame(with_world(vintage_rows()))
+    rows = vintage_rows({'Nigeria': 2.0, 'Norway': 0.5})
+    rows = [row for row in rows if not (row[1] == 'France' and row[2] == 'Waste')]
+    rows += [('Africa', 'Egypt', 'Waste', 'Total', 'All', '2019-2021', 7.0)]
+    return old, make_frame(with_world(rows))
+
+
+def leaf_sums(frame, grouping):
+    cells = component_series(EmissionsCube.from_frame(frame))
+    if not grouping:
+        return pd.Series({(): cells.sum()})
+    return cells.groupby(level=list(grouping), observed=True).sum()
+
+
+def by_label(table, grouping):
+    """``table`` with its grouping columns as strings, sorted by them."""
+    table = table.astype({level: str for level in grouping})
+    return table.sort_values(list(grouping)).reset_index(drop=True) if grouping else table
+
+
+def test_every_rollup_matches_a_groupby_of_the_leaves(vintages):
+    old, new = vintages
+    diff = diff_frames(old, new)
+    for grouping, name in zip(GROUPINGS, LEVELS[1:]):
+        expected = pd.concat([leaf_sums(old, grouping).rename('old'),
+                              leaf_sums(new, grouping).rename('new')], axis=1).fillna(0.0)
+        expected = by_label(expected.rename_axis(grouping or None).reset_index(), grouping)
+        level = by_label(diff.level(name), grouping)
+        assert len(level) == len(expected), name
+        for column in grouping:
+            assert level[column].tolist() == expected[column].tolist(), name
+        assert level[['old', 'new']].to_numpy() == pytest.approx(
+            expected[['old', 'new']].to_numpy()), name
+
+
+def test_total_equals_the_total_rows(vintages):
+    old, new = vintages
+    total = diff_frames(old, new).level('total').iloc[0]
+    for side, frame in (('old', old), ('new', new)):
+        rows = frame[(frame['region'] == 'World') & (frame['segment'] == 'Total')]
+        assert total[side] == pytest.approx(float(rows['emissions'].sum()))
+
+
+def test_rows_are_flagged(vintages):
+    old, new = vintages
+    rows = diff_frames(old, new).level(ROW_LEVEL)
+    added = rows[rows['status'] == 'added']
+    removed = rows[rows['status'] == 'removed']
+    assert added['country'].astype(str).unique().tolist() == ['Egypt']
+    assert removed['country'].astype(str).tolist() == ['France']
+    assert removed['type'].tolist() == ['Waste']
+    assert np.isnan(added['relative']).all()
+    nigeria = rows[(rows['country'] == 'Nigeria') & (rows['segment'] == 'Total')]
+    assert (nigeria['status'] == 'changed').all()
+    assert nigeria['relative'].to_numpy() == pytest.approx(1.0)
+
+
+def test_identical_vintages_have_no_changes(frame):
+    diff = diff_frames(frame, frame.sample(frac=1.0, random_state=0))
+    assert len(diff.changes()) == 0
+    assert diff.counts['unchanged'] == len(frame)
+
+
+def test_all_row_next_to_itemized_reasons_is_not_counted_twice():
+    rows = [
+        ('Africa', 'Nigeria', 'Energy', 'Total', 'All', '2022', 10.0),
+        ('Africa', 'Nigeria', 'Energy', 'Onshore oil', 'All', '2022', 10.0),
+        ('Africa', 'Nigeria', 'Energy', 'Onshore oil', 'Vented', '2022', 6.0),
+        ('Africa', 'Nigeria', 'Energy', 'Onshore oil', 'Fugitive', '2022', 4.0),
+    ]
+    diff = diff_frames(make_frame(rows), make_frame(rows))
+    assert diff.level('type').iloc[0]['old'] == pytest.approx(10.0)
+
+
+def test_top_and_pivot(vintages):
+    old, new = vintages
+    diff = diff_frames(old, new)
+    top = diff.top('region/country', n=2)
+    assert top['country'].astype(str).tolist() == ['Norway', 'Nigeria']
+    assert top['delta'].abs().is_monotonic_decreasing
+    pivot = diff.pivot('country', 'type', n=2)
+    assert pivot.index.tolist() == ['Norway', 'Nigeria']
+    assert pivot.sum(axis=1).to_numpy() == pytest.approx(top['delta'].to_numpy())
@@ -0,0 +1,46 @@
+import pytest
+
+from conftest import make_frame
+from methane_emissions.cube import EmissionsCube
+from methane_emissions.drilldown import DrillDownIndex, component_series
+
+
+def total_rows(frame):
+    rows = frame[(frame['region'] != 'World') & (frame['segment'] == 'Total')
+                 & (frame['reason'] == 'All')]
+    return rows.groupby('type', observed=True)['emissions'].sum().astype('float64')
+
+
+def test_root_equals_the_total_rows(frame):
+    index = DrillDownIndex.from_cube(EmissionsCube.from_frame(frame))
+    totals = total_rows(frame)
+    assert index.node() == pytest.approx(totals.sum())
+    for type, total in totals.items():
+        assert index.node(type) == pytest.approx(total)
+
+
+def test_all_row_next_to_itemized_reasons_is_not_counted_twice():
+    frame = make_frame([
+        ('Africa', 'Nigeria', 'Energy', 'Total', 'All', '2022', 10.0),
+        ('Africa', 'Nigeria', 'Energy', 'Onshore oil', 'All', '2022', 10.0),
+        ('Africa', 'Nigeria', 'Energy', 'Onshore oil', 'Vented', '2022', 6.0),
+        ('Africa', 'Nigeria', 'Energy', 'Onshore oil', 'Fugitive', '2022', 4.0),
+        ('Africa', 'Nigeria', 'Energy', 'Satellite-detected large oil and gas emissions', 'All',
+         '2022', 3.0),
+    ])
+    index = DrillDownIndex.from_cube(EmissionsCube.from_frame(frame))
+    assert index.node('Energy') == pytest.approx(10.0)
+    assert index.children('Energy', 'Onshore oil').to_dict() == {'Fugitive': 4.0, 'Vented': 6.0}
+
+
+def test_segment_with_only_an_all_row_is_kept(frame):
+    cells = component_series(EmissionsCube.from_frame(frame))
+    reasons = cells.xs('Bioenergy', level='segment').index.get_level_values('reason')
+    assert set(reasons) == {'All'}
+
+
+def test_total_and_breakdown_agree(frame):
+    index = DrillDownIndex.from_cube(EmissionsCube.from_frame(frame))
+    breakdown = index.breakdown('region', type='Energy')
+    assert breakdown.sum() == pytest.approx(index.node('Energy'))
+    assert index.total(type='Energy', region='Africa') == pytest.approx(breakdown['Africa'])
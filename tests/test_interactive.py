@@ -0,0 +1,14 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('plotly')
+
+from methane_emissions.interactive import _stacked_bars
+
+
+def test_stacked_bars_cycle_the_palette_over_every_column():
+    table = pd.DataFrame([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]], index=['Norway', 'Nigeria'],
+                         columns=['Vented', 'Fugitive', 'Flared'])
+    fig = _stacked_bars(table, 'h', ['red', 'blue'])
+    assert [trace.name for trace in fig.data] == ['Vented', 'Fugitive', 'Flared']
+    assert [trace.marker.color for trace in fig.data] == ['red', 'blue', 'red']
@@ -0,0 +1,65 @@
+import os
+
+import pandas as pd
+import pytest
+
+from methane_emissions.loader import (COLUMNS, DTYPES, cache_is_fresh, default_cache_path,
+                                      file_sha256, load_emissions)
+
+pytest.importorskip('pyarrow')
+
+
+def touch(path, delta_ns=10**9):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + delta_ns))
+
+
+def test_typed_columns(write_csv, frame):
+    df = load_emissions(write_csv(frame.assign(notes='', source='IEA')), cache=False)
+    assert list(df.columns[:len(COLUMNS)]) == COLUMNS
+    assert all(str(df[column].dtype) == dtype for column, dtype in DTYPES.items())
+    assert df.attrs['load'].source == 'csv'
+
+
+def test_cache_is_written_then_reused(write_csv, frame):
+    path = write_csv(frame)
+    first = load_emissions(path)
+    assert first.attrs['load'].source == 'csv'
+    assert os.path.exists(default_cache_path(path))
+    second = load_emissions(path)
+    assert second.attrs['load'].source == 'cache'
+    assert second.attrs['content_hash'] == first.attrs['content_hash'] == file_sha256(path)
+    pd.testing.assert_frame_equal(second, first)
+
+
+def test_touched_but_unchanged_csv_still_hits_the_cache(write_csv, frame):
+    path = write_csv(frame)
+    load_emissions(path)
+    touch(path)
+    assert cache_is_fresh(path, default_cache_path(path)) == file_sha256(path)
+    assert load_emissions(path).attrs['load'].source == 'cache'
+
+
+def test_edited_csv_invalidates_the_cache(write_csv, frame):
+    path = write_csv(frame)
+    load_emissions(path)
+    mtime = os.stat(path).st_mtime_ns
+    # same size and mtime would trust the stored hash, so change a digit in place
+    with open(path, 'r+') as handle:
+        text = handle.read()
+        handle.seek(0)
+        handle.write(text.replace('20.0', '21.0', 1))
+    os.utime(path, ns=(mtime, mtime + 10**9))
+    assert cache_is_fresh(path, default_cache_path(path)) is None
+    reloaded = load_emissions(path)
+    assert reloaded.attrs['load'].source == 'csv'
+    assert 21.0 in set(reloaded['emissions'].astype('float64'))
+    assert load_emissions(path).attrs['load'].source == 'cache'
+
+
+def test_resized_csv_invalidates_without_hashing(write_csv, frame):
+    path = write_csv(frame)
+    load_emissions(path)
+    write_csv(frame.iloc[:-1])
+    assert cache_is_fresh(path, default_cache_path(path)) is None
+    assert len(load_emissions(path)) == len(frame) - 1
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from methane_emissions import memo
+from methane_emissions.cube import EmissionsCube
+from methane_emissions.report import analyze
+
+
+@pytest.fixture
+def cube(frame):
+    return EmissionsCube.from_frame(frame)
+
+
+def test_keys_ignore_how_equal_arguments_are_spelled(cube):
+    key = memo.result_key('f', cube, (['Norway', 'Nigeria'], 1.0), {'type': 'Energy'})
+    assert key == memo.result_key('f', cube, (('Norway', 'Nigeria'), np.float64(1.0)),
+                                  {'type': 'Energy'})
+    assert key == memo.result_key('f', cube, (pd.Index(['Norway', 'Nigeria']), 1.0),
+                                  {'type': 'Energy'})
+
+
+def test_frames_are_keyed_on_their_values_not_their_repr(cube):
+    values = np.zeros(10_000)
+    edited = values.copy()
+    edited[5_000] = 1.0
+    # the middle rows are elided from the repr, so the two frames print the same
+    assert repr(pd.DataFrame({'x': values})) == repr(pd.DataFrame({'x': edited}))
+    assert (memo.result_key('f', cube, (pd.DataFrame({'x': values}),))
+            != memo.result_key('f', cube, (pd.DataFrame({'x': edited}),)))
+    with pd.option_context('display.max_rows', 5):
+        assert (memo.result_key('f', cube, (pd.Series(values),))
+                == memo.result_key('f', cube, (pd.Series(values.copy()),)))
+
+
+def test_unkeyable_arguments_are_rejected(cube):
+    with pytest.raises(TypeError):
+        memo.result_key('f', cube, (object(),))
+
+
+def test_analyze_reuses_the_cached_tables(write_csv, frame, monkeypatch):
+    cache = memo.ResultCache()
+    monkeypatch.setattr(memo, '_default_cache', cache)
+    path = write_csv(frame)
+    first = analyze(path, cache=False)
+    misses = cache.stats.misses
+    second = analyze(path, cache=False)
+    assert cache.stats.misses == misses and cache.stats.hits >= 3
+    assert second.tables['energy_region_data1'] is first.tables['energy_region_data1']
+    assert list(second.top) == list(first.top)
@@ -0,0 +1,36 @@
+import pytest
+
+from conftest import make_frame
+from methane_emissions.cube import EmissionsCube
+from methane_emissions.metrics import GWP, co2e, country_emissions
+
+
+def test_all_row_next_to_itemized_reasons_is_not_counted_twice():
+    frame = make_frame([
+        ('Africa', 'Nigeria', 'Energy', 'Total', 'All', '2022', 10.0),
+        ('Africa', 'Nigeria', 'Energy', 'Onshore oil', 'All', '2022', 10.0),
+        ('Africa', 'Nigeria', 'Energy', 'Onshore oil', 'Vented', '2022', 6.0),
+        ('Africa', 'Nigeria', 'Energy', 'Onshore oil', 'Fugitive', '2022', 4.0),
+    ])
+    row = country_emissions(EmissionsCube.from_frame(frame)).loc['NGA']
+    assert row['emissions_kt'] == pytest.approx(10.0)
+    assert row['oil_kt'] == pytest.approx(10.0)
+    assert row['fossil_kt'] == pytest.approx(10.0)
+
+
+def test_country_emissions_equal_the_total_rows(frame):
+    emissions = country_emissions(EmissionsCube.from_frame(frame))
+    rows = frame[(frame['region'] != 'World') & (frame['segment'] == 'Total')]
+    totals = rows.groupby('country', observed=True)['emissions'].sum()
+    by_name = emissions.set_index('country')['emissions_kt']
+    assert by_name.sort_index().to_numpy() == pytest.approx(
+        totals.sort_index().to_numpy(dtype='float64'))
+    parts = emissions['fossil_kt'] + emissions['non_fossil_kt']
+    assert parts.to_numpy() == pytest.approx(emissions['emissions_kt'].to_numpy())
+
+
+def test_co2e_uses_the_fossil_and_non_fossil_factors():
+    assert co2e(1.0, 2.0, 'GWP20') == pytest.approx(
+        GWP['GWP20']['fossil'] + 2 * GWP['GWP20']['non_fossil'])
+    with pytest.raises(ValueError):
+        co2e(1.0, 1.0, 'GWP50')
@@ -0,0 +1,30 @@
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from methane_emissions import profiling
+
+
+def _staged(name):
+    with profiling.stage(name):
+        return name
+
+
+def test_pool_workers_write_their_own_traces(tmp_path, monkeypatch):
+    trace = tmp_path / 'trace.json'
+    monkeypatch.setattr(profiling, '_trace', str(trace))
+    profiling.enable(memory=False)
+    try:
+        with profiling.stage('parent'):
+            with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('fork'),
+                                     initializer=profiling.init_worker) as pool:
+                assert sorted(pool.map(_staged, ['a', 'b', 'c'])) == ['a', 'b', 'c']
+    finally:
+        profiler = profiling.disable()
+
+    worker_traces = sorted(tmp_path.glob('trace.*.json'))
+    assert worker_traces
+    names = [event['name'] for path in worker_traces
+             for event in json.loads(path.read_text())['traceEvents']]
+    assert sorted(names) == ['a', 'b', 'c']
+    assert [record.name for record in profiler.records] == ['parent']
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from methane_emissions.cube import KEYS, EmissionsCube
+from methane_emissions.ranking import country_totals, largest, top_emitters
+
+
+def full_sort(values, k):
+    return np.argsort(-np.asarray(values), kind='stable')[:max(k, 0)]
+
+
+@pytest.mark.parametrize('values', [
+    [1.0, 3.0, 3.0, 2.0, 3.0],
+    [5.0, 5.0, 5.0, 5.0],
+    [0.5, 9.0, 2.0, 9.0, 2.0, 2.0, 7.0],
+    [],
+])
+@pytest.mark.parametrize('k', [0, 1, 2, 3, 10])
+def test_largest_matches_a_stable_full_sort(values, k):
+    np.testing.assert_array_equal(largest(values, k), full_sort(values, k))
+
+
+def test_largest_on_random_values_with_ties():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        values = rng.integers(0, 20, size=rng.integers(1, 60)).astype('float64')
+        k = int(rng.integers(1, len(values) + 2))
+        np.testing.assert_array_equal(largest(values, k), full_sort(values, k))
+
+
+def test_top_emitters_rank_the_countries_by_total(frame):
+    cube = EmissionsCube.from_frame(frame)
+    totals = country_totals(cube)
+    assert totals.sum() == pytest.approx(
+        frame.loc[(frame['segment'] == 'Total') & (frame['region'] != 'World'),
+                  'emissions'].sum())
+    top = top_emitters(cube, k=3)
+    assert list(top) == ['France', 'Germany', 'Norway'] and top.name == 'country'
+    energy = top_emitters(cube, k=2, type='Energy', segment='Onshore oil', reason='Vented')
+    assert list(energy) == ['France', 'Germany']
+    assert list(top_emitters(cube, k=10)) == list(totals.sort_values(ascending=False,
+                                                                     kind='stable').index)
+
+
+def test_aggregates_are_not_ranked(frame):
+    eu = frame[frame['country'] == 'France'].assign(country='European Union')
+    combined = pd.concat([frame, eu], ignore_index=True)
+    cube = EmissionsCube.from_frame(combined.astype({key: 'category' for key in KEYS}))
+    assert 'European Union' not in top_emitters(cube, k=10)
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+from methane_emissions.cube import EmissionsCube
+from methane_emissions.reshape import sum_table
+
+
+@pytest.fixture
+def series(frame):
+    return EmissionsCube.from_frame(frame).select_series(include_world=False)
+
+
+def test_duplicate_cells_are_summed_not_averaged(frame):
+    # a release that repeats Norway's rows, as a careless concatenation would
+    doubled = pd.concat([frame, frame[frame['country'] == 'Norway']], ignore_index=True)
+    series = doubled.set_index(['type', 'segment', 'reason', 'region', 'country',
+                                'baseYear'])['emissions'].astype('float64')
+    table = sum_table(series, 'country', 'type')
+    assert table.loc['Norway', 'Agriculture'] == 2 * 40.0
+    assert table.loc['Nigeria', 'Agriculture'] == 20.0
+    averaged = pd.pivot_table(doubled, index='country', columns='type', values='emissions',
+                              observed=True)
+    assert averaged.loc['Norway', 'Agriculture'] == 40.0
+
+
+def test_single_level_matches_pivot_table_on_unique_cells(frame, series):
+    table = sum_table(series, 'region')
+    pivot = pd.pivot_table(frame[frame['region'] != 'World'], index='region',
+                           values='emissions', aggfunc='sum', observed=True)
+    assert list(table.columns) == ['emissions']
+    pd.testing.assert_frame_equal(table, pivot.astype('float64'), check_index_type=False,
+                                  check_categorical=False)
+
+
+def test_columns_are_unstacked_and_optionally_nested(series):
+    table = sum_table(series, 'country', 'reason')
+    assert table.columns.name == 'reason'
+    assert table.loc['Norway', 'Vented'] == pytest.approx((6.0 + 3.0 + 1.0) * 2.0)
+    nested = sum_table(series, 'country', 'reason', nest_values=True)
+    assert nested.columns.names == [None, 'reason']
+    assert set(nested.columns.get_level_values(0)) == {'emissions'}
+    pd.testing.assert_frame_equal(nested['emissions'], table)
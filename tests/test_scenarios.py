@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from methane_emissions.cube import EmissionsCube
+from methane_emissions.scenarios import ScenarioEngine, emission_cells, grid, random_scenarios
+
+LEVERS = {
+    'onshore vented': {'segment': 'Onshore oil', 'reason': 'Vented'},
+    'offshore': {'segment': 'Offshore oil', 'share': 0.5},
+    'agriculture': {'type': 'Agriculture'},
+}
+
+
+@pytest.fixture
+def cube(frame):
+    return EmissionsCube.from_frame(frame)
+
+
+def brute_force(cells, levers, scenario, by):
+    """Remaining emissions per group, one cell and one lever at a time."""
+    remaining = {}
+    for key, value in cells.items():
+        labels = dict(zip(cells.index.names, key))
+        cut = 0.0
+        for name, spec in levers.items():
+            if all(labels[level] == wanted for level, wanted in spec.items() if level != 'share'):
+                cut += scenario[name] * spec.get('share', 1.0)
+        group = labels[by]
+        remaining[group] = remaining.get(group, 0.0) + value * (1.0 - min(cut, 1.0))
+    return pd.Series(remaining).sort_index()
+
+
+def test_baseline_equals_the_total_rows(frame, cube):
+    engine = ScenarioEngine.from_cube(cube, LEVERS, by='type')
+    rows = frame[(frame['region'] != 'World') & (frame['segment'] == 'Total')]
+    totals = rows.groupby('type', observed=True)['emissions'].sum()
+    assert engine.baseline.to_numpy() == pytest.approx(totals.sort_index().to_numpy())
+
+
+@pytest.mark.parametrize('max_bytes', [2**20, 64])
+def test_linear_path_matches_brute_force(cube, max_bytes):
+    engine = ScenarioEngine.from_cube(cube, LEVERS, by='region')
+    assert engine.linear
+    scenarios = random_scenarios(LEVERS, 20, seed=1)
+    result = engine.evaluate(scenarios, max_bytes)
+    cells = emission_cells(cube)
+    for i in (0, 7, 19):
+        expected = brute_force(cells, LEVERS, scenarios.iloc[i], 'region')
+        assert result.remaining.iloc[i].to_numpy() == pytest.approx(expected.to_numpy())
+
+
+def test_overlapping_levers_are_clipped(cube):
+    levers = {'energy': {'type': 'Energy'}, 'onshore': {'segment': 'Onshore oil'}}
+    engine = ScenarioEngine.from_cube(cube, levers, by='segment')
+    assert not engine.linear
+    scenarios = grid(levers, [0.0, 0.6, 1.0])
+    result = engine.evaluate(scenarios, max_bytes=256)
+    cells = emission_cells(cube)
+    for i in range(len(scenarios)):
+        expected = brute_force(cells, levers, scenarios.iloc[i], 'segment')
+        assert result.remaining.iloc[i].to_numpy() == pytest.approx(expected.to_numpy())
+    assert (result.remaining.to_numpy() >= -1e-9).all()
+
+
+def test_ranked_puts_the_largest_reduction_first(cube):
+    engine = ScenarioEngine.from_cube(cube, LEVERS, by='world')
+    result = engine.evaluate(grid(LEVERS, [0.0, 1.0]))
+    best = result.ranked(1).iloc[0]
+    assert (best[list(LEVERS)] == 1.0).all()
+    assert best['reduction'] == pytest.approx(result.reduction.max())
+
+
+def test_invalid_inputs(cube):
+    engine = ScenarioEngine.from_cube(cube, LEVERS)
+    with pytest.raises(ValueError):
+        engine.evaluate(pd.DataFrame({'onshore vented': [0.5]}))
+    with pytest.raises(ValueError):
+        engine.evaluate(pd.DataFrame({name: [1.5] for name in LEVERS}))
+    with pytest.raises(ValueError):
+        ScenarioEngine.from_cube(cube, {'bad': {'colour': 'red'}})
+    with pytest.raises(ValueError):
+        ScenarioEngine.from_cube(cube, LEVERS, by='baseYear')
+    assert np.isfinite(engine.baseline).all()
@@ -0,0 +1,86 @@
+import json
+
+import pandas as pd
+import pytest
+
+from methane_emissions.cube import EmissionsCube
+from methane_emissions.service import ARROW_TYPE, JSON_TYPE, QueryIndex, QueryService
+
+
+@pytest.fixture
+def cube(frame):
+    return EmissionsCube.from_frame(frame)
+
+
+@pytest.fixture
+def service(cube):
+    return QueryService(QueryIndex(cube))
+
+
+def get(service, target, **headers):
+    status, content_type, body, etag = service.handle(target, headers)
+    return status, (json.loads(body) if content_type == JSON_TYPE and body else body), etag
+
+
+def by(records, key):
+    return {record[key]: record['emissions'] for record in records}
+
+
+def test_routes(service):
+    status, top, _ = get(service, '/top?n=2&type=Energy')
+    assert status == 200 and [row['country'] for row in top] == ['France', 'Germany']
+    status, regions, _ = get(service, '/regions?type=Agriculture')
+    assert by(regions, 'region') == {'Africa': 20.0 * 2.25, 'Europe': 20.0 * 6.75}
+    status, country, _ = get(service, '/countries/Norway')
+    assert by(country, 'type') == {'Agriculture': 40.0, 'Energy': 40.0, 'Waste': 10.0}
+    status, health, _ = get(service, '/health/')
+    assert status == 200 and health['content_hash'] == service.index.content_hash
+
+
+def test_reasons_add_up_to_the_energy_total(service):
+    status, reasons, _ = get(service, '/reasons?type=Energy&country=Norway')
+    assert status == 200
+    split = by(reasons, 'reason')
+    assert sum(split.values()) == pytest.approx(40.0)
+    assert split == pytest.approx({'All': 3.0, 'Flared': 4.0, 'Fugitive': 13.0, 'Vented': 20.0})
+    _, drilldown, _ = get(service, '/drilldown?level=reason&type=Energy&country=Norway')
+    assert by(drilldown, 'reason') == pytest.approx(split)
+
+
+@pytest.mark.parametrize('target, status', [
+    ('/top?n=many', 400),
+    ('/drilldown?level=planet', 400),
+    ('/drilldown?level=reason&planet=Mars', 400),
+    ('/countries/Atlantis', 404),
+    ('/regions?type=Volcanic', 404),
+    ('/top?baseYear=1900', 404),
+    ('/reasons?type=Energy&country=Atlantis', 404),
+    ('/nowhere', 404),
+])
+def test_errors(service, target, status):
+    code, body, etag = get(service, target)
+    assert code == status and 'error' in body and etag is None
+
+
+def test_etag_revalidation(service, cube):
+    status, body, etag = get(service, '/regions')
+    assert status == 200 and etag
+    status, body, same = get(service, '/regions', **{'if-none-match': etag})
+    assert status == 304 and body == b'' and same == etag
+    assert get(service, '/regions?type=Energy')[2] != etag
+    # a new vintage changes every ETag
+    edited = cube.series.copy()
+    edited.iloc[0] += 1.0
+    other = QueryService(QueryIndex(EmissionsCube(edited)))
+    assert get(other, '/regions', **{'if-none-match': etag})[0] == 200
+
+
+def test_arrow_format(service):
+    pa = pytest.importorskip('pyarrow')
+    status, content_type, body, _ = service.handle('/regions?format=arrow', {})
+    assert status == 200 and content_type == ARROW_TYPE
+    table = pa.ipc.open_stream(body).read_all().to_pandas()
+    _, records, _ = get(service, '/regions')
+    pd.testing.assert_frame_equal(table, pd.DataFrame(records), check_dtype=False,
+                                  check_categorical=False)
+    assert service.handle('/regions', {'accept': ARROW_TYPE})[1] == ARROW_TYPE
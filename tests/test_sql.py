@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+
+from conftest import country_rows, make_frame, vintage_rows, with_world
+from methane_emissions.cube import EmissionsCube
+from methane_emissions.ranking import top_emitters
+from methane_emissions.store import ingest
+from methane_emissions.tables import chart_tables
+
+pytest.importorskip('duckdb')
+
+from methane_emissions.sql import SQLBackend  # noqa: E402
+
+
+@pytest.fixture
+def frame():
+    # two small emitters, so the top-5 views have to leave countries out
+    rows = vintage_rows() + country_rows('Asia', 'Japan', 0.1) + country_rows('Asia', 'Korea', 0.2)
+    return make_frame(with_world(rows))
+
+
+@pytest.fixture
+def backend(tmp_path, write_csv, frame):
+    store = str(tmp_path / 'store')
+    ingest(write_csv(frame), store)
+    with SQLBackend(store, threads=1) as backend:
+        yield backend
+
+
+def long(table, keys):
+    """Canonical long form: string keys, float64 emissions, sorted, missing cells dropped."""
+    table = table.dropna(subset=['emissions'])
+    table = table.astype({key: str for key in keys}).astype({'emissions': 'float64'})
+    return table[keys + ['emissions']].sort_values(keys, ignore_index=True)
+
+
+def melted(table, index, column):
+    table = table.droplevel(0, axis=1) if table.columns.nlevels > 1 else table
+    return table.reset_index().melt(id_vars=[index], var_name=column, value_name='emissions')
+
+
+def test_views_equal_the_chart_tables(backend, frame):
+    cube = EmissionsCube.from_frame(frame)
+    tables = chart_tables(cube)
+    pairs = {
+        'world_data': (tables['world_data'],
+                       ['type', 'segment', 'reason', 'region', 'baseYear']),
+        'agriculture_region_data': (tables['agriculture_region_data1'].reset_index(), ['region']),
+        'energy_region_data': (tables['energy_region_data1'].reset_index(), ['region']),
+        'top5_country_data': (tables['top5_country_data1'].reset_index(), ['country', 'type']),
+        'top5_by_emission_type': (melted(tables['top5_by_emission_type1'], 'type', 'country'),
+                                  ['type', 'country']),
+        'top5_by_energy_reasons': (melted(tables['top5_by_energy_reasons1'], 'country',
+                                          'reason'), ['country', 'reason']),
+        'countries_agriculture_emissions': (
+            tables['countries_agriculture_emissions1'].reset_index(), ['country']),
+    }
+    for view, (expected, keys) in pairs.items():
+        pd.testing.assert_frame_equal(long(backend.view(view), keys), long(expected, keys),
+                                      check_exact=False, rtol=1e-6, obj=view)
+
+
+def test_top_countries_match_top_emitters(backend, frame):
+    top = backend.view('top_countries')
+    assert list(top['country']) == list(top_emitters(EmissionsCube.from_frame(frame), k=5))
+    assert not {'Japan', 'Korea'} & set(top['country'])
+
+
+def test_cells_equal_the_cube(backend, frame):
+    cube = EmissionsCube.from_frame(frame)
+    keys = ['type', 'segment', 'reason', 'region', 'country', 'baseYear']
+    expected = cube.series.rename('emissions').reset_index().dropna(subset=['country'])
+    actual = backend.view('cells').dropna(subset=['country'])
+    pd.testing.assert_frame_equal(long(actual, keys), long(expected, keys), check_exact=False,
+                                  rtol=1e-6)
+
+
+def test_unknown_view_and_empty_store(backend, tmp_path):
+    with pytest.raises(ValueError, match='unknown view'):
+        backend.view('nope')
+    with pytest.raises(ValueError, match='no partitions'):
+        SQLBackend(str(tmp_path / 'empty'))
@@ -0,0 +1,17 @@
+from conftest import SATELLITE
+from methane_emissions.cli import main
+from methane_emissions.cube import EmissionsCube
+from methane_emissions.stats import grouped_emissions
+
+
+def test_segment_level_sums_the_leaf_cells(frame):
+    grouped = grouped_emissions(EmissionsCube.from_frame(frame), 'segment', types='Energy')
+    # Onshore oil: Vented 6 + Fugitive 4 per unit of scale, not its All row too
+    scales = 1.0 + 1.25 + 2.0 + 2.25 + 2.5
+    assert grouped[('Energy', 'Onshore oil')] == 10.0 * scales
+    assert ('Energy', SATELLITE) not in grouped
+
+
+def test_stats_command_accepts_the_segment_level(write_csv, frame, capsys):
+    assert main(['stats', write_csv(frame), '--level', 'segment']) == 0
+    assert 'segment' in capsys.readouterr().out
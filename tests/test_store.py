@@ -0,0 +1,82 @@
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import make_frame, vintage_rows, with_world
+from methane_emissions.cube import EmissionsCube
+from methane_emissions.store import (MANIFEST, ingest, load_cube, load_store, partition_dir,
+                                     read_manifest)
+from methane_emissions.validate import ValidationError
+
+ENERGY = 'baseYear=2022/type=Energy'
+PARTITIONS = ['baseYear=2019-2021/type=Agriculture', 'baseYear=2019-2021/type=Waste', ENERGY]
+
+
+def assert_same_cube(actual, expected):
+    pd.testing.assert_series_equal(actual.series.astype('float64'),
+                                   expected.series.astype('float64'),
+                                   check_names=False, check_index_type=False,
+                                   check_categorical=False)
+
+
+def test_reingesting_a_vintage_rewrites_nothing(tmp_path, write_csv, frame):
+    store = str(tmp_path / 'store')
+    path = write_csv(frame)
+    first = ingest(path, store)
+    assert sorted(first.added) == PARTITIONS and not first.changed
+
+    mtime = os.stat(os.path.join(partition_dir(store, ['2022', 'Energy']), 'data.parquet')).st_mtime_ns
+    second = ingest(path, store, vintage='again')
+    assert sorted(second.unchanged) == PARTITIONS
+    assert not second.added and not second.changed
+    assert os.stat(os.path.join(partition_dir(store, ['2022', 'Energy']),
+                                'data.parquet')).st_mtime_ns == mtime
+    assert [entry['vintage'] for entry in read_manifest(store)['vintages']] == [
+        'vintage.csv', 'again']
+
+
+def test_only_the_edited_partition_is_rewritten(tmp_path, write_csv, frame):
+    store = str(tmp_path / 'store')
+    ingest(write_csv(frame), store)
+    edited = frame.copy()
+    edited.loc[(edited['country'] == 'Norway') & (edited['segment'] == 'Bioenergy'),
+               'emissions'] += 1.0
+    report = ingest(write_csv(edited, 'v2.csv'), store, validate=False)
+    assert report.changed == [ENERGY] and not report.added
+    assert sorted(report.unchanged) == PARTITIONS[:2]
+    assert read_manifest(store)['partitions'][ENERGY]['vintage'] == 'v2.csv'
+    assert load_cube(store).get('Energy', 'Bioenergy', 'All', 'Europe', 'Norway', '2022') == 4.0
+
+
+def test_stored_cube_matches_a_fresh_build(tmp_path, write_csv, frame):
+    store = str(tmp_path / 'store')
+    ingest(write_csv(frame), store)
+    expected = EmissionsCube.from_frame(frame)
+    assert_same_cube(load_cube(store), expected)
+    assert_same_cube(EmissionsCube.from_frame(load_store(store)), expected)
+    energy = load_cube(store, type='Energy')
+    assert set(energy.series.index.get_level_values('type')) == {'Energy'}
+
+
+def test_replace_drops_partitions_the_vintage_does_not_cover(tmp_path, write_csv, frame):
+    store = str(tmp_path / 'store')
+    ingest(write_csv(frame), store)
+    energy_only = frame[frame['type'] == 'Energy']
+    ingest(write_csv(energy_only, 'energy.csv'), store)
+    assert sorted(read_manifest(store)['partitions']) == PARTITIONS
+
+    ingest(write_csv(energy_only, 'energy.csv'), store, replace=True)
+    assert sorted(read_manifest(store)['partitions']) == [ENERGY]
+    assert not os.path.exists(partition_dir(store, ['2019-2021', 'Agriculture']))
+
+
+def test_strict_ingest_of_a_bad_vintage_leaves_the_store_alone(tmp_path, write_csv, frame):
+    store = str(tmp_path / 'store')
+    ingest(write_csv(frame), store)
+    before = open(os.path.join(store, MANIFEST)).read()
+    broken = frame.copy()
+    broken.loc[broken['segment'] == 'Onshore oil', 'emissions'] *= 2
+    with pytest.raises(ValidationError):
+        ingest(write_csv(broken, 'broken.csv'), store, strict=True)
+    assert open(os.path.join(store, MANIFEST)).read() == before
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+from methane_emissions.cube import EmissionsCube
+from methane_emissions.loader import COLUMNS
+from methane_emissions.streaming import region_data, stream_aggregates
+
+
+def expected(frame, by):
+    rows = frame[(frame['segment'] == 'Total') & (frame['reason'] == 'All')
+                 & (frame['region'] != 'World')]
+    grouped = rows['emissions'].astype('float64').groupby([rows['type'].astype(object),
+                                                           rows[by].astype(object)])
+    return grouped.agg(['sum', 'count', 'min', 'max']).rename_axis(['type', by])
+
+
+@pytest.mark.parametrize('by', ['region', 'country'])
+@pytest.mark.parametrize('chunksize', [5, 13, 1_000_000])
+def test_chunked_merge_equals_the_in_memory_groupby(write_csv, frame, by, chunksize):
+    # shuffled, so each chunk sees a different subset of the categories
+    path = write_csv(frame.sample(frac=1.0, random_state=1))
+    actual = stream_aggregates(path, by=by, chunksize=chunksize)
+    pd.testing.assert_frame_equal(actual, expected(frame, by), check_index_type=False)
+
+
+def test_region_data_matches_the_cube_rollup(write_csv, frame):
+    aggregates = stream_aggregates(write_csv(frame), chunksize=7)
+    cube = EmissionsCube.from_frame(frame)
+    for type in ('Agriculture', 'Energy', 'Waste'):
+        rollup = cube.rollup('region', type=type, segment='Total', reason='All',
+                             include_world=False)
+        streamed = region_data(aggregates, type)
+        assert list(streamed['region']) == list(rollup['region'].astype(str))
+        assert streamed['emissions'].to_numpy() == pytest.approx(rollup['emissions'].to_numpy())
+
+
+def test_types_filter_and_empty_input(write_csv, frame):
+    aggregates = stream_aggregates(write_csv(frame), types=['Waste'], chunksize=4)
+    assert set(aggregates.index.get_level_values('type')) == {'Waste'}
+    empty = stream_aggregates(write_csv(frame.iloc[:0][COLUMNS], 'empty.csv'))
+    assert empty.empty and list(empty.columns) == ['sum', 'count', 'min', 'max']
+    assert region_data(empty, 'Energy').empty
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from conftest import make_frame
+from methane_emissions.validate import validate_frame
+
+ONSHORE_OIL = [
+    ('Africa', 'Nigeria', 'Energy', 'Total', 'All', '2022', 10.0),
+    ('Africa', 'Nigeria', 'Energy', 'Onshore oil', 'All', '2022', 10.0),
+    ('Africa', 'Nigeria', 'Energy', 'Onshore oil', 'Vented', '2022', 6.0),
+    ('Africa', 'Nigeria', 'Energy', 'Onshore oil', 'Fugitive', '2022', 4.0),
+]
+
+
+def test_consistent_vintage_passes(frame):
+    report = validate_frame(frame)
+    assert report.ok, report.details()
+
+
+def test_all_row_next_to_itemized_reasons_is_valid():
+    report = validate_frame(make_frame(ONSHORE_OIL))
+    assert report.ok, report.details()
+
+
+def test_wrong_total_is_reported():
+    rows = [ONSHORE_OIL[0][:-1] + (12.0,)] + ONSHORE_OIL[1:]
+    violations = validate_frame(make_frame(rows)).violations['segment_totals']
+    assert len(violations) == 1
+    assert violations.iloc[0]['expected'] == 12.0
+    assert violations.iloc[0]['actual'] == 10.0
+
+
+def test_wrong_all_row_is_reported():
+    rows = ONSHORE_OIL[:1] + [ONSHORE_OIL[1][:-1] + (9.0,)] + ONSHORE_OIL[2:]
+    report = validate_frame(make_frame(rows))
+    assert report.counts()['reason_totals'] == 1
+    assert report.counts()['segment_totals'] == 0
+
+
+def test_world_totals(frame):
+    frame = frame.copy()
+    world = (frame['region'] == 'World') & (frame['type'] == 'Agriculture')
+    frame.loc[world, 'emissions'] += np.float32(1.0)
+    violations = validate_frame(frame).violations['world_totals']
+    assert violations['type'].tolist() == ['Agriculture']
+
+
+def test_row_checks(frame):
+    frame = frame.copy()
+    frame.loc[0, 'emissions'] = -1.0
+    frame.loc[1, 'emissions'] = np.nan
+    frame['region'] = frame['region'].cat.add_categories(['Atlantis'])
+    frame.loc[2, 'region'] = 'Atlantis'
+    frame = pd.concat([frame, frame.iloc[[5]]], ignore_index=True)
+    report = validate_frame(frame)
+    counts = report.counts()
+    assert counts['negative'] == 1
+    assert counts['missing'] == 1
+    assert counts['duplicates'] == 2
+    unknown = report.violations['unknown_categories']
+    assert ('region', 'Atlantis') in set(zip(unknown['column'], unknown['value']))